@@ -363,6 +363,7 @@ class Endpoint(APIView):
         default_per_page=100,
         max_per_page=100,
         cursor_cls=Cursor,
+        count_hits=False,
         **paginator_kwargs,
     ):
         assert (paginator and not paginator_kwargs) or (paginator_cls and paginator_kwargs)
@@ -380,7 +381,11 @@ class Endpoint(APIView):
                 description=type(self).__name__,
             ) as span:
                 span.set_data("Limit", per_page)
-                cursor_result = paginator.get_result(limit=per_page, cursor=input_cursor)
+                # Not every paginator supports counting hits.
+                result_kwargs = {"count_hits": True} if count_hits else {}
+                cursor_result = paginator.get_result(
+                    limit=per_page, cursor=input_cursor, **result_kwargs
+                )
         except BadPaginationError as e:
             raise ParseError(detail=str(e))
 
@@ -1,8 +1,9 @@
 from sentry.api.bases import OrganizationEndpoint
 from sentry.api.bases.organization import OrganizationAuditPermission
-from sentry.api.paginator import DateTimePaginator
+from sentry.api.paginator import KeysetPaginator
 from sentry.api.serializers import serialize
 from sentry.models import AuditLogEntry
+from sentry.utils.cursors import KeysetCursor
 
 EVENT_REVERSE_MAP = {v: k for k, v in AuditLogEntry._meta.get_field("event").choices}
 
@@ -23,7 +24,10 @@ class OrganizationAuditLogsEndpoint(OrganizationEndpoint):
         return self.paginate(
             request=request,
             queryset=queryset,
-            paginator_cls=DateTimePaginator,
+            paginator_cls=KeysetPaginator,
+            cursor_cls=KeysetCursor,
             order_by="-datetime",
+            count_hits=True,
+            approximate_hits=True,
             on_results=lambda x: serialize(x, request.user),
         )
@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import sentry_sdk
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.response import Response
+from sentry_sdk import Hub
+
+from sentry import options
+from sentry.api import client
+from sentry.api.bases import OrganizationEventsEndpointBase
+from sentry.api.bases.organization import OrganizationDataExportPermission
+from sentry.models import Organization
+from sentry.utils import metrics
+
+# A dashboard has at most this many widgets
+MAX_BATCH_QUERIES = 30
+
+BATCH_ENDPOINTS = {
+    "eventsv2": "/organizations/{organization_slug}/eventsv2/",
+    "events-stats": "/organizations/{organization_slug}/events-stats/",
+}
+
+QueryKey = Tuple[str, Tuple[Tuple[str, Tuple[str, ...]], ...]]
+
+
+class BatchQuerySerializer(serializers.Serializer):
+    id = serializers.CharField(max_length=64)
+    endpoint = serializers.ChoiceField(choices=list(BATCH_ENDPOINTS))
+    query = serializers.DictField(
+        child=serializers.ListField(child=serializers.CharField(allow_blank=True), max_length=50),
+        allow_empty=True,
+    )
+
+    def to_internal_value(self, data):
+        # Single query parameters may be sent without wrapping them in a list
+        if isinstance(data, dict) and isinstance(data.get("query"), dict):
+            data = {
+                **data,
+                "query": {
+                    key: value if isinstance(value, list) else [value]
+                    for key, value in data["query"].items()
+                },
+            }
+        return super().to_internal_value(data)
+
+
+class EventsBatchSerializer(serializers.Serializer):
+    queries = serializers.ListField(
+        child=BatchQuerySerializer(), allow_empty=False, max_length=MAX_BATCH_QUERIES
+    )
+
+    def validate_queries(self, queries):
+        ids = [query["id"] for query in queries]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Query ids must be unique")
+        return queries
+
+
+def get_query_key(query: Mapping[str, Any]) -> QueryKey:
+    """Widgets which request the same endpoint with the same parameters share
+    one result"""
+    return (
+        query["endpoint"],
+        tuple(sorted((key, tuple(values)) for key, values in query["query"].items())),
+    )
+
+
+class OrganizationEventsBatchEndpoint(OrganizationEventsEndpointBase):  # type: ignore
+    permission_classes = (OrganizationDataExportPermission,)
+
+    def post(self, request: Request, organization: Organization) -> Response:
+        """
+        Run the queries of all widgets of a dashboard
+        `````````````````````````````````````````````
+
+        Runs a list of `eventsv2` and `events-stats` queries in one request.
+        Identical queries are run once, and the remaining queries run
+        concurrently. Every query keeps the status code and body it would
+        have had as a separate request.
+
+        :param array queries: a list of objects with an `id`, the `endpoint`
+                              to query and the `query` parameters to query it
+                              with.
+        """
+        if not self.has_feature(organization, request):
+            return Response(status=404)
+
+        serializer = EventsBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+
+        queries = serializer.validated_data["queries"]
+        unique_queries: Dict[QueryKey, Mapping[str, Any]] = {}
+        for query in queries:
+            unique_queries.setdefault(get_query_key(query), query)
+
+        metrics.timing("api.events_batch.queries", len(queries))
+        metrics.timing("api.events_batch.unique_queries", len(unique_queries))
+
+        with sentry_sdk.start_span(op="discover.endpoint", description="batch") as span:
+            span.set_data("queries", len(queries))
+            span.set_data("unique_queries", len(unique_queries))
+            responses = self.run_queries(request, organization, list(unique_queries.values()))
+
+        results_by_key = dict(zip(unique_queries, responses))
+        return Response(
+            {
+                "results": [
+                    {"id": query["id"], **results_by_key[get_query_key(query)]} for query in queries
+                ]
+            },
+            status=200,
+        )
+
+    def run_queries(
+        self, request: Request, organization: Organization, queries: Sequence[Mapping[str, Any]]
+    ) -> List[Mapping[str, Any]]:
+        concurrency = min(options.get("api.events-batch.concurrency"), len(queries))
+        if concurrency <= 1:
+            return [self.run_query(request, organization, query) for query in queries]
+
+        def run_query_in_thread(query: Mapping[str, Any], hub: Hub) -> Mapping[str, Any]:
+            try:
+                with hub:
+                    return self.run_query(request, organization, query)
+            finally:
+                # Worker threads open their own database connections
+                connections.close_all()
+
+        # Every query gets a hub of its own, so that its spans and errors are
+        # attached to the batch's transaction.
+        hubs = [Hub(Hub.current) for _ in queries]
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(run_query_in_thread, queries, hubs))
+
+    def run_query(
+        self, request: Request, organization: Organization, query: Mapping[str, Any]
+    ) -> Mapping[str, Any]:
+        path = BATCH_ENDPOINTS[query["endpoint"]].format(organization_slug=organization.slug)
+        try:
+            response = client.get(path, request=request, data=query["query"])
+        except client.ApiError as e:
+            return {"status": e.status_code, "data": e.body}
+        return {"status": response.status_code, "data": response.data}
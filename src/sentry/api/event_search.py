@@ -1,3 +1,4 @@
+import functools
 import re
 from collections import namedtuple
 from dataclasses import asdict, dataclass, field
@@ -37,6 +38,11 @@ from sentry.utils.validators import is_event_id, is_span_id
 # before the asterisk is actually escaping the asterisk.
 WILDCARD_CHARS = re.compile(r"(?<!\\)(\\\\)*\*")
 
+# The number of parsed search queries kept per process. Queries longer than
+# MAX_CACHED_QUERY_LENGTH are parsed every time.
+PARSE_CACHE_SIZE = 1000
+MAX_CACHED_QUERY_LENGTH = 2000
+
 event_search_grammar = Grammar(
     r"""
 search = spaces term*
@@ -1070,12 +1076,31 @@ default_config = SearchConfig(
 )
 
 
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_search_tree(query: str) -> Node:
+    return event_search_grammar.parse(query)
+
+
+def parse_search_tree(query: str) -> Node:
+    """
+    Parses a search query into its syntax tree.
+
+    The tree only depends on the query string, so it is cached and shared
+    between requests. It must not be modified. Everything that depends on the
+    config, the params or the current time is resolved from the tree by the
+    `SearchVisitor` on every parse.
+    """
+    if len(query) > MAX_CACHED_QUERY_LENGTH:
+        return event_search_grammar.parse(query)
+    return _parse_search_tree(query)
+
+
 def parse_search_query(query, config=None, params=None) -> Sequence[SearchFilter]:
     if config is None:
         config = default_config
 
     try:
-        tree = event_search_grammar.parse(query)
+        tree = parse_search_tree(query)
     except IncompleteParseError as e:
         idx = e.column()
         prefix = query[max(0, idx - 5) : idx]
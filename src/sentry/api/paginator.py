@@ -1,16 +1,17 @@
 import bisect
 import functools
 import math
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import connections
+from django.db import connections, models
 from django.db.models.functions import Lower
 from django.db.models.sql.datastructures import EmptyResultSet
 from django.utils import timezone
 
+from sentry.utils import json
 from sentry.utils.compat import map, zip
-from sentry.utils.cursors import Cursor, CursorResult, build_cursor
+from sentry.utils.cursors import Cursor, CursorResult, KeysetCursor, build_cursor
 
 quote_name = connections["default"].ops.quote_name
 
@@ -178,22 +179,53 @@ class BasePaginator:
 
         return cursor
 
-    def count_hits(self, max_hits):
-        if not max_hits:
-            return 0
-        hits_query = self.queryset.values()[:max_hits].query
+    def _get_hits_sql(self, max_hits=None):
+        hits_query = self.queryset.values()
+        if max_hits:
+            hits_query = hits_query[:max_hits]
+        hits_query = hits_query.query
         # clear out any select fields (include select_related) and pull just the id
         hits_query.clear_select_clause()
         hits_query.add_fields(["id"])
         hits_query.clear_ordering(force_empty=True)
+        return hits_query.sql_with_params()
+
+    def count_hits(self, max_hits):
+        if not max_hits:
+            return 0
         try:
-            h_sql, h_params = hits_query.sql_with_params()
+            h_sql, h_params = self._get_hits_sql(max_hits)
         except EmptyResultSet:
             return 0
         cursor = connections[self.queryset.db].cursor()
         cursor.execute(f"SELECT COUNT(*) FROM ({h_sql}) as t", h_params)
         return cursor.fetchone()[0]
 
+    def estimate_hits(self, max_hits):
+        """
+        Like `count_hits`, but only counts when the Postgres planner estimates
+        fewer than `max_hits` rows. Otherwise `max_hits` is returned without
+        reading any rows, which overestimates filters the planner thinks are
+        less selective than they are.
+        """
+        if not max_hits:
+            return 0
+        try:
+            h_sql, h_params = self._get_hits_sql()
+        except EmptyResultSet:
+            return 0
+        if self._get_planned_rows(h_sql, h_params) >= max_hits:
+            return max_hits
+        return self.count_hits(max_hits)
+
+    def _get_planned_rows(self, sql, params):
+        cursor = connections[self.queryset.db].cursor()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]["Plan Rows"]
+
 
 class Paginator(BasePaginator):
     def get_item_key(self, item, for_prev=False):
@@ -218,6 +250,145 @@ class DateTimePaginator(BasePaginator):
         )
 
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class KeysetPaginator(BasePaginator):
+    """
+    Pages by the `(order_by, id)` of the first and last row of a page instead
+    of an offset, so that every page costs the same as the first one and rows
+    sharing a sort value are neither skipped nor repeated. Use it together
+    with `cursor_cls=KeysetCursor`.
+
+    `order_by` must be a non-nullable integer or datetime field, ideally
+    indexed together with `id`. With `approximate_hits`, hits are counted
+    with `estimate_hits`.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        order_by,
+        max_limit=MAX_LIMIT,
+        on_results=None,
+        post_query_filter=None,
+        approximate_hits=False,
+    ):
+        super().__init__(
+            queryset,
+            order_by=order_by,
+            max_limit=max_limit,
+            on_results=on_results,
+            post_query_filter=post_query_filter,
+        )
+        self.field = queryset.model._meta.get_field(self.key)
+        self.approximate_hits = approximate_hits
+
+    def build_queryset(self, value, is_prev):
+        direction = "" if self._is_asc(is_prev) else "-"
+        queryset = self.queryset.order_by(f"{direction}{self.key}", f"{direction}id")
+
+        if value:
+            table = quote_name(queryset.model._meta.db_table)
+            operator = ">" if self._is_asc(is_prev) else "<"
+            queryset = queryset.extra(
+                where=[
+                    f"({table}.{quote_name(self.field.column)}, {table}.{quote_name('id')}) "
+                    f"{operator} (%s, %s)"
+                ],
+                params=list(value),
+            )
+
+        return queryset
+
+    def get_item_key(self, item, for_prev=False):
+        value = getattr(item, self.key)
+        if isinstance(value, datetime):
+            value = (value - EPOCH) // timedelta(microseconds=1)
+        return (value, item.id)
+
+    def value_from_cursor(self, cursor):
+        if not isinstance(cursor.value, tuple):
+            raise BadPaginationError("Invalid cursor")
+        value, id = cursor.value
+        if isinstance(self.field, models.DateTimeField):
+            value = EPOCH + timedelta(microseconds=value)
+        return (value, id)
+
+    def get_result(self, limit=100, cursor=None, count_hits=False, known_hits=None, max_hits=None):
+        if cursor is None:
+            cursor = KeysetCursor(0, 0, 0)
+
+        limit = min(limit, self.max_limit)
+
+        if cursor.value:
+            cursor_value = self.value_from_cursor(cursor)
+        else:
+            cursor_value = None
+
+        queryset = self.build_queryset(cursor_value, cursor.is_prev)
+
+        # max_hits can be limited to speed up the query
+        if max_hits is None:
+            max_hits = MAX_HITS_LIMIT
+        if count_hits:
+            if self.approximate_hits:
+                hits = self.estimate_hits(max_hits)
+            else:
+                hits = self.count_hits(max_hits)
+        elif known_hits is not None:
+            hits = known_hits
+        else:
+            hits = None
+
+        # The extra row tells whether there is another page in the direction
+        # we are paging in.
+        results = list(queryset[: limit + 1])
+        has_more = len(results) > limit
+        results = results[:limit]
+
+        if cursor.is_prev:
+            results.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = bool(cursor.value), has_more
+
+        if results:
+            first = self.get_item_key(results[0])
+            last = self.get_item_key(results[-1])
+        elif cursor.value:
+            # The cursor going back the way we came has to include the row
+            # this cursor points at. Ids are integers, so the row's value with
+            # the id next to its own is right past the row.
+            value, id = cursor.value
+            step = 1 if self._is_asc(cursor.is_prev) else -1
+            first = last = (value, id + step)
+        else:
+            first = last = 0
+
+        next_cursor = KeysetCursor(last, 0, False, has_next)
+        prev_cursor = KeysetCursor(first, 0, True, has_prev)
+
+        if self.on_results:
+            results = self.on_results(results)
+
+        result = CursorResult(
+            results=results,
+            next=next_cursor,
+            prev=prev_cursor,
+            hits=hits,
+            max_hits=max_hits if count_hits else None,
+        )
+
+        # Note that this filter is just to remove unwanted rows from the result set.
+        # This will reduce the number of rows returned rather than fill a full page,
+        # and could result in an empty page being returned
+        if self.post_query_filter:
+            result.results = self.post_query_filter(result.results)
+
+        return result
+
+
 # TODO(dcramer): previous cursors are too complex at the moment for many things
 # and are only useful for polling situations. The OffsetPaginator ignores them
 # entirely and uses standard paging
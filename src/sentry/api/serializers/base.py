@@ -1,6 +1,11 @@
+import threading
+from contextlib import contextmanager
+from copy import deepcopy
 from typing import (
     Any,
     Callable,
+    Generator,
+    Hashable,
     List,
     Mapping,
     MutableMapping,
@@ -13,13 +18,52 @@ from typing import (
 
 import sentry_sdk
 from django.contrib.auth.models import AnonymousUser
+from django.db.models import Model, prefetch_related_objects
 
+from sentry.utils import metrics
 from sentry.utils.json import JSONData
 
 K = TypeVar("K")
 
 registry: MutableMapping[Any, Any] = {}
 
+_local = threading.local()
+
+
+@contextmanager
+def _memo_scope() -> Generator[MutableMapping[Hashable, Any], None, None]:
+    """
+    The serialized objects of memoizing serializers are shared by all nested
+    `serialize` calls below the outermost one, which is usually the whole
+    response.
+    """
+    memo = getattr(_local, "memo", None)
+    if memo is not None:
+        yield memo
+        return
+
+    _local.memo = memo = {}
+    try:
+        yield memo
+    finally:
+        _local.memo = None
+
+
+def _get_memo_key(serializer: Any, user: Any, kwargs: Mapping[str, Any]) -> Optional[Hashable]:
+    # Serializers are usually created for every call, so instances of the same
+    # class and state share their results
+    key = (
+        type(serializer),
+        tuple(sorted(vars(serializer).items())),
+        user,
+        tuple(sorted(kwargs.items())),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
 
 def register(type: Any) -> Callable[[Type[K]], Type[K]]:
     """A wrapper that adds the wrapped Serializer to the Serializer registry (see above) for the key `type`."""
@@ -69,24 +113,77 @@ def serialize(
         else:
             return objects
 
-    with sentry_sdk.start_span(op="serialize", description=type(serializer).__name__) as span:
+    with sentry_sdk.start_span(
+        op="serialize", description=type(serializer).__name__
+    ) as span, _memo_scope() as memo:
         span.set_data("Object Count", len(objects))
 
+        # avoid passing NoneType's to the serializer as they're allowed and
+        # filtered out of serialize()
+        item_list = [o for o in objects if o is not None]
+
+        memo_key = _get_memo_key(serializer, user, kwargs) if serializer.memoize else None
+        if memo_key is not None:
+            num_items = len(item_list)
+            item_list = [o for o in item_list if (memo_key, o) not in memo]
+            if len(item_list) < num_items:
+                metrics.incr(
+                    "serialize.memoized",
+                    amount=num_items - len(item_list),
+                    tags={"serializer": type(serializer).__name__},
+                )
+
+        if serializer.prefetch_related and item_list and isinstance(item_list[0], Model):
+            with sentry_sdk.start_span(
+                op="serialize.prefetch_related", description=type(serializer).__name__
+            ):
+                prefetch_related_objects(item_list, *serializer.prefetch_related)
+
         with sentry_sdk.start_span(op="serialize.get_attrs", description=type(serializer).__name__):
-            attrs = serializer.get_attrs(
-                # avoid passing NoneType's to the serializer as they're allowed and
-                # filtered out of serialize()
-                item_list=[o for o in objects if o is not None],
-                user=user,
-                **kwargs,
-            )
+            if memo_key is not None and not item_list:
+                attrs = {}
+            else:
+                attrs = serializer.get_attrs(item_list=item_list, user=user, **kwargs)
 
         with sentry_sdk.start_span(op="serialize.iterate", description=type(serializer).__name__):
-            return [serializer(o, attrs=attrs.get(o, {}), user=user, **kwargs) for o in objects]
+            if memo_key is None:
+                return [serializer(o, attrs=attrs.get(o, {}), user=user, **kwargs) for o in objects]
+
+            results = []
+            for o in objects:
+                if o is None:
+                    results.append(serializer(o, attrs={}, user=user, **kwargs))
+                elif (memo_key, o) in memo:
+                    # Copied, so that callers which change the result of one
+                    # object, or anything nested in it, don't change it for
+                    # the others
+                    results.append(deepcopy(memo[memo_key, o]))
+                else:
+                    result = serializer(o, attrs=attrs.get(o, {}), user=user, **kwargs)
+                    memo[memo_key, o] = deepcopy(result)
+                    results.append(result)
+            return results
 
 
 class Serializer:
-    """A Serializer class contains the logic to serialize a specific type of object."""
+    """
+    A Serializer class contains the logic to serialize a specific type of object.
+
+    Serializers declare what they need beyond `get_attrs` so that `serialize`
+    can batch it:
+
+    * `prefetch_related` lists the relations of the objects that `get_attrs`
+      or `serialize` access. They are fetched for the whole `item_list` with
+      `prefetch_related_objects` before `get_attrs`, and relations that were
+      already fetched are not fetched again.
+    * `memoize` marks serializers whose result only depends on the object, the
+      user and the serializer's class, attributes and arguments. Objects that
+      were already serialized in the same response are not passed to
+      `get_attrs` again and a copy of their earlier result is reused.
+    """
+
+    prefetch_related: Sequence[str] = ()
+    memoize = False
 
     def __call__(
         self, obj: Any, attrs: Mapping[Any, Any], user: Any, **kwargs: Any
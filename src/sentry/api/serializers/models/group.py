@@ -7,7 +7,7 @@ from typing import Iterable, Mapping, Optional, Tuple
 import pytz
 import sentry_sdk
 from django.conf import settings
-from django.db.models import Min, prefetch_related_objects
+from django.db.models import Min
 from django.utils import timezone
 
 from sentry import release_health, tagstore, tsdb
@@ -74,6 +74,10 @@ def merge_list_dictionaries(dict1, dict2):
 
 
 class GroupSerializerBase(Serializer):
+    # Note that organization is necessary here for use in `_get_permalink` to avoid
+    # making unnecessary queries.
+    prefetch_related = ("project__organization",)
+
     def __init__(
         self,
         collapse=None,
@@ -209,10 +213,6 @@ class GroupSerializerBase(Serializer):
 
         GroupMeta.objects.populate_cache(item_list)
 
-        # Note that organization is necessary here for use in `_get_permalink` to avoid
-        # making unnecessary queries.
-        prefetch_related_objects(item_list, "project__organization")
-
         if user.is_authenticated and item_list:
             bookmarks = set(
                 GroupBookmark.objects.filter(user=user, group__in=item_list).values_list(
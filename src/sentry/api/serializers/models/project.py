@@ -156,6 +156,8 @@ class ProjectSerializer(Serializer):
     such as "show all projects for this organization", and its attributes be kept to a minimum.
     """
 
+    prefetch_related = ("organization",)
+
     def __init__(
         self,
         environment_id: Optional[str] = None,
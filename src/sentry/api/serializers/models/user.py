@@ -31,6 +31,10 @@ def manytoone_to_dict(queryset, key, filter_func=None):
 
 @register(User)
 class UserSerializer(Serializer):
+    # Users are serialized once per owner, author and assignee in lists of
+    # releases and issues
+    memoize = True
+
     def _get_identities(self, item_list, user):
         if not (env.request and is_active_superuser(env.request)):
             item_list = [x for x in item_list if x == user]
@@ -167,6 +167,7 @@ from .endpoints.organization_events import (
     OrganizationEventsGeoEndpoint,
     OrganizationEventsV2Endpoint,
 )
+from .endpoints.organization_events_batch import OrganizationEventsBatchEndpoint
 from .endpoints.organization_events_facets import OrganizationEventsFacetsEndpoint
 from .endpoints.organization_events_facets_performance import (
     OrganizationEventsFacetsPerformanceEndpoint,
@@ -1010,6 +1011,11 @@ urlpatterns = [
                     OrganizationEventsStatsEndpoint.as_view(),
                     name="sentry-api-0-organization-events-stats",
                 ),
+                url(
+                    r"^(?P<organization_slug>[^\/]+)/events-batch/$",
+                    OrganizationEventsBatchEndpoint.as_view(),
+                    name="sentry-api-0-organization-events-batch",
+                ),
                 url(
                     r"^(?P<organization_slug>[^\/]+)/events-geo/$",
                     OrganizationEventsGeoEndpoint.as_view(),
@@ -584,6 +584,7 @@ CELERY_IMPORTS = (
     "sentry.tasks.servicehooks",
     "sentry.tasks.store",
     "sentry.tasks.symbolication",
+    "sentry.tasks.tagstore",
     "sentry.tasks.unmerge",
     "sentry.tasks.update_user_reports",
     "sentry.tasks.user_report",
@@ -77,7 +77,7 @@ class DiscoverProcessor:
     @staticmethod
     def get_data_fn(fields, equations, query, params, sort):
         def data_fn(offset, limit):
-            return discover.query(
+            return discover.stream_query(
                 selected_columns=fields,
                 equations=equations,
                 query=query,
@@ -96,7 +96,7 @@ class DiscoverProcessor:
     def handle_fields(self, result_list):
         # Find issue short_id if present
         # (originally in `/api/bases/organization_events.py`)
-        new_result_list = result_list[:]
+        new_result_list = list(result_list)
 
         if "issue" in self.header_fields:
             issue_ids = {result["issue.id"] for result in new_result_list}
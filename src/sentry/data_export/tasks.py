@@ -254,7 +254,7 @@ def process_issues_by_tag(processor, limit, offset):
 
 @handle_snuba_errors(logger)
 def process_discover(processor, limit, offset):
-    raw_data_unicode = processor.data_fn(limit=limit, offset=offset)["data"]
+    raw_data_unicode = processor.data_fn(limit=limit, offset=offset)
     return processor.handle_fields(raw_data_unicode)
 
 
@@ -94,6 +94,13 @@ class NodeData(MutableMapping):
     def copy(self):
         return self.data.copy()
 
+    @property
+    def loaded(self):
+        """
+        Whether the data is available without fetching it from nodestore.
+        """
+        return self._node_data is not None
+
     @memoize
     def data(self):
         """
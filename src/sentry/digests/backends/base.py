@@ -1,5 +1,6 @@
 import logging
-from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional
+from contextlib import ExitStack, contextmanager
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional, Sequence
 
 from sentry.utils.imports import import_string
 from sentry.utils.services import Service
@@ -58,7 +59,16 @@ class Backend(Service):  # type: ignore
     be transitioned to "waiting" instead.)
     """
 
-    __all__ = ("add", "delete", "digest", "enabled", "maintenance", "schedule", "validate")
+    __all__ = (
+        "add",
+        "delete",
+        "digest",
+        "digest_many",
+        "enabled",
+        "maintenance",
+        "schedule",
+        "validate",
+    )
 
     def __init__(self, **options: Any) -> None:
         # The ``minimum_delay`` option defines the default minimum amount of
@@ -168,6 +178,26 @@ class Backend(Service):  # type: ignore
         """
         raise NotImplementedError
 
+    @contextmanager
+    def digest_many(self, keys: Sequence[str], minimum_delay: Optional[int] = None) -> Any:
+        """
+        Extract records from several timelines for processing at once.
+
+        This behaves like ``digest``, but the target of the ``as`` clause is a
+        mapping of timeline key to records. Timelines which are not in the
+        "ready" state are left out of the mapping instead of raising
+        ``InvalidState``. All digests are closed when the context manager exits
+        successfully, none are if an exception is raised.
+        """
+        with ExitStack() as stack:
+            records = {}
+            for key in keys:
+                try:
+                    records[key] = stack.enter_context(self.digest(key, minimum_delay))
+                except InvalidState:
+                    continue
+            yield records
+
     def schedule(
         self, deadline: float, timestamp: Optional[float] = None
     ) -> Optional[Iterable["ScheduleEntry"]]:
@@ -1,14 +1,15 @@
 import logging
 import time
-from contextlib import contextmanager
-from typing import Any, Iterable, Optional, Tuple
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from typing import Any, Iterable, List, Mapping, MutableMapping, Optional, Sequence, Tuple
 
 from rb.clients import LocalClient
 from redis.exceptions import ResponseError
 
 from sentry.digests import Record, ScheduleEntry
 from sentry.digests.backends.base import Backend, InvalidState
-from sentry.utils.compat import map
+from sentry.utils.locking import UnableToAcquireLock
 from sentry.utils.locking.backends.redis import RedisLockBackend
 from sentry.utils.locking.lock import Lock
 from sentry.utils.locking.manager import LockManager
@@ -216,30 +217,7 @@ class RedisBackend(Backend):
                 else:
                     raise
 
-            records = map(
-                lambda key__value__timestamp: Record(
-                    key__value__timestamp[0].decode("utf-8"),
-                    self.codec.decode(key__value__timestamp[1])
-                    if key__value__timestamp[1] is not None
-                    else None,
-                    float(key__value__timestamp[2]),
-                ),
-                response,
-            )
-
-            # If the record value is `None`, this means the record data was
-            # missing (it was presumably evicted by Redis) so we don't need to
-            # return it here.
-            filtered_records = [record for record in records if record.value is not None]
-            if len(records) != len(filtered_records):
-                logger.warning(
-                    "Filtered out missing records when fetching digest",
-                    extra={
-                        "key": key,
-                        "record_count": len(records),
-                        "filtered_record_count": len(filtered_records),
-                    },
-                )
+            records, filtered_records = self.__decode_records(key, response)
             yield filtered_records
 
             script(
@@ -249,6 +227,110 @@ class RedisBackend(Backend):
                 + [record.key for record in records],
             )
 
+    def __decode_records(self, key: str, response: Any) -> Tuple[List[Record], List[Record]]:
+        """
+        Decode the records returned by the digest script, returning all
+        records and the records which still have their contents.
+        """
+        records = [
+            Record(
+                record_key.decode("utf-8"),
+                self.codec.decode(value) if value is not None else None,
+                float(timestamp),
+            )
+            for record_key, value, timestamp in response
+        ]
+
+        # If the record value is `None`, this means the record data was
+        # missing (it was presumably evicted by Redis) so we don't need to
+        # return it here.
+        filtered_records = [record for record in records if record.value is not None]
+        if len(records) != len(filtered_records):
+            logger.warning(
+                "Filtered out missing records when fetching digest",
+                extra={
+                    "key": key,
+                    "record_count": len(records),
+                    "filtered_record_count": len(filtered_records),
+                },
+            )
+        return records, filtered_records
+
+    @contextmanager
+    def digest_many(
+        self,
+        keys: Sequence[str],
+        minimum_delay: Optional[int] = None,
+        timestamp: Optional[float] = None,
+    ) -> Any:
+        """
+        Digest several timelines with a single script call per Redis host to
+        open and to close the digests.
+
+        Timelines which are locked by another digest, or are not in the ready
+        state, are skipped.
+        """
+        if minimum_delay is None:
+            minimum_delay = self.minimum_delay
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        router = self.cluster.get_router()
+
+        with ExitStack() as stack:
+            keys_by_host: MutableMapping[int, List[str]] = defaultdict(list)
+            for key in keys:
+                try:
+                    stack.enter_context(self._get_timeline_lock(key, duration=30).acquire())
+                except UnableToAcquireLock:
+                    logger.info("Skipped locked timeline during bulk digest", extra={"key": key})
+                    continue
+                keys_by_host[router.get_host_for_key(f"{self.namespace}:t:{key}")].append(key)
+
+            all_records: MutableMapping[int, Mapping[str, List[Record]]] = {}
+            digests = {}
+            for host, host_keys in keys_by_host.items():
+                response = script(
+                    self.cluster.get_local_client(host),
+                    ["-"],
+                    [
+                        "DIGEST_OPEN_MANY",
+                        self.namespace,
+                        self.ttl,
+                        timestamp,
+                        self.capacity if self.capacity else -1,
+                    ]
+                    + host_keys,
+                )
+
+                all_records[host] = {}
+                for key, ready, records_response in response:
+                    key = key.decode("utf-8")
+                    if not ready:
+                        continue
+                    records, digests[key] = self.__decode_records(key, records_response)
+                    all_records[host][key] = records
+
+            yield digests
+
+            for host, records_by_key in all_records.items():
+                if not records_by_key:
+                    continue
+
+                arguments: List[Any] = [
+                    "DIGEST_CLOSE_MANY",
+                    self.namespace,
+                    self.ttl,
+                    timestamp,
+                    minimum_delay,
+                ]
+                for key, records in records_by_key.items():
+                    arguments.extend([key, len(records)])
+                    arguments.extend(record.key for record in records)
+
+                script(self.cluster.get_local_client(host), ["-"], arguments)
+
     def delete(self, key: str, timestamp: Optional[float] = None) -> None:
         if timestamp is None:
             timestamp = time.time()
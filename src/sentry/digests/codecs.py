@@ -1,7 +1,15 @@
 import pickle
+import uuid
 import zlib
 from typing import Any
 
+import msgpack
+
+# msgpack encodes a five element array as a single ``fixarray`` header byte.
+# zlib streams (and therefore the pickled records) never start with it.
+COMPACT_RECORD_HEADER = b"\x95"
+COMPACT_RECORD_VERSION = 1
+
 
 class Codec:
     def encode(self, value: Any) -> bytes:
@@ -17,3 +25,44 @@ class CompressedPickleCodec(Codec):
 
     def decode(self, value: bytes) -> Any:
         return pickle.loads(zlib.decompress(value))
+
+
+class CompactRecordCodec(Codec):
+    """
+    Encodes digest notifications as a small msgpack array of the event
+    reference and rule IDs instead of pickling the full event payload:
+
+        [version, project_id, event_id (16 bytes), group_id, [rule_id, ...]]
+
+    The decoded event does not carry its payload. It is fetched from
+    nodestore when accessed, or in bulk through ``eventstore.bind_nodes``.
+    Records written by ``CompressedPickleCodec`` can still be decoded, so a
+    backend can switch codecs while it holds records encoded with the old one.
+    """
+
+    fallback = CompressedPickleCodec()
+
+    def encode(self, value: Any) -> bytes:
+        event, rules = value
+        return msgpack.packb(
+            [
+                COMPACT_RECORD_VERSION,
+                event.project_id,
+                uuid.UUID(event.event_id).bytes,
+                event.group_id,
+                list(rules),
+            ]
+        )
+
+    def decode(self, value: bytes) -> Any:
+        if not value.startswith(COMPACT_RECORD_HEADER):
+            return self.fallback.decode(value)
+
+        from sentry.digests.notifications import Notification
+        from sentry.eventstore.models import Event
+
+        version, project_id, event_id, group_id, rules = msgpack.unpackb(value)
+        assert version == COMPACT_RECORD_VERSION, f"Unknown record version: {version}"
+        return Notification(
+            Event(project_id, uuid.UUID(bytes=event_id).hex, group_id=group_id), rules
+        )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import functools
 import itertools
 import logging
@@ -52,7 +53,24 @@ def event_to_record(event: Event, rules: Sequence[Rule]) -> Record:
     )
 
 
-def fetch_state(project: Project, records: Sequence[Record]) -> Mapping[str, Any]:
+def fetch_shared_state(records: Sequence[Record]) -> Mapping[str, Any]:
+    """
+    Look up the groups and rules referenced by records of several timelines
+    at once, so they can be passed to ``fetch_state`` for each timeline.
+    """
+    return {
+        "groups": Group.objects.in_bulk({record.value.event.group_id for record in records}),
+        "rules": Rule.objects.in_bulk(
+            set(itertools.chain.from_iterable(record.value.rules for record in records))
+        ),
+    }
+
+
+def fetch_state(
+    project: Project,
+    records: Sequence[Record],
+    shared_state: Mapping[str, Any] | None = None,
+) -> Mapping[str, Any]:
     # This reads a little strange, but remember that records are returned in
     # reverse chronological order, and we query the database in chronological
     # order.
@@ -60,13 +78,24 @@ def fetch_state(project: Project, records: Sequence[Record]) -> Mapping[str, Any
     start = records[-1].datetime
     end = records[0].datetime
 
-    groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
+    if shared_state is None:
+        groups = Group.objects.in_bulk(record.value.event.group_id for record in records)
+        rules = Rule.objects.in_bulk(
+            itertools.chain.from_iterable(record.value.rules for record in records)
+        )
+    else:
+        # Groups are annotated with the counts of this digest by
+        # ``attach_state``, so every digest gets its own copies.
+        group_ids = {record.value.event.group_id for record in records}
+        groups = {
+            id: copy.copy(group) for id, group in shared_state["groups"].items() if id in group_ids
+        }
+        rules = shared_state["rules"]
+
     return {
         "project": project,
         "groups": groups,
-        "rules": Rule.objects.in_bulk(
-            itertools.chain.from_iterable(record.value.rules for record in records)
-        ),
+        "rules": rules,
         "event_counts": tsdb.get_sums(tsdb.models.group, list(groups.keys()), start, end),
         "user_counts": tsdb.get_distinct_counts_totals(
             tsdb.models.users_affected_by_group, list(groups.keys()), start, end
@@ -10,6 +10,7 @@ from sentry import options
 from sentry.eventstream.kafka.consumer import SynchronizedConsumer
 from sentry.eventstream.kafka.postprocessworker import (
     _CONCURRENCY_OPTION,
+    _MAX_IN_FLIGHT_OPTION,
     ErrorsPostProcessForwarderWorker,
     PostProcessForwarderType,
     PostProcessForwarderWorker,
@@ -171,16 +172,23 @@ class KafkaEventStream(SnubaProtocolEventStream):
         )
 
         concurrency = options.get(_CONCURRENCY_OPTION)
+        max_in_flight = options.get(_MAX_IN_FLIGHT_OPTION)
         logger.info(f"Starting post process forwrader to consume {entity} messages")
         if entity == PostProcessForwarderType.TRANSACTIONS:
-            worker = TransactionsPostProcessForwarderWorker(concurrency=concurrency)
+            worker = TransactionsPostProcessForwarderWorker(
+                concurrency=concurrency, max_in_flight=max_in_flight
+            )
         elif entity == PostProcessForwarderType.ERRORS:
-            worker = ErrorsPostProcessForwarderWorker(concurrency=concurrency)
+            worker = ErrorsPostProcessForwarderWorker(
+                concurrency=concurrency, max_in_flight=max_in_flight
+            )
         else:
             # Default implementation which processes both errors and transactions
             # irrespective of values in the header. This would most likely be the case
             # for development environments.
-            worker = PostProcessForwarderWorker(concurrency=concurrency)
+            worker = PostProcessForwarderWorker(
+                concurrency=concurrency, max_in_flight=max_in_flight
+            )
 
         consumer = BatchingKafkaConsumer(
             topics=self.topic,
@@ -189,6 +197,7 @@ class KafkaEventStream(SnubaProtocolEventStream):
             max_batch_time=commit_batch_timeout_ms,
             consumer=synchronized_consumer,
             commit_on_shutdown=True,
+            consume_batch_size=options.get("post-process-forwarder:consume-batch-size"),
         )
         return consumer
 
@@ -1,6 +1,7 @@
 import functools
 import logging
 import threading
+import time
 import uuid
 from concurrent.futures import TimeoutError
 
@@ -14,15 +15,20 @@ from confluent_kafka import (
 )
 
 from sentry.eventstream.kafka.state import (
+    InvalidState,
+    MessageNotReady,
     SynchronizedPartitionState,
     SynchronizedPartitionStateManager,
 )
-from sentry.utils import kafka_config
+from sentry.utils import kafka_config, metrics
 from sentry.utils.batching_kafka_consumer import KafkaConsumerFacade
 from sentry.utils.concurrent import execute
 
 logger = logging.getLogger(__name__)
 
+# Minimum time between two reports of the per-partition synchronization gauges.
+PARTITION_METRICS_INTERVAL = 10.0
+
 
 def get_commit_data(message):
     topic, partition, group = message.key().decode("utf-8").split(":", 3)
@@ -183,6 +189,7 @@ class SynchronizedConsumer(KafkaConsumerFacade):
         ) = self.__start_commit_log_consumer()
 
         self.__positions = {}
+        self.__partition_metrics_reported_at = 0.0
 
         def commit_callback(error, partitions):
             if on_commit is not None:
@@ -330,6 +337,7 @@ class SynchronizedConsumer(KafkaConsumerFacade):
 
     def poll(self, timeout):
         self.__check_commit_log_consumer_running()
+        self.__record_partition_metrics()
 
         message = self.__consumer.poll(timeout)
         if message is None:
@@ -341,12 +349,108 @@ class SynchronizedConsumer(KafkaConsumerFacade):
         self.__partition_state_manager.validate_local_message(
             message.topic(), message.partition(), message.offset()
         )
+        self.__set_local_offset(message)
+
+        return message
+
+    def consume(self, num_messages, timeout):
+        """
+        Consume a batch of messages.
+
+        The batch size is capped by how far the commit log is ahead of the
+        local offsets of all resumed partitions. Partitions are only paused
+        after a message is returned, so a batch can still contain messages
+        that were not yet committed by the remote consumer. Those are dropped
+        and their partition is rewound to the first of them, to be consumed
+        again once the partition is resumed.
+        """
+        self.__check_commit_log_consumer_running()
+        self.__record_partition_metrics()
+
+        available = self.__get_available_message_count()
+        messages = self.__consumer.consume(
+            num_messages=max(1, min(num_messages, available)), timeout=timeout
+        )
+
+        result = []
+        rewound = set()
+        for message in messages:
+            if message.error() is not None:
+                result.append(message)
+                continue
+
+            key = (message.topic(), message.partition())
+            if key in rewound:
+                continue
+
+            try:
+                self.__partition_state_manager.validate_local_message(
+                    message.topic(), message.partition(), message.offset()
+                )
+            except (InvalidState, MessageNotReady):
+                rewound.add(key)
+                self.__consumer.seek(
+                    TopicPartition(message.topic(), message.partition(), message.offset())
+                )
+                continue
+
+            self.__set_local_offset(message)
+            result.append(message)
+
+        if rewound:
+            metrics.incr("eventstream.synchronized_consumer.rewound", amount=len(rewound))
+
+        return result
+
+    def __set_local_offset(self, message):
         self.__partition_state_manager.set_local_offset(
             message.topic(), message.partition(), message.offset() + 1
         )
         self.__positions[(message.topic(), message.partition())] = message.offset() + 1
 
-        return message
+    def __get_available_message_count(self):
+        """
+        Number of messages that were committed by the remote consumer but not
+        yet consumed locally, across all resumed partitions.
+        """
+        return sum(
+            offsets.remote - offsets.local
+            for state, offsets in self.__partition_state_manager.partitions.copy().values()
+            if state is SynchronizedPartitionState.LOCAL_BEHIND
+        )
+
+    def __record_partition_metrics(self):
+        """
+        Report the gap between the remote (commit log) and local offset of
+        every partition. A partition which is synchronized (or has an unknown
+        remote offset) is waiting on the remote consumer.
+        """
+        now = time.time()
+        if now - self.__partition_metrics_reported_at < PARTITION_METRICS_INTERVAL:
+            return
+        self.__partition_metrics_reported_at = now
+
+        for (topic, partition), (
+            state,
+            offsets,
+        ) in self.__partition_state_manager.partitions.copy().items():
+            if offsets.local is None:
+                continue
+
+            # Partition states are plain string constants, so they can be
+            # used as tag values as they are.
+            tags = {"topic": topic, "partition": partition, "state": state}
+            if offsets.remote is not None:
+                metrics.gauge(
+                    "eventstream.synchronized_consumer.remote_lag",
+                    offsets.remote - offsets.local,
+                    tags=tags,
+                )
+            metrics.gauge(
+                "eventstream.synchronized_consumer.waiting",
+                0 if state is SynchronizedPartitionState.LOCAL_BEHIND else 1,
+                tags=tags,
+            )
 
     def commit(self, *args, **kwargs):
         self.__check_commit_log_consumer_running()
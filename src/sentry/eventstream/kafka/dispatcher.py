@@ -0,0 +1,217 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Hashable,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from confluent_kafka import TopicPartition
+
+Partition = Tuple[str, int]
+
+
+class _PartitionState:
+    """
+    Tracks the outstanding offsets of a single partition.
+
+    `outstanding` holds the offsets that were submitted and are not yet part of
+    the committable prefix, in submission (and therefore offset) order.
+    """
+
+    def __init__(self) -> None:
+        self.outstanding: Deque[int] = deque()
+        self.completed: Set[int] = set()
+        self.committable: Optional[int] = None
+        self.revoked = False
+
+    def complete(self, offset: int) -> None:
+        self.completed.add(offset)
+        while self.outstanding and self.outstanding[0] in self.completed:
+            head = self.outstanding.popleft()
+            self.completed.remove(head)
+            self.committable = head + 1
+
+
+class _Task(NamedTuple):
+    state: _PartitionState
+    offset: int
+    key: Optional[Hashable]
+    function: Callable[..., Any]
+    args: Tuple[Any, ...]
+    future: Future
+
+
+class OrderedPartitionDispatcher:
+    """
+    Runs the work for Kafka messages on a thread pool and keeps track of the
+    offsets that are safe to commit for every partition.
+
+    * At most `max_in_flight` messages per partition are outstanding at once.
+      Submitting more blocks until the oldest message of that partition
+      completes.
+    * Messages which share an ordering key run one after another in the order
+      they were submitted. Messages with different keys, or without a key, run
+      concurrently.
+    * The committable offset of a partition only advances past a message once
+      it and every message before it on the partition completed. A slow message
+      holds back the commit of its own partition, but never the dispatch of
+      unrelated messages.
+
+    A failed message is never marked complete. Its exception is raised on the
+    next call to `submit`, `raise_for_errors` or `join`.
+    """
+
+    def __init__(self, concurrency: int, max_in_flight: int) -> None:
+        assert max_in_flight > 0
+        self.__executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.__max_in_flight = max_in_flight
+        self.__condition = threading.Condition()
+        self.__partitions: MutableMapping[Partition, _PartitionState] = {}
+        self.__pending_by_key: MutableMapping[Hashable, Deque[_Task]] = {}
+        self.__errors: List[BaseException] = []
+
+    def __get_state(self, topic: str, partition: int) -> _PartitionState:
+        key = (topic, partition)
+        state = self.__partitions.get(key)
+        if state is None or state.revoked:
+            state = self.__partitions[key] = _PartitionState()
+        return state
+
+    def __raise_for_errors(self) -> None:
+        if self.__errors:
+            raise self.__errors[0]
+
+    def raise_for_errors(self) -> None:
+        with self.__condition:
+            self.__raise_for_errors()
+
+    def submit(
+        self,
+        topic: str,
+        partition: int,
+        offset: int,
+        key: Optional[Hashable],
+        function: Callable[..., Any],
+        *args: Any,
+    ) -> Future:
+        future: Future = Future()
+        with self.__condition:
+            self.__raise_for_errors()
+            state = self.__get_state(topic, partition)
+            while len(state.outstanding) >= self.__max_in_flight:
+                self.__condition.wait()
+                self.__raise_for_errors()
+
+            state.outstanding.append(offset)
+            task = _Task(state, offset, key, function, args, future)
+            if key is not None:
+                pending = self.__pending_by_key.get(key)
+                if pending is not None:
+                    # An earlier message with the same key is still running,
+                    # this one is started once that is done.
+                    pending.append(task)
+                    return future
+                self.__pending_by_key[key] = deque()
+
+        self.__executor.submit(self.__run, task)
+        return future
+
+    def skip(self, topic: str, partition: int, offset: int) -> None:
+        """Record a message which needs no work, so that the committable
+        offset can move past it."""
+        with self.__condition:
+            state = self.__get_state(topic, partition)
+            if not state.outstanding:
+                state.committable = offset + 1
+            else:
+                state.outstanding.append(offset)
+                state.complete(offset)
+
+    def __run(self, task: _Task) -> None:
+        error: Optional[BaseException] = None
+        result = None
+        try:
+            result = task.function(*task.args)
+        except BaseException as e:
+            error = e
+
+        next_task = None
+        with self.__condition:
+            if error is None:
+                task.state.complete(task.offset)
+            else:
+                self.__errors.append(error)
+
+            if task.key is not None:
+                pending = self.__pending_by_key[task.key]
+                if pending:
+                    next_task = pending.popleft()
+                else:
+                    del self.__pending_by_key[task.key]
+
+            self.__condition.notify_all()
+
+        if next_task is not None:
+            self.__executor.submit(self.__run, next_task)
+
+        if error is None:
+            task.future.set_result(result)
+        else:
+            task.future.set_exception(error)
+
+    def get_in_flight(self) -> int:
+        with self.__condition:
+            return sum(len(state.outstanding) for state in self.__partitions.values())
+
+    def join(self, partitions: Optional[Sequence[Partition]] = None) -> None:
+        """
+        Wait until all submitted messages of `partitions` (or of every
+        partition if `None`) completed. Joined partitions are considered
+        revoked: their state is dropped once their offsets were returned by
+        `get_committable_offsets`.
+        """
+        with self.__condition:
+            if partitions is None:
+                states = list(self.__partitions.values())
+            else:
+                states = [self.__partitions[p] for p in partitions if p in self.__partitions]
+
+            while any(state.outstanding for state in states):
+                self.__raise_for_errors()
+                self.__condition.wait()
+            self.__raise_for_errors()
+
+            if partitions is not None:
+                for state in states:
+                    state.revoked = True
+
+    def get_committable_offsets(self) -> Sequence[TopicPartition]:
+        with self.__condition:
+            offsets = [
+                TopicPartition(topic, partition, state.committable)
+                for (topic, partition), state in self.__partitions.items()
+                if state.committable is not None
+            ]
+            for key, state in list(self.__partitions.items()):
+                if state.revoked:
+                    del self.__partitions[key]
+            return offsets
+
+    def resize(self, concurrency: int) -> None:
+        """Wait for all outstanding work and replace the thread pool."""
+        self.join()
+        self.__executor.shutdown(wait=True)
+        self.__executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.__executor.shutdown(wait=wait)
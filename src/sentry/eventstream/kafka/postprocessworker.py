@@ -6,6 +6,7 @@ from enum import Enum
 from typing import Any, Generator, Mapping, Optional, Sequence
 
 from sentry import options
+from sentry.eventstream.kafka.dispatcher import OrderedPartitionDispatcher
 from sentry.eventstream.kafka.protocol import (
     decode_bool,
     get_task_kwargs_for_message,
@@ -22,7 +23,9 @@ Message = Any
 _DURATION_METRIC = "eventstream.duration"
 _CONCURRENCY_METRIC = "eventstream.concurrency"
 _MESSAGES_METRIC = "eventstream.messages"
+_IN_FLIGHT_METRIC = "eventstream.in_flight"
 _CONCURRENCY_OPTION = "post-process-forwarder:concurrency"
+_MAX_IN_FLIGHT_OPTION = "post-process-forwarder:max-in-flight"
 _TRANSACTION_FORWARDER_HEADER = "transaction_forwarder"
 
 
@@ -100,6 +103,11 @@ def _get_task_kwargs_and_dispatch(message: Message):
     dispatch_post_process_group_task(**task_kwargs)
 
 
+def _dispatch(partition: int, task_kwargs: Mapping[str, Any]) -> None:
+    _record_metrics(partition, task_kwargs)
+    dispatch_post_process_group_task(**task_kwargs)
+
+
 class PostProcessForwarderWorker(AbstractBatchWorker):
     """
     Implementation of the AbstractBatchWorker which would be used for post process forwarder.
@@ -107,13 +115,26 @@ class PostProcessForwarderWorker(AbstractBatchWorker):
     because we want to be able to change the concurrency during runtime. This should be replaced
     by a thread pool executor once stress tests experiments are over and we start using the
     CLI arguments to set concurrency.
+
+    If `max_in_flight` is set, messages are dispatched through an `OrderedPartitionDispatcher`
+    instead: up to `max_in_flight` messages per partition are in flight at once, messages of the
+    same group are dispatched in order and `flush_batch` does not wait for the batch. Only the
+    offsets below the first incomplete message of each partition are committed.
     """
 
-    def __init__(self, concurrency: Optional[int] = 1) -> None:
+    def __init__(self, concurrency: Optional[int] = 1, max_in_flight: Optional[int] = None) -> None:
         self.__current_concurrency = concurrency
         logger.info(f"Starting post process forwarder with {concurrency} threads")
         metrics.incr(_CONCURRENCY_METRIC, amount=concurrency)
-        self.__executor = ThreadPoolExecutor(max_workers=self.__current_concurrency)
+        if max_in_flight:
+            self.__executor = None
+            self.__dispatcher = OrderedPartitionDispatcher(concurrency, max_in_flight)
+        else:
+            self.__executor = ThreadPoolExecutor(max_workers=self.__current_concurrency)
+            self.__dispatcher = None
+
+    def _should_forward(self, message: Message) -> bool:
+        return True
 
     def process_message(self, message: Message) -> Optional[Future]:
         """
@@ -121,15 +142,34 @@ class PostProcessForwarderWorker(AbstractBatchWorker):
         is stored in the batch of batching_kafka_consumer and provided as an argument to flush_batch. If None is
         returned, the batching_kafka_consumer will not add the return value to the batch.
         """
-        return self.__executor.submit(_get_task_kwargs_and_dispatch, message)
+        if self.__dispatcher is None:
+            if not self._should_forward(message):
+                return None
+            return self.__executor.submit(_get_task_kwargs_and_dispatch, message)
+
+        topic, partition, offset = message.topic(), message.partition(), message.offset()
+        task_kwargs = _get_task_kwargs(message) if self._should_forward(message) else None
+        if not task_kwargs:
+            self.__dispatcher.skip(topic, partition, offset)
+            return None
+
+        # Transactions have no group and don't need to be ordered.
+        return self.__dispatcher.submit(
+            topic, partition, offset, task_kwargs["group_id"], _dispatch, partition, task_kwargs
+        )
 
     def flush_batch(self, batch: Optional[Sequence[Future]]) -> None:
         """
         For all work which was submitted to the thread pool executor, we need to ensure that if an exception was
         raised, then we raise it in the main thread. This is needed so that processing can be stopped in such
         cases.
+
+        Work submitted to the dispatcher is not waited for, only errors of already completed work are raised.
         """
-        if batch:
+        if self.__dispatcher is not None:
+            self.__dispatcher.raise_for_errors()
+            metrics.gauge(_IN_FLIGHT_METRIC, self.__dispatcher.get_in_flight())
+        elif batch:
             for future in as_completed(batch):
                 exc = future.exception()
                 if exc is not None:
@@ -143,12 +183,29 @@ class PostProcessForwarderWorker(AbstractBatchWorker):
                 f"Switching post-process-forwarder from {self.__current_concurrency} to {new_concurrency} worker threads"
             )
             metrics.incr(_CONCURRENCY_METRIC, amount=new_concurrency)
-            self.__executor.shutdown(wait=True)
-            self.__executor = ThreadPoolExecutor(max_workers=new_concurrency)
+            if self.__dispatcher is not None:
+                self.__dispatcher.resize(new_concurrency)
+            else:
+                self.__executor.shutdown(wait=True)
+                self.__executor = ThreadPoolExecutor(max_workers=new_concurrency)
             self.__current_concurrency = new_concurrency
 
+    def join(self, partitions=None) -> None:
+        if self.__dispatcher is not None:
+            self.__dispatcher.join(
+                None if partitions is None else [(p.topic, p.partition) for p in partitions]
+            )
+
+    def get_committable_offsets(self):
+        if self.__dispatcher is not None:
+            return self.__dispatcher.get_committable_offsets()
+        return None
+
     def shutdown(self) -> None:
-        self.__executor.shutdown()
+        if self.__dispatcher is not None:
+            self.__dispatcher.shutdown()
+        else:
+            self.__executor.shutdown()
 
 
 class ErrorsPostProcessForwarderWorker(PostProcessForwarderWorker):
@@ -160,17 +217,14 @@ class ErrorsPostProcessForwarderWorker(PostProcessForwarderWorker):
     2. _TRANSACTION_FORWARDER_HEADER is False in the kafka headers.
     """
 
-    def process_message(self, message: Message) -> Optional[Future]:
+    def _should_forward(self, message: Message) -> bool:
         headers = {header: value for header, value in message.headers()}
 
         # Backwards-compatibility case for messages missing header.
         if _TRANSACTION_FORWARDER_HEADER not in headers:
-            return super().process_message(message)
-
-        if decode_bool(headers.get(_TRANSACTION_FORWARDER_HEADER)) is False:
-            return super().process_message(message)
+            return True
 
-        return None
+        return decode_bool(headers.get(_TRANSACTION_FORWARDER_HEADER)) is False
 
 
 class TransactionsPostProcessForwarderWorker(PostProcessForwarderWorker):
@@ -179,14 +233,11 @@ class TransactionsPostProcessForwarderWorker(PostProcessForwarderWorker):
     1. _TRANSACTION_FORWARDER_HEADER is True in the kafka headers.
     """
 
-    def process_message(self, message: Message) -> Optional[Future]:
+    def _should_forward(self, message: Message) -> bool:
         headers = {header: value for header, value in message.headers()}
 
         # Backwards-compatibility for messages missing headers.
         if _TRANSACTION_FORWARDER_HEADER not in headers:
-            return None
+            return False
 
-        if decode_bool(headers.get(_TRANSACTION_FORWARDER_HEADER)) is True:
-            return super().process_message(message)
-
-        return None
+        return decode_bool(headers.get(_TRANSACTION_FORWARDER_HEADER)) is True
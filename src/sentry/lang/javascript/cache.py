@@ -1,8 +1,13 @@
+import threading
+from collections import OrderedDict
+
 from symbolic import SourceView
 
+from sentry import options
+from sentry.utils import metrics
 from sentry.utils.strings import codec_lookup
 
-__all__ = ["SourceCache", "SourceMapCache"]
+__all__ = ["SourceCache", "SourceMapCache", "ParsedSourceCache", "parsed_source_cache"]
 
 
 def is_utf8(codec):
@@ -10,6 +15,20 @@ def is_utf8(codec):
     return name in ("utf-8", "ascii")
 
 
+def make_source_view(source, encoding=None):
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    # If an encoding is provided and it's not utf-8 compatible
+    # we try to re-encoding the source and create a source view
+    # from it.
+    elif encoding is not None and not is_utf8(encoding):
+        try:
+            source = source.decode(encoding).encode("utf-8")
+        except UnicodeError:
+            pass
+    return SourceView.from_bytes(source)
+
+
 class SourceCache:
     def __init__(self):
         self._cache = {}
@@ -40,17 +59,7 @@ class SourceCache:
         url = self._get_canonical_url(url)
 
         if not isinstance(source, SourceView):
-            if isinstance(source, str):
-                source = source.encode("utf-8")
-            # If an encoding is provided and it's not utf-8 compatible
-            # we try to re-encoding the source and create a source view
-            # from it.
-            elif encoding is not None and not is_utf8(encoding):
-                try:
-                    source = source.decode(encoding).encode("utf-8")
-                except UnicodeError:
-                    pass
-            source = SourceView.from_bytes(source)
+            source = make_source_view(source, encoding)
         self._cache[url] = source
 
     def add_error(self, url, error):
@@ -90,3 +99,80 @@ class SourceMapCache:
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class ParsedSourceCache:
+    """
+    A process wide LRU of parsed ``SourceView`` and ``SourceMapView`` objects,
+    so that events of the same release don't parse the same files again.
+
+    Entries are keyed by the caller, which must include a checksum of the
+    contents in the key, and the kind of the entry as its first item. The
+    size of an entry is estimated from the size of the contents it was parsed
+    from, multiplied by ``PARSED_SIZE_FACTORS`` of its kind: a ``SourceView``
+    keeps the decoded lines of the file, and a parsed ``SourceMapView`` keeps
+    an index of every token next to the names and sources of the map. The
+    total size is bounded by the ``sourcemaps.parsed-cache-size`` option, and
+    entries larger than a quarter of that are parsed without being cached.
+    """
+
+    PARSED_SIZE_FACTORS = {"source": 2, "sourcemap": 5}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_or_parse(self, key, body, parse):
+        """
+        Return the cached value for ``key``, or ``parse(body)`` which is
+        cached if it is small enough.
+        """
+        max_size = options.get("sourcemaps.parsed-cache-size")
+        if not max_size:
+            return parse(body)
+
+        kind = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            metrics.incr("sourcemaps.parsed_cache", tags={"kind": kind, "result": "hit"})
+            return entry[0]
+
+        value = parse(body)
+        size = len(body) * self.PARSED_SIZE_FACTORS.get(kind, 1)
+        if size > max_size // 4:
+            metrics.incr("sourcemaps.parsed_cache", tags={"kind": kind, "result": "rejected"})
+            return value
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._size += size
+            while self._size > max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+            total_size, entries = self._size, len(self._entries)
+
+        metrics.incr("sourcemaps.parsed_cache", tags={"kind": kind, "result": "miss"})
+        metrics.gauge("sourcemaps.parsed_cache.size", total_size)
+        metrics.gauge("sourcemaps.parsed_cache.entries", entries)
+        return value
+
+
+parsed_source_cache = ParsedSourceCache()
@@ -1,10 +1,14 @@
 import base64
 import errno
+import hashlib
 import logging
 import re
 import sys
+import threading
 import time
 import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
 from os.path import splitext
@@ -13,17 +17,24 @@ from urllib.parse import urlsplit
 
 import sentry_sdk
 from django.conf import settings
+from django.db import connections
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 from requests.utils import get_encoding_from_headers
+from sentry_sdk import Hub
 from symbolic import SourceMapView
 
 from sentry import http, options
 from sentry.interfaces.stacktrace import Stacktrace
 from sentry.models import EventError, Organization, ReleaseFile
-from sentry.models.releasefile import ARTIFACT_INDEX_FILENAME, ReleaseArchive, read_artifact_index
+from sentry.models.releasefile import (
+    ARTIFACT_INDEX_FILENAME,
+    ReleaseArchive,
+    get_artifact_index_releasefile,
+    load_artifact_index,
+)
 from sentry.stacktraces.processing import StacktraceProcessor
-from sentry.utils import json, metrics
+from sentry.utils import metrics
 
 # separate from either the source cache or the source maps cache, this is for
 # holding the results of attempting to fetch both kinds of files, either from the
@@ -36,7 +47,7 @@ from sentry.utils.retries import ConditionalRetryPolicy, exponential_delay
 from sentry.utils.safe import get_path
 from sentry.utils.urls import non_standard_url_join
 
-from .cache import SourceCache, SourceMapCache
+from .cache import SourceCache, SourceMapCache, make_source_view, parsed_source_cache
 
 __all__ = ["JavaScriptStacktraceProcessor"]
 
@@ -75,6 +86,11 @@ MAX_RESOURCE_FETCHES = 100
 
 CACHE_MAX_VALUE_SIZE = settings.SENTRY_CACHE_MAX_VALUE_SIZE
 
+# the maximum number of decoded artifact indexes kept in memory
+MAX_CACHED_ARTIFACT_INDEXES = 32
+_artifact_indexes: "OrderedDict[str, dict]" = OrderedDict()
+_artifact_indexes_lock = threading.Lock()
+
 logger = logging.getLogger(__name__)
 
 
@@ -397,24 +413,57 @@ def get_from_archive(url: str, archive: ReleaseArchive) -> Tuple[bytes, dict]:
 
 @metrics.wraps("sourcemaps.load_artifact_index")
 def get_artifact_index(release, dist):
+    """
+    Get the artifact index of the release and dist.
+
+    Decoded indexes are kept in process by the checksum of their file, the
+    Django cache only holds the checksum of the current index. The returned
+    index is shared and must not be modified.
+    """
     dist_name = dist and dist.name or None
 
     ident = ReleaseFile.get_ident(ARTIFACT_INDEX_FILENAME, dist_name)
-    cache_key = f"artifact-index:v1:{release.id}:{ident}"
-    result = cache.get(cache_key)
-    if result == -1:
-        index = None
-    elif result:
-        index = json.loads(result)
-    else:
-        index = read_artifact_index(release, dist, use_cache=True)
-        cache_value = -1 if index is None else json.dumps(index)
+    cache_key = f"artifact-index:v2:{release.id}:{ident}"
+    checksum = cache.get(cache_key)
+    if checksum == -1:
+        return None
+
+    releasefile = None
+    if checksum is None:
+        releasefile = get_artifact_index_releasefile(release, dist)
+        checksum = get_artifact_index_checksum(releasefile)
         # Only cache for a short time to keep the manifest up-to-date
-        cache.set(cache_key, cache_value, timeout=60)
+        cache.set(cache_key, -1 if checksum is None else checksum, timeout=60)
+        if checksum is None:
+            return None
+
+    with _artifact_indexes_lock:
+        index = _artifact_indexes.get(checksum)
+        if index is not None:
+            _artifact_indexes.move_to_end(checksum)
+            return index
+
+    if releasefile is None:
+        releasefile = get_artifact_index_releasefile(release, dist)
+        if releasefile is None:
+            return None
+        checksum = get_artifact_index_checksum(releasefile)
+
+    index = load_artifact_index(releasefile, use_cache=True)
+    with _artifact_indexes_lock:
+        _artifact_indexes[checksum] = index
+        while len(_artifact_indexes) > MAX_CACHED_ARTIFACT_INDEXES:
+            _artifact_indexes.popitem(last=False)
 
     return index
 
 
+def get_artifact_index_checksum(releasefile) -> Optional[str]:
+    if releasefile is None:
+        return None
+    return releasefile.file.checksum or f"file-{releasefile.file.id}"
+
+
 def get_index_entry(release, dist, url) -> Optional[dict]:
     try:
         index = get_artifact_index(release, dist)
@@ -508,12 +557,75 @@ def fetch_release_archive_for_url(release, dist, url) -> Optional[IO]:
             return file_
 
 
+@metrics.wraps("sourcemaps.get_release_archive")
+def get_release_archive_for_url(release, dist, url) -> Optional[ReleaseArchive]:
+    """Get the memory mapped release archive which contains ``url``.
+
+    The archive is shared between callers and must not be closed.
+    """
+    info = get_index_entry(release, dist, url)
+    if info is None:
+        return None
+
+    archive_ident = info["archive_ident"]
+    cache_key = get_release_file_cache_key(release_id=release.id, releasefile_ident=archive_ident)
+    if cache.get(cache_key) == -1:
+        return None
+
+    try:
+        releasefile = ReleaseFile.objects.filter(
+            release_id=release.id, dist_id=dist.id if dist else dist, ident=archive_ident
+        ).select_related("file")[0]
+    except IndexError:
+        # This should not happen when there is an archive_ident in the manifest
+        logger.error("sourcemaps.missing_archive", exc_info=sys.exc_info())
+        # Cache as nonexistent:
+        cache.set(cache_key, -1, 60)
+        return None
+
+    try:
+        return fetch_retry_policy(lambda: ReleaseFile.archive_cache.get(releasefile.file))
+    except Exception:
+        logger.error("sourcemaps.read_archive_failed", exc_info=sys.exc_info())
+        return None
+
+
 def compress(fp: IO) -> Tuple[bytes, bytes]:
     """Alternative for compress_file when fp does not support chunks"""
     content = fp.read()
     return zlib.compress(content), content
 
 
+def fetch_from_archive(url, release, archive, cache_key, cache_key_meta):
+    """
+    Read ``url`` from ``archive``. Returns whether the archive was read and the
+    result, which is ``None`` if the archive does not contain the file.
+    """
+    try:
+        fp, headers = get_from_archive(url, archive)
+    except KeyError:
+        # The manifest mapped the url to an archive, but the file
+        # is not there.
+        logger.error("Release artifact %r not found in archive of release %s", url, release.id)
+        cache.set(cache_key, -1, 60)
+        return True, None
+    except Exception as exc:
+        logger.error("Failed to read %s from release %s", url, release.id, exc_info=exc)
+        # TODO(jjbayer): cache error and return here
+        return False, None
+
+    result = fetch_and_cache_artifact(
+        url,
+        lambda: fp,
+        cache_key,
+        cache_key_meta,
+        headers,
+        # Cannot use `compress_file` because `ZipExtFile` does not support chunks
+        compress_fn=compress,
+    )
+    return True, result
+
+
 def fetch_release_artifact(url, release, dist):
     """
     Get a release artifact either by extracting it or fetching it directly.
@@ -532,51 +644,36 @@ def fetch_release_artifact(url, release, dist):
         return result_from_cache(url, result)
 
     start = time.monotonic()
-    archive_file = fetch_release_archive_for_url(release, dist, url)
-    if archive_file is not None:
-        try:
-            archive = ReleaseArchive(archive_file)
-        except Exception as exc:
-            archive_file.seek(0)
-            logger.error(
-                "Failed to initialize archive for release %s",
-                release.id,
-                exc_info=exc,
-                extra={"contents": archive_file.read(256)},
-            )
-            # TODO(jjbayer): cache error and return here
-        else:
-            with archive:
-                try:
-                    fp, headers = get_from_archive(url, archive)
-                except KeyError:
-                    # The manifest mapped the url to an archive, but the file
-                    # is not there.
-                    logger.error(
-                        "Release artifact %r not found in archive %s", url, archive_file.id
-                    )
-                    cache.set(cache_key, -1, 60)
-                    metrics.timing(
-                        "sourcemaps.release_artifact_from_archive", time.monotonic() - start
-                    )
-                    return None
-                except Exception as exc:
-                    logger.error("Failed to read %s from release %s", url, release.id, exc_info=exc)
-                    # TODO(jjbayer): cache error and return here
-                else:
-                    result = fetch_and_cache_artifact(
-                        url,
-                        lambda: fp,
-                        cache_key,
-                        cache_key_meta,
-                        headers,
-                        # Cannot use `compress_file` because `ZipExtFile` does not support chunks
-                        compress_fn=compress,
+    if options.get("releasefile.mmap-archives"):
+        archive = get_release_archive_for_url(release, dist, url)
+        if archive is not None:
+            found, result = fetch_from_archive(url, release, archive, cache_key, cache_key_meta)
+            if found:
+                metrics.timing("sourcemaps.release_artifact_from_archive", time.monotonic() - start)
+                return result
+    else:
+        archive_file = fetch_release_archive_for_url(release, dist, url)
+        if archive_file is not None:
+            try:
+                archive = ReleaseArchive(archive_file)
+            except Exception as exc:
+                archive_file.seek(0)
+                logger.error(
+                    "Failed to initialize archive for release %s",
+                    release.id,
+                    exc_info=exc,
+                    extra={"contents": archive_file.read(256)},
+                )
+                # TODO(jjbayer): cache error and return here
+            else:
+                with archive:
+                    found, result = fetch_from_archive(
+                        url, release, archive, cache_key, cache_key_meta
                     )
+                if found:
                     metrics.timing(
                         "sourcemaps.release_artifact_from_archive", time.monotonic() - start
                     )
-
                     return result
 
     # Fall back to maintain compatibility with old releases and versions of
@@ -740,13 +837,29 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
         )
         body = result.body
     try:
-        return SourceMapView.from_json_bytes(body)
+        if is_data_uri(url):
+            return SourceMapView.from_json_bytes(body)
+        return parsed_source_cache.get_or_parse(
+            get_parsed_cache_key("sourcemap", release, dist, url, body),
+            body,
+            SourceMapView.from_json_bytes,
+        )
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(str(exc), exc_info=True)
         raise UnparseableSourcemap({"url": http.expose_url(url)})
 
 
+def get_parsed_cache_key(kind, release, dist, url, body, *extra):
+    return (
+        kind,
+        release.id if release else None,
+        dist.id if dist else None,
+        url,
+        hashlib.sha1(body).hexdigest(),
+    ) + extra
+
+
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
 
@@ -1120,79 +1233,122 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         map (if any).
         """
 
-        sourcemaps = self.sourcemaps
-        cache = self.cache
-
         self.fetch_count += 1
 
         if self.fetch_count > self.max_fetches:
-            cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
+            self.cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
             return
 
         # TODO: respect cache-control/max-age headers to some extent
         logger.debug("Attempting to cache source %r", filename)
-        try:
-            # this both looks in the database and tries to scrape the internet
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
-            ) as span:
-                span.set_data("filename", filename)
-                result = fetch_file(
-                    filename,
+        result, error, _ = self._fetch(fetch_file, filename, op="fetch_file")
+        sourcemap_url = self._cache_file(filename, result, error)
+        if not sourcemap_url or sourcemap_url in self.sourcemaps:
+            return
+
+        sourcemap_view, error, _ = self._fetch(fetch_sourcemap, sourcemap_url, op="fetch_sourcemap")
+        self._cache_sourcemap(sourcemap_url, sourcemap_view, error, [filename])
+
+    def _fetch(self, fetch_fn, url, op):
+        """
+        Fetch a file or source map with ``fetch_fn``. Returns the result, the
+        ``BadSource`` error if fetching failed, and the time spent.
+        """
+        start = time.monotonic()
+        # this both looks in the database and tries to scrape the internet
+        with sentry_sdk.start_span(op=f"JavaScriptStacktraceProcessor.cache_source.{op}") as span:
+            span.set_data("url", url)
+            try:
+                result = fetch_fn(
+                    url,
                     project=self.project,
                     release=self.release,
                     dist=self.dist,
                     allow_scraping=self.allow_scraping,
                 )
-        except http.BadSource as exc:
+            except http.BadSource as exc:
+                return None, exc, time.monotonic() - start
+        return result, None, time.monotonic() - start
+
+    def _fetch_many(self, fetch_fn, urls, op, executor):
+        """
+        Fetch all ``urls`` with ``fetch_fn``, on ``executor`` if given. Returns
+        a mapping of url to result and error, and the summed fetch time.
+        """
+        if executor is None or len(urls) < 2:
+            results = [self._fetch(fetch_fn, url, op) for url in urls]
+        else:
+
+            def fetch_in_thread(url, hub):
+                try:
+                    with hub:
+                        return self._fetch(fetch_fn, url, op)
+                finally:
+                    # Worker threads open their own database connections
+                    connections.close_all()
+
+            # Every fetch gets a hub of its own, so that its spans and errors
+            # are attached to the event's transaction.
+            hubs = [Hub(Hub.current) for _ in urls]
+            results = list(executor.map(fetch_in_thread, urls, hubs))
+
+        fetched = {url: (result, error) for url, (result, error, _) in zip(urls, results)}
+        return fetched, sum(duration for _, _, duration in results)
+
+    def _cache_file(self, filename, result, error):
+        """
+        Cache a fetched source file, or the error fetching it. Returns the
+        URL of the source map of the file, if any.
+        """
+        if error is not None:
             # most people don't upload release artifacts for their third-party libraries,
             # so ignore missing node_modules files
-            if exc.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
+            if error.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
                 pass
             else:
-                cache.add_error(filename, exc.data)
+                self.cache.add_error(filename, error.data)
 
             # either way, there's no more for us to do here, since we don't have
             # a valid file to cache
-            return
-        cache.add(filename, result.body, result.encoding)
-        cache.alias(result.url, filename)
+            return None
+
+        source_view = parsed_source_cache.get_or_parse(
+            get_parsed_cache_key(
+                "source", self.release, self.dist, result.url, result.body, result.encoding
+            ),
+            result.body,
+            lambda body: make_source_view(body, result.encoding),
+        )
+        self.cache.add(filename, source_view)
+        self.cache.alias(result.url, filename)
 
         sourcemap_url = discover_sourcemap(result)
         if not sourcemap_url:
-            return
+            return None
 
         logger.debug(
             "Found sourcemap URL %r for minified script %r", sourcemap_url[:256], result.url
         )
-        sourcemaps.link(filename, sourcemap_url)
-        if sourcemap_url in sourcemaps:
-            return
+        self.sourcemaps.link(filename, sourcemap_url)
+        return sourcemap_url
 
-        # pull down sourcemap
-        try:
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
-            ) as span:
-                span.set_data("sourcemap_url", sourcemap_url)
-                sourcemap_view = fetch_sourcemap(
-                    sourcemap_url,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
-        except http.BadSource as exc:
-            # we don't perform the same check here as above, because if someone has
+    def _cache_sourcemap(self, sourcemap_url, sourcemap_view, error, filenames):
+        """
+        Cache a fetched source map and its inlined sources, or record the error
+        fetching it on all ``filenames`` that reference it.
+        """
+        if error is not None:
+            # we don't perform the same check here as in `_cache_file`, because if someone has
             # uploaded a node_modules file, which has a sourceMappingURL, they
             # presumably would like it mapped (and would like to know why it's not
             # working, if that's the case). If they're not looking for it to be
             # mapped, then they shouldn't be uploading the source file in the
             # first place.
-            cache.add_error(filename, exc.data)
+            for filename in filenames:
+                self.cache.add_error(filename, error.data)
             return
 
-        sourcemaps.add(sourcemap_url, sourcemap_view)
+        self.sourcemaps.add(sourcemap_url, sourcemap_view)
 
         # cache any inlined sources
         for src_id, source_name in sourcemap_view.iter_sources():
@@ -1204,6 +1360,10 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         """
         Fetch all sources that we know are required (being referenced directly
         in frames).
+
+        All source files are fetched first, followed by all source maps they
+        reference. Each stage runs on a thread pool of up to
+        ``sourcemaps.fetch-concurrency`` threads.
         """
         pending_file_list = set()
         for f in frames:
@@ -1221,12 +1381,53 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f["abs_path"])
 
-        for idx, filename in enumerate(pending_file_list):
+        filenames = []
+        for filename in pending_file_list:
+            self.fetch_count += 1
+            if self.fetch_count > self.max_fetches:
+                self.cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
+            else:
+                filenames.append(filename)
+
+        if not filenames:
+            return
+
+        concurrency = min(options.get("sourcemaps.fetch-concurrency"), len(filenames))
+        executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+        start = time.monotonic()
+        try:
             with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.populate_source_cache.cache_source"
-            ) as span:
-                span.set_data("filename", filename)
-                self.cache_source(filename=filename)
+                op="JavaScriptStacktraceProcessor.populate_source_cache.fetch_files"
+            ):
+                files, fetch_time = self._fetch_many(fetch_file, filenames, "fetch_file", executor)
+
+            filenames_by_sourcemap = {}
+            for filename in filenames:
+                result, error = files[filename]
+                sourcemap_url = self._cache_file(filename, result, error)
+                if sourcemap_url and sourcemap_url not in self.sourcemaps:
+                    filenames_by_sourcemap.setdefault(sourcemap_url, []).append(filename)
+
+            with sentry_sdk.start_span(
+                op="JavaScriptStacktraceProcessor.populate_source_cache.fetch_sourcemaps"
+            ):
+                sourcemaps, sourcemap_fetch_time = self._fetch_many(
+                    fetch_sourcemap, list(filenames_by_sourcemap), "fetch_sourcemap", executor
+                )
+            fetch_time += sourcemap_fetch_time
+
+            for sourcemap_url, sourcemap_filenames in filenames_by_sourcemap.items():
+                sourcemap_view, error = sourcemaps[sourcemap_url]
+                self._cache_sourcemap(sourcemap_url, sourcemap_view, error, sourcemap_filenames)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+        tags = {"concurrency": concurrency}
+        metrics.timing(
+            "sourcemaps.populate_source_cache.wall_time", time.monotonic() - start, tags=tags
+        )
+        metrics.timing("sourcemaps.populate_source_cache.fetch_time", fetch_time, tags=tags)
 
     def close(self):
         StacktraceProcessor.close(self)
@@ -1,9 +1,18 @@
 import base64
+import copy
+import hashlib
+import heapq
+import itertools
 import logging
+import os
 import random
 import sys
+import threading
 import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from copy import deepcopy
 from urllib.parse import urljoin
 
@@ -23,6 +32,12 @@ from sentry.utils import json, metrics, safe
 
 MAX_ATTEMPTS = 3
 REQUEST_CACHE_TIMEOUT = 3600
+# The maximum number of stacktraces symbolicated in one batched request.
+MAX_BATCH_STACKTRACES = 256
+# How long a batched request is polled before its events give up on it.
+BATCH_TIMEOUT = 60
+# The number of batched requests sent or polled at the same time.
+BATCH_CONCURRENCY = 4
 INTERNAL_SOURCE_NAME = "sentry:project"
 
 logger = logging.getLogger(__name__)
@@ -131,6 +146,10 @@ def _task_id_cache_key_for_event(project_id, event_id):
     return f"symbolicator:{event_id}:{project_id}"
 
 
+def _batch_timeout_cache_key_for_event(project_id, event_id):
+    return f"symbolicator:batch-timeout:{event_id}:{project_id}"
+
+
 class Symbolicator:
     def __init__(self, project, event_id):
         symbolicator_options = options.get("symbolicator.options")
@@ -153,6 +172,7 @@ class Symbolicator:
         )
 
         self.task_id_cache_key = _task_id_cache_key_for_event(project.id, event_id)
+        self.batch_timeout_cache_key = _batch_timeout_cache_key_for_event(project.id, event_id)
 
     def _process(self, create_task, task_name):
         task_id = default_cache.get(self.task_id_cache_key)
@@ -213,6 +233,25 @@ class Symbolicator:
         )
 
     def process_payload(self, stacktraces, modules, signal=None):
+        window = options.get("symbolicator.batch-window")
+        if (
+            window > 0
+            and not default_cache.get(self.task_id_cache_key)
+            and not default_cache.get(self.batch_timeout_cache_key)
+        ):
+            try:
+                return batcher.symbolicate(self.sess, stacktraces, modules, signal, window)
+            except FutureTimeoutError:
+                # Free the worker and symbolicate the event on its own when
+                # it is retried, like a pending task.
+                metrics.incr("events.symbolicator.batch.timeout")
+                default_cache.set(self.batch_timeout_cache_key, True, REQUEST_CACHE_TIMEOUT)
+                raise RetrySymbolication(retry_after=settings.SYMBOLICATOR_MAX_RETRY_AFTER)
+            except Exception:
+                # Symbolicate the event on its own, below.
+                logger.warning("symbolicator.batch.failed", exc_info=True)
+                metrics.incr("events.symbolicator.batch.fallback")
+
         return self._process(
             lambda: self.sess.symbolicate_stacktraces(
                 stacktraces=stacktraces, modules=modules, signal=signal
@@ -225,6 +264,10 @@ class TaskIdNotFound(Exception):
     pass
 
 
+class BatchFailed(Exception):
+    pass
+
+
 class ServiceUnavailable(Exception):
     pass
 
@@ -406,6 +449,70 @@ def get_options_for_project(project):
     }
 
 
+class SourcesCache:
+    """
+    A process local LRU cache of parsed custom symbol sources.
+
+    Entries are keyed by the raw ``sentry:symbol_sources`` option of a
+    project. The option is replaced whenever the sources change, so it is
+    its own version and a changed config is parsed again right away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_or_build(self, key, build, max_entries):
+        with self._lock:
+            sources = self._entries.get(key)
+            if sources is not None:
+                self._entries.move_to_end(key)
+
+        metrics.incr(
+            "symbolicator.sources_cache", tags={"result": "miss" if sources is None else "hit"}
+        )
+        if sources is None:
+            sources = build()
+            with self._lock:
+                self._entries[key] = sources
+                while len(self._entries) > max_entries:
+                    self._entries.popitem(last=False)
+
+        return deepcopy(sources)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+sources_cache = SourcesCache()
+
+
+def _parse_custom_sources(sources_config):
+    custom_sources = parse_sources(sources_config)
+    return [
+        normalize_user_source(source)
+        for source in custom_sources
+        if source["type"] != "appStoreConnect"
+    ]
+
+
+def get_custom_sources(project_id, sources_config):
+    """
+    Returns the parsed custom sources of a project from its
+    ``sentry:symbol_sources`` option.
+    """
+    max_entries = options.get("symbolicator.sources-cache-size")
+    if max_entries <= 0:
+        return _parse_custom_sources(sources_config)
+
+    return sources_cache.get_or_build(
+        (project_id, sources_config),
+        lambda: _parse_custom_sources(sources_config),
+        max_entries,
+    )
+
+
 def get_sources_for_project(project):
     """
     Returns a list of symbol sources for this project.
@@ -433,12 +540,7 @@ def get_sources_for_project(project):
 
     if sources_config:
         try:
-            custom_sources = parse_sources(sources_config)
-            sources.extend(
-                normalize_user_source(source)
-                for source in custom_sources
-                if source["type"] != "appStoreConnect"
-            )
+            sources.extend(get_custom_sources(project.id, sources_config))
         except InvalidSourcesError:
             # Source configs should be validated when they are saved. If this
             # did not happen, this indicates a bug. Record this, but do not stop
@@ -472,6 +574,22 @@ def get_sources_for_project(project):
     return sources
 
 
+_pooled_sessions = threading.local()
+
+
+def get_pooled_session():
+    """
+    Returns the HTTP session of this thread. The session is kept for the life
+    of the worker so that connections to symbolicator are reused.
+    """
+    session = getattr(_pooled_sessions, "session", None)
+    if session is None or _pooled_sessions.pid != os.getpid():
+        # Connections of a parent process must not be shared after forking.
+        session = _pooled_sessions.session = Session()
+        _pooled_sessions.pid = os.getpid()
+    return session
+
+
 class SymbolicatorSession:
 
     # used in x-sentry-worker-id http header
@@ -488,6 +606,7 @@ class SymbolicatorSession:
         self.options = options or None
         self.timeout = timeout
         self.session = None
+        self.pooled = False
 
         # Build some maps for use in ._process_response()
         self.reverse_source_aliases = reverse_aliases_map(settings.SENTRY_BUILTIN_SOURCES)
@@ -515,11 +634,13 @@ class SymbolicatorSession:
 
     def open(self):
         if self.session is None:
-            self.session = Session()
+            self.pooled = options.get("symbolicator.keep-alive")
+            self.session = get_pooled_session() if self.pooled else Session()
 
     def close(self):
         if self.session is not None:
-            self.session.close()
+            if not self.pooled:
+                self.session.close()
             self.session = None
 
     def _ensure_open(self):
@@ -792,3 +913,164 @@ def redact_internal_sources_from_module(module):
 
     if "candidates" in module:
         module["candidates"] = [c for c in new_candidates if should_keep(c)]
+
+
+class _Batch:
+    def __init__(self, key, session, modules, signal):
+        self.key = key
+        # The batch is sent from the poller thread with its own connection.
+        self.session = copy.copy(session)
+        self.session.session = None
+        self.modules = modules
+        self.signal = signal
+        self.stacktraces = []
+        self.members = []
+        self.started = time.monotonic()
+        self.attempts = 0
+
+    def add(self, stacktraces):
+        future = Future()
+        self.members.append((future, len(self.stacktraces), len(stacktraces)))
+        self.stacktraces.extend(stacktraces)
+        return future
+
+    def fail(self, error):
+        for future, _, _ in self.members:
+            future.set_exception(error)
+
+    def complete(self, response):
+        metrics.incr("events.symbolicator.batch.completed", amount=len(self.members))
+        for future, start, count in self.members:
+            member_response = dict(response)
+            member_response["stacktraces"] = (response.get("stacktraces") or [])[
+                start : start + count
+            ]
+            member_response["modules"] = deepcopy(response.get("modules"))
+            future.set_result(member_response)
+
+
+class SymbolicatorBatcher:
+    """
+    Merges the stacktraces of events which are symbolicated concurrently in
+    this process into one symbolicator request, and splits the response
+    between them again.
+
+    Only events with the same project, sources, options, modules and signal
+    are merged, as symbolicator applies these to all stacktraces of a request.
+    A batch is sent once it has been open for the batch window.  Batches are
+    scheduled by a single poller thread and sent or polled on a small thread
+    pool, the events wait for their part of the response.
+
+    This only merges events of threaded worker pools, a prefork worker
+    symbolicates one event at a time.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._open = {}
+        self._schedule = []
+        self._counter = itertools.count()
+        self._thread = None
+        self._executor = None
+
+    def symbolicate(self, session, stacktraces, modules, signal, window):
+        key = self._get_key(session, modules, signal)
+        with self._condition:
+            batch = self._open.get(key)
+            if batch is None or len(batch.stacktraces) + len(stacktraces) > MAX_BATCH_STACKTRACES:
+                batch = self._open[key] = _Batch(key, session, modules, signal)
+                self._call_later(window, self._send, batch)
+            future = batch.add(stacktraces)
+            self._ensure_thread()
+
+        # Events wait on the batch no longer than on a task of their own.
+        return future.result(timeout=window + settings.SYMBOLICATOR_POLL_TIMEOUT)
+
+    def _get_key(self, session, modules, signal):
+        payload = json.dumps(
+            [session.url, session.sources, session.options, modules, signal], sort_keys=True
+        )
+        return session.project_id, hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _ensure_thread(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="symbolicator-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def _call_later(self, delay, function, *args):
+        heapq.heappush(
+            self._schedule, (time.monotonic() + delay, next(self._counter), function, args)
+        )
+        self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    timeout = self._schedule[0][0] - time.monotonic() if self._schedule else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                _, _, function, args = heapq.heappop(self._schedule)
+
+            self._executor.submit(self._call, function, *args)
+
+    def _call(self, function, *args):
+        try:
+            function(*args)
+        except Exception:
+            logger.exception("symbolicator.batch.crashed")
+
+    def _send(self, batch):
+        with self._condition:
+            if self._open.get(batch.key) is batch:
+                del self._open[batch.key]
+
+        metrics.timing("events.symbolicator.batch.size", len(batch.members))
+        batch.attempts += 1
+        self._handle_response(
+            batch,
+            lambda: batch.session.symbolicate_stacktraces(
+                stacktraces=batch.stacktraces, modules=batch.modules, signal=batch.signal
+            ),
+        )
+
+    def _poll(self, batch, task_id):
+        response = self._handle_response(batch, lambda: batch.session.query_task(task_id))
+        if response is None and batch.attempts < MAX_ATTEMPTS:
+            # Symbolicator lost the task, probably during a restart.
+            self._send(batch)
+
+    def _handle_response(self, batch, request):
+        try:
+            with batch.session:
+                response = request()
+        except Exception as e:
+            batch.fail(e)
+            return False
+
+        if response is None:
+            if batch.attempts >= MAX_ATTEMPTS:
+                batch.fail(BatchFailed("Symbolicator lost the batched task"))
+            return None
+
+        if response.get("status") != "pending":
+            batch.complete(response)
+        elif time.monotonic() - batch.started > BATCH_TIMEOUT:
+            batch.fail(BatchFailed("Batched task did not complete in time"))
+        else:
+            with self._condition:
+                self._call_later(
+                    min(response.get("retry_after") or 1, settings.SYMBOLICATOR_MAX_RETRY_AFTER),
+                    self._poll,
+                    batch,
+                    response["request_id"],
+                )
+        return response
+
+
+batcher = SymbolicatorBatcher()
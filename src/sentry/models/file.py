@@ -3,19 +3,20 @@ import mmap
 import os
 import tempfile
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
 from contextlib import contextmanager
 from hashlib import sha1
-from threading import Semaphore
 from uuid import uuid4
 
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.core.files.base import File as FileObj
 from django.core.files.storage import get_storage_class
-from django.db import IntegrityError, models, router, transaction
+from django.db import models, router, transaction
 from django.utils import timezone
 
+from sentry import options
 from sentry.app import locks
 from sentry.db.models import (
     BoundedBigIntegerField,
@@ -135,107 +136,108 @@ class FileBlob(Model):
             else:
                 files_with_checksums.append((fileobj, None))
 
-        checksums_seen = set()
-        blobs_created = []
-        blobs_to_save = []
-        locks = set()
-        semaphore = Semaphore(value=MULTI_BLOB_UPLOAD_CONCURRENCY)
+        # Before we go and do something with the files we calculate the
+        # checksums and compare them against the reference.  This also
+        # deduplicates duplicates uploaded in the same request.  This is
+        # necessary because we acquire multiple locks in one go which would
+        # let us deadlock otherwise.
+        files_by_checksum = {}
+        for fileobj, reference_checksum in files_with_checksums:
+            size, checksum = _get_size_and_checksum(fileobj)
+            if reference_checksum is not None and checksum != reference_checksum:
+                raise OSError("Checksum mismatch")
+            files_by_checksum.setdefault(checksum, (fileobj, size))
+
+        # Look up all blobs which exist already at once, only the missing
+        # ones need to be locked and uploaded.
+        blobs = cls._get_existing(files_by_checksum)
+        missing = [checksum for checksum in files_by_checksum if checksum not in blobs]
+        logger.debug(
+            "FileBlob.from_files.existing",
+            extra={"existing": len(blobs), "missing": len(missing)},
+        )
 
-        def _upload_and_pend_chunk(fileobj, size, checksum, lock):
+        def _upload_chunk(fileobj, size, checksum):
             logger.debug(
-                "FileBlob.from_files._upload_and_pend_chunk.start",
+                "FileBlob.from_files._upload_chunk.start",
                 extra={"checksum": checksum, "size": size},
             )
             blob = cls(size=size, checksum=checksum)
             blob.path = cls.generate_unique_path()
             storage = get_storage()
             storage.save(blob.path, fileobj)
-            blobs_to_save.append((blob, lock))
             metrics.timing("filestore.blob-size", size, tags={"function": "from_files"})
             logger.debug(
-                "FileBlob.from_files._upload_and_pend_chunk.end",
+                "FileBlob.from_files._upload_chunk.end",
                 extra={"checksum": checksum, "path": blob.path},
             )
+            return blob
 
-        def _ensure_blob_owned(blob):
-            if organization is None:
-                return
-            try:
-                with atomic_transaction(using=router.db_for_write(FileBlobOwner)):
-                    FileBlobOwner.objects.create(organization_id=organization.id, blob=blob)
-            except IntegrityError:
-                pass
+        # Uploads run concurrently, but the blobs are saved to the database
+        # here as their uploads complete.
+        pending = {}
 
-        def _save_blob(blob):
-            logger.debug("FileBlob.from_files._save_blob.start", extra={"path": blob.path})
-            blob.save()
-            _ensure_blob_owned(blob)
-            logger.debug("FileBlob.from_files._save_blob.end", extra={"path": blob.path})
-
-        def _flush_blobs():
-            while True:
+        def _save_blobs(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                lock = pending.pop(future)
                 try:
-                    blob, lock = blobs_to_save.pop()
-                except IndexError:
-                    break
-
-                _save_blob(blob)
-                lock.__exit__(None, None, None)
-                locks.discard(lock)
-                semaphore.release()
+                    blob = future.result()
+                    logger.debug("FileBlob.from_files._save_blob", extra={"path": blob.path})
+                    blob.save()
+                    blobs[blob.checksum] = blob
+                finally:
+                    lock.__exit__(None, None, None)
 
         try:
             with ThreadPoolExecutor(max_workers=MULTI_BLOB_UPLOAD_CONCURRENCY) as exe:
-                for fileobj, reference_checksum in files_with_checksums:
-                    logger.debug(
-                        "FileBlob.from_files.executor_start", extra={"checksum": reference_checksum}
-                    )
-                    _flush_blobs()
-
-                    # Before we go and do something with the files we calculate
-                    # the checksums and compare it against the reference.  This
-                    # also deduplicates duplicates uploaded in the same request.
-                    # This is necessary because we acquire multiple locks in one
-                    # go which would let us deadlock otherwise.
-                    size, checksum = _get_size_and_checksum(fileobj)
-                    if reference_checksum is not None and checksum != reference_checksum:
-                        raise OSError("Checksum mismatch")
-                    if checksum in checksums_seen:
-                        continue
-                    checksums_seen.add(checksum)
-
-                    # Check if we need to lock the blob.  If we get a result back
-                    # here it means the blob already exists.
+                for checksum in missing:
+                    # Only ever hold the locks of a bounded number of blobs
+                    # so that they don't expire while we are uploading.
+                    while len(pending) >= MULTI_BLOB_UPLOAD_CONCURRENCY * 2:
+                        _save_blobs(FIRST_COMPLETED)
+
+                    # The blob might have been created in the meantime.  If
+                    # we get a result back here it exists now.
                     lock = _locked_blob(checksum, logger=logger)
                     existing = lock.__enter__()
                     if existing is not None:
                         lock.__exit__(None, None, None)
-                        blobs_created.append(existing)
-                        _ensure_blob_owned(existing)
+                        blobs[checksum] = existing
                         continue
 
-                    # Remember the lock to force unlock all at the end if we
-                    # encounter any difficulties.
-                    locks.add(lock)
-
-                    # Otherwise we leave the blob locked and submit the task.
-                    # We use the semaphore to ensure we never schedule too
-                    # many.  The upload will be done with a certain amount
-                    # of concurrency controlled by the semaphore and the
-                    # `_flush_blobs` call will take all those uploaded
-                    # blobs and associate them with the database.
-                    semaphore.acquire()
-                    exe.submit(_upload_and_pend_chunk(fileobj, size, checksum, lock))
-                    logger.debug("FileBlob.from_files.end", extra={"checksum": reference_checksum})
-
-            _flush_blobs()
+                    fileobj, size = files_by_checksum[checksum]
+                    pending[exe.submit(_upload_chunk, fileobj, size, checksum)] = lock
+
+                while pending:
+                    _save_blobs(ALL_COMPLETED)
         finally:
-            for lock in locks:
+            for lock in pending.values():
                 try:
                     lock.__exit__(None, None, None)
                 except Exception:
                     pass
-            logger.debug("FileBlob.from_files.end")
+
+        if organization is not None:
+            FileBlobOwner.objects.bulk_create(
+                [
+                    FileBlobOwner(organization_id=organization.id, blob=blob)
+                    for blob in blobs.values()
+                ],
+                ignore_conflicts=True,
+            )
+
+        logger.debug("FileBlob.from_files.end")
+
+    @classmethod
+    def _get_existing(cls, checksums, batch_size=1000):
+        """Returns a mapping of checksum to blob for the blobs that exist."""
+        checksums = list(checksums)
+        existing = {}
+        for i in range(0, len(checksums), batch_size):
+            for blob in cls.objects.filter(checksum__in=checksums[i : i + batch_size]):
+                existing[blob.checksum] = blob
+        return existing
 
     @classmethod
     def from_file(cls, fileobj, logger=nooplogger):
@@ -340,6 +342,13 @@ class File(Model):
             delete=delete,
         )
 
+    def read_range(self, offset, size):
+        """Returns ``size`` bytes of the file starting at ``offset``. Only
+        the blobs which overlap the range are fetched.
+        """
+        with self._get_chunked_blob() as impl:
+            return impl.read_range(offset, size)
+
     def getfile(self, mode=None, prefetch=False):
         """Returns a file object.  By default the file is fetched on
         demand but if prefetch is enabled the file is fully prefetched
@@ -435,13 +444,13 @@ class File(Model):
 
             new_checksum = sha1(b"")
             offset = 0
-            for blob in file_blobs:
-                FileBlobIndex.objects.create(file=self, blob=blob, offset=offset)
-                with blob.getfile() as blobfile:
-                    for chunk in blobfile.chunks():
-                        new_checksum.update(chunk)
-                        tf.write(chunk)
+            indexes = []
+            for blob, contents in zip(file_blobs, _iter_blob_contents(file_blobs)):
+                indexes.append(FileBlobIndex(file=self, blob=blob, offset=offset))
+                new_checksum.update(contents)
+                tf.write(contents)
                 offset += blob.size
+            FileBlobIndex.objects.bulk_create(indexes)
 
             self.size = offset
             self.checksum = new_checksum.hexdigest()
@@ -483,12 +492,42 @@ class FileBlobIndex(Model):
         unique_together = (("file", "blob", "offset"),)
 
 
+def _read_blob(blob, start=0, end=None):
+    """Read the contents of ``blob`` between ``start`` and ``end``."""
+    with blob.getfile() as sf:
+        if start:
+            sf.seek(start)
+        if end is None:
+            return sf.read()
+        return sf.read(end - start)
+
+
+def _iter_blob_contents(blobs):
+    """Yield the contents of ``blobs`` in order, while fetching up to
+    ``filestore.blob-fetch-concurrency`` blobs at once."""
+    concurrency = options.get("filestore.blob-fetch-concurrency")
+    with ThreadPoolExecutor(max_workers=concurrency) as exe:
+        pending = deque()
+        for blob in blobs:
+            pending.append(exe.submit(_read_blob, blob))
+            if len(pending) >= concurrency:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 class ChunkedFileBlobIndexWrapper:
     def __init__(self, indexes, mode=None, prefetch=False, prefetch_to=None, delete=True):
         # eager load from database incase its a queryset
         self._indexes = list(indexes)
         self._curfile = None
         self._curidx = None
+        self._concurrency = options.get("filestore.blob-fetch-concurrency")
+        # Number of blobs after the current one that are fetched in the
+        # background during sequential reads.
+        self._read_ahead = options.get("filestore.blob-read-ahead")
+        self._executor = None
+        self._pending = {}
         if prefetch:
             self.prefetched = True
             self._prefetch(prefetch_to, delete)
@@ -517,8 +556,9 @@ class ChunkedFileBlobIndexWrapper:
         old_file = self._curfile
         try:
             try:
-                self._curidx = next(self._idxiter)
-                self._curfile = self._curidx.blob.getfile()
+                pos = next(self._idxiter)
+                self._curidx = self._indexes[pos]
+                self._curfile = self._open_blob(pos)
             except StopIteration:
                 self._curidx = None
                 self._curfile = None
@@ -526,6 +566,25 @@ class ChunkedFileBlobIndexWrapper:
             if old_file is not None:
                 old_file.close()
 
+    def _open_blob(self, pos):
+        if not self._read_ahead:
+            return self._indexes[pos].blob.getfile()
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._concurrency)
+
+        # Forget about fetches which are no longer ahead of the current blob,
+        # for instance after seeking.
+        window = range(pos, min(pos + 1 + self._read_ahead, len(self._indexes)))
+        for stale in [p for p in self._pending if p not in window]:
+            self._pending.pop(stale).cancel()
+
+        for p in window:
+            if p not in self._pending:
+                self._pending[p] = self._executor.submit(_read_blob, self._indexes[p].blob)
+
+        return io.BytesIO(self._pending.pop(pos).result())
+
     @property
     def size(self):
         return sum(i.blob.size for i in self._indexes)
@@ -557,18 +616,62 @@ class ChunkedFileBlobIndexWrapper:
                     mem[offset : offset + len(chunk)] = chunk
                     offset += len(chunk)
 
-        with ThreadPoolExecutor(max_workers=4) as exe:
-            for idx in self._indexes:
-                exe.submit(fetch_file, idx.offset, idx.blob.getfile)
+        with ThreadPoolExecutor(max_workers=self._concurrency) as exe:
+            futures = [
+                exe.submit(fetch_file, idx.offset, idx.blob.getfile) for idx in self._indexes
+            ]
+            for future in futures:
+                future.result()
 
         mem.flush()
         self._curfile = f
 
+    def read_range(self, offset, size):
+        """
+        Read ``size`` bytes starting at ``offset`` without changing the
+        position of the file. Only the blobs overlapping the range are
+        fetched, concurrently.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if offset < 0 or size < 0:
+            raise OSError("Invalid argument")
+
+        if self.prefetched:
+            pos = self._curfile.tell()
+            try:
+                self._curfile.seek(offset)
+                return self._curfile.read(size)
+            finally:
+                self._curfile.seek(pos)
+
+        end = offset + size
+        ranges = []
+        for idx in self._indexes:
+            blob_end = idx.offset + idx.blob.size
+            if blob_end <= offset or idx.offset >= end:
+                continue
+            ranges.append(
+                (idx.blob, max(offset, idx.offset) - idx.offset, min(end, blob_end) - idx.offset)
+            )
+
+        if len(ranges) < 2 or self._concurrency < 2:
+            return b"".join(_read_blob(*args) for args in ranges)
+
+        with ThreadPoolExecutor(max_workers=min(self._concurrency, len(ranges))) as exe:
+            return b"".join(exe.map(lambda args: _read_blob(*args), ranges))
+
     def close(self):
         if self._curfile:
             self._curfile.close()
         self._curfile = None
         self._curidx = None
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         self.closed = True
 
     def _seek(self, pos):
@@ -587,7 +690,7 @@ class ChunkedFileBlobIndexWrapper:
         for n, idx in enumerate(self._indexes[::-1]):
             if idx.offset <= pos:
                 if idx != self._curidx:
-                    self._idxiter = iter(self._indexes[-(n + 1) :])
+                    self._idxiter = iter(range(len(self._indexes) - (n + 1), len(self._indexes)))
                     self._nextidx()
                 break
         else:
@@ -1,13 +1,13 @@
 from typing import Any, Mapping, Optional, Sequence, Tuple, Union
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
 from sentry.db.models import Model, sane_repr
 from sentry.db.models.fields import FlexibleForeignKey, JSONField
 from sentry.models import ActorTuple
-from sentry.ownership.grammar import Rule, load_schema, resolve_actors
+from sentry.ownership.grammar import Rule, invalidate_actor_cache, load_schema, resolve_actors
 from sentry.utils import metrics
 from sentry.utils.cache import cache
 
@@ -218,3 +218,70 @@ post_delete.connect(
     sender=ProjectOwnership,
     weak=False,
 )
+
+
+def _invalidate_actors_on_commit(project_ids, using):
+    # Invalidating before the change is committed lets concurrent reads cache
+    # the old rows under the new version.
+    project_ids = list(project_ids)
+    transaction.on_commit(lambda: invalidate_actor_cache(project_ids), using=using)
+
+
+def _invalidate_actors_for_teams(team_ids, using):
+    from sentry.models import ProjectTeam
+
+    _invalidate_actors_on_commit(
+        ProjectTeam.objects.filter(team_id__in=team_ids).values_list("project_id", flat=True),
+        using,
+    )
+
+
+def _invalidate_actors_for_user(user_id, using):
+    from sentry.models import OrganizationMemberTeam
+
+    _invalidate_actors_for_teams(
+        OrganizationMemberTeam.objects.filter(organizationmember__user_id=user_id).values_list(
+            "team_id", flat=True
+        ),
+        using,
+    )
+
+
+def handle_user_save(instance, using=None, update_fields=None, **kwargs):
+    # Logins and similar bookkeeping saves don't change which emails resolve.
+    if update_fields is not None and "is_active" not in update_fields:
+        return
+    _invalidate_actors_for_user(instance.id, using)
+
+
+def handle_projectteam_change(instance, using=None, **kwargs):
+    _invalidate_actors_on_commit([instance.project_id], using)
+
+
+def handle_team_change(instance, using=None, **kwargs):
+    _invalidate_actors_for_teams([instance.id], using)
+
+
+def handle_organizationmemberteam_change(instance, using=None, **kwargs):
+    _invalidate_actors_for_teams([instance.team_id], using)
+
+
+def handle_organizationmember_save(instance, using=None, **kwargs):
+    if instance.user_id:
+        _invalidate_actors_for_user(instance.user_id, using)
+
+
+def handle_useremail_change(instance, using=None, **kwargs):
+    _invalidate_actors_for_user(instance.user_id, using)
+
+
+# Signals rotate the cached owner -> actor mappings used by resolve_actors
+for signal in (post_save, post_delete):
+    signal.connect(handle_projectteam_change, sender="sentry.ProjectTeam", weak=False)
+    signal.connect(handle_team_change, sender="sentry.Team", weak=False)
+    signal.connect(
+        handle_organizationmemberteam_change, sender="sentry.OrganizationMemberTeam", weak=False
+    )
+    signal.connect(handle_useremail_change, sender="sentry.UserEmail", weak=False)
+post_save.connect(handle_organizationmember_save, sender="sentry.OrganizationMember", weak=False)
+post_save.connect(handle_user_save, sender="sentry.User", weak=False)
@@ -1,7 +1,11 @@
 import errno
+import io
 import logging
+import mmap
 import os
+import threading
 import zipfile
+from collections import OrderedDict
 from contextlib import contextmanager
 from hashlib import sha1
 from io import BytesIO
@@ -176,6 +180,99 @@ class ReleaseFileCache:
 ReleaseFile.cache = ReleaseFileCache()
 
 
+class MappedFile(io.RawIOBase):
+    """Read-only file object backed by a memory map of a file on disk."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self._mmap)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mmap.seek(offset, whence)
+        return self._mmap.tell()
+
+    def tell(self) -> int:
+        return self._mmap.tell()
+
+    def readinto(self, buffer) -> int:
+        data = self._mmap.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._mmap.read(None if size is None or size < 0 else size)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._mmap.close()
+        super().close()
+
+
+class ReleaseArchiveCache:
+    """
+    Stores release archives on local disk by checksum and keeps the most
+    recently used ones open in memory.
+
+    Open archives are memory mapped and keep their parsed manifest and ZIP
+    central directory, so reading a file from one only seeks to the file.
+    The archives returned by ``get`` are shared, callers must not close them.
+    An evicted archive is closed once nothing references it anymore.
+    """
+
+    def __init__(self, max_open: int = 16):
+        self._lock = threading.Lock()
+        self._archives: "OrderedDict[str, ReleaseArchive]" = OrderedDict()
+        self._max_open = max_open
+
+    @property
+    def cache_path(self):
+        return os.path.join(options.get("releasefile.cache-path"), "archives")
+
+    def get(self, file: File) -> "ReleaseArchive":
+        key = file.checksum or f"file-{file.id}"
+        with self._lock:
+            archive = self._archives.get(key)
+            if archive is not None:
+                self._archives.move_to_end(key)
+
+        if archive is not None:
+            metrics.incr("release_file.archive_cache.get", tags={"result": "memory"})
+            return archive
+
+        file_path = os.path.join(self.cache_path, key)
+        try:
+            # Cached files are cleared based on their modification time, mark
+            # this one as recently used.
+            os.utime(file_path)
+            result = "disk"
+        except FileNotFoundError:
+            file.save_to(file_path)
+            result = "miss"
+
+        archive = ReleaseArchive(MappedFile(file_path))
+        with self._lock:
+            archive = self._archives.setdefault(key, archive)
+            while len(self._archives) > self._max_open:
+                self._archives.popitem(last=False)
+
+        metrics.incr("release_file.archive_cache.get", tags={"result": result})
+        return archive
+
+    def clear(self):
+        with self._lock:
+            self._archives.clear()
+
+
+ReleaseFile.archive_cache = ReleaseArchiveCache()
+
+
 class ReleaseArchive:
     """Read-only view of uploaded ZIP-archive of release files"""
 
@@ -267,19 +364,19 @@ class _ArtifactIndexGuard:
         self._ident = ReleaseFile.get_ident(ARTIFACT_INDEX_FILENAME, dist and dist.name)
         self._filter_args = filter_args  # Extra constraints on artifact index release file
 
-    def readable_data(self, use_cache: bool) -> Optional[dict]:
+    def readable_releasefile(self) -> Optional[ReleaseFile]:
         """Simple read, no synchronization necessary"""
         try:
-            releasefile = self._releasefile_qs()[0]
+            return self._releasefile_qs().select_related("file")[0]
         except IndexError:
             return None
-        else:
-            if use_cache:
-                fp = ReleaseFile.cache.getfile(releasefile)
-            else:
-                fp = releasefile.file.getfile()
-            with fp:
-                return json.load(fp)
+
+    def readable_data(self, use_cache: bool) -> Optional[dict]:
+        """Simple read, no synchronization necessary"""
+        releasefile = self.readable_releasefile()
+        if releasefile is None:
+            return None
+        return load_artifact_index(releasefile, use_cache)
 
     @contextmanager
     def writable_data(self, create: bool, initial_artifact_count=None):
@@ -370,6 +467,24 @@ def read_artifact_index(
     return guard.readable_data(use_cache)
 
 
+def get_artifact_index_releasefile(
+    release: Release, dist: Optional[Distribution], **filter_args
+) -> Optional[ReleaseFile]:
+    """Get the release file of the index, with its file"""
+    guard = _ArtifactIndexGuard(release, dist, **filter_args)
+    return guard.readable_releasefile()
+
+
+def load_artifact_index(releasefile: ReleaseFile, use_cache: bool = False) -> dict:
+    """Get index data from the release file of the index"""
+    if use_cache:
+        fp = ReleaseFile.cache.getfile(releasefile)
+    else:
+        fp = releasefile.file.getfile()
+    with fp:
+        return json.load(fp)
+
+
 def _compute_sha1(archive: ReleaseArchive, url: str) -> str:
     data = archive.read(url)
     return sha1(data).hexdigest()
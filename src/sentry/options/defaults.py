@@ -57,6 +57,15 @@ register(
     default=1024 * 1024 * 1024,
     flags=FLAG_PRIORITIZE_DISK,
 )
+# Read release archives from memory mapped copies on local disk which are kept
+# open across events, instead of loading them for every artifact.
+register("releasefile.mmap-archives", default=False, flags=FLAG_PRIORITIZE_DISK)
+# Number of file blobs fetched concurrently from the filestore when a file is
+# prefetched or a range of it is read.
+register("filestore.blob-fetch-concurrency", default=4, flags=FLAG_PRIORITIZE_DISK)
+# Number of file blobs fetched ahead of the current one while a file is read
+# sequentially. 0 fetches each blob when it is reached.
+register("filestore.blob-read-ahead", default=0, flags=FLAG_PRIORITIZE_DISK)
 
 
 # Mail
@@ -94,6 +103,9 @@ register(
 
 register("api.rate-limit.org-create", default=5, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
 
+# Number of queries of one events batch request that are run concurrently.
+register("api.events-batch.concurrency", default=1, flags=FLAG_PRIORITIZE_DISK)
+
 # Beacon
 register("beacon.anonymous", type=Bool, flags=FLAG_REQUIRED)
 
@@ -119,12 +131,32 @@ register(
 
 # The ratio of requests for which the new stackwalking method should be compared against the old one
 register("symbolicator.compare_stackwalking_methods_rate", default=0.0)
+# Seconds during which concurrent symbolication requests of a project with the
+# same modules are collected into one request. 0 disables batching.
+register("symbolicator.batch-window", default=0.0)
+# Reuse connections to symbolicator for the life of a worker thread.
+register("symbolicator.keep-alive", default=False)
+# The number of custom symbol source configs whose parsed sources are cached
+# in every process. 0 disables the cache.
+register("symbolicator.sources-cache-size", default=0)
 
 # Killswitch for symbolication sources, based on a list of source IDs. Meant to be used in extreme
 # situations where it is preferable to break symbolication in a few places as opposed to letting
 # it break everywhere.
 register("symbolicator.ignored_sources", type=Sequence, default=(), flags=FLAG_ALLOW_EMPTY)
 
+# Number of stacktrace processing frame cache values each process keeps in
+# memory in front of the shared cache. 0 disables the local cache.
+register("processing.frame-cache-local-size", default=0)
+
+# Number of threads used to fetch the source files and source maps of a
+# JavaScript event. 1 fetches them one after another.
+register("sourcemaps.fetch-concurrency", default=1)
+# Maximum total size in bytes of the parsed source files and source maps each
+# process keeps in memory across events, estimated from the size of the files
+# they were parsed from. 0 disables the cache.
+register("sourcemaps.parsed-cache-size", default=0)
+
 # Backend chart rendering via chartcuterie
 register("chart-rendering.enabled", default=False, flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK)
 register(
@@ -218,10 +250,32 @@ register("snuba.search.chunk-growth-rate", default=1.5)
 register("snuba.search.max-chunk-size", default=2000)
 register("snuba.search.max-total-chunk-time-seconds", default=30.0)
 register("snuba.search.hits-sample-size", default=100)
+# Fetch the next chunk of post-filtered searches from Snuba while Postgres
+# filters the current one
+register("snuba.search.pipelined-chunks", type=Bool, default=False)
+# Seconds to cache the hits estimates of searches for, 0 to disable
+register("snuba.search.hits-cache-ttl", default=0)
 register("snuba.track-outcomes-sample-rate", default=0.0)
 
+# Snuba query cache TTLs in seconds by referrer. Queries of these referrers
+# are always cached.
+register("snuba.query-cache.referrer-ttls", type=Dict, default={})
+# Run identical cached snuba queries only once at a time within a process.
+register("snuba.query-cache.single-flight", default=False)
+# Also run identical cached snuba queries only once across processes.
+register("snuba.query-cache.distributed-lock", default=False)
+
 # The percentage of tagkeys that we want to cache. Set to 1.0 in order to cache everything, <=0.0 to stop caching
 register("snuba.tagstore.cache-tagkeys-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
+# Cache the tag keys and top values of issues, and only query Snuba for the
+# events since the cached summary when it is older than the fresh seconds.
+register("snuba.tagstore.group-tag-summary-cache", type=Bool, default=False)
+register("snuba.tagstore.group-tag-summary-fresh-seconds", default=60)
+# Summaries are recomputed from scratch after this many seconds, to correct
+# the approximations of merging.
+register("snuba.tagstore.group-tag-summary-full-refresh-seconds", default=60 * 60)
+# Serve summaries that are no longer fresh and refresh them in a task.
+register("snuba.tagstore.group-tag-summary-stale-while-revalidate", type=Bool, default=False)
 
 # Kafka Publisher
 register("kafka-publisher.raw-event-sample-rate", default=0.0)
@@ -297,6 +351,14 @@ register("discover2.max_tags_to_combine", default=3, flags=FLAG_PRIORITIZE_DISK)
 # Enables setting a sampling rate when producing the tag facet.
 register("discover2.tags_facet_enable_sampling", default=True, flags=FLAG_PRIORITIZE_DISK)
 
+# Number of resolved select clauses of discover queries that are kept per
+# process and reused across requests with the same shape. 0 disables the cache.
+register("discover2.prepared-select-cache-size", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# Enables caching the completed buckets of discover timeseries queries, so that
+# refreshing a chart only queries the most recent buckets.
+register("discover2.timeseries-bucket-cache", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # Killswitch for datascrubbing after stacktrace processing. Set to False to
 # disable datascrubbers.
 register("processing.can-use-scrubbers", default=True)
@@ -331,6 +393,13 @@ register("store.load-shed-process-event-projects", type=Any, default=[])
 register("store.load-shed-symbolicate-event-projects", type=Any, default=[])
 register("store.symbolicate-event-lpq-never", type=Sequence, default=[])
 register("store.symbolicate-event-lpq-always", type=Sequence, default=[])
+# Assign projects to the LPQ which use more than this share of the symbolication capacity,
+# instead of using fixed rate and duration thresholds. 0 disables the budget.
+register("store.symbolicate-event-lpq-budget", default=0.0)
+# The symbolication capacity in seconds of processing time per second.
+register("store.symbolicate-event-lpq-capacity", default=0.0)
+# Only report the changes the LPQ budget would make, the fixed thresholds keep being applied.
+register("store.symbolicate-event-lpq-dry-run", default=True)
 register("post_process.get-autoassign-owners", type=Sequence, default=[])
 
 # Switch for more performant project counter incr
@@ -366,6 +435,13 @@ register("eventstream:kafka-headers", default=False)
 register("post-process-forwarder:kafka-headers", default=False)
 # Number of threads to use for post processing
 register("post-process-forwarder:concurrency", default=1)
+# Maximum number of messages per partition dispatched out of order by the post
+# process forwarder. Ordering is only kept within a group. 0 dispatches every
+# batch as a whole and waits for it before committing.
+register("post-process-forwarder:max-in-flight", default=0)
+# Maximum number of messages fetched from Kafka per poll by the post process
+# forwarder. The batch is further limited by how far Snuba is ahead.
+register("post-process-forwarder:consume-batch-size", default=1)
 
 # Subscription queries sampling rate
 register("subscriptions-query.sample-rate", default=0.01)
@@ -384,3 +460,8 @@ register("performance.suspect-spans-ingestion.rollout-rate", default=0)
 # Sampling rate for controlled rollout of a change where ignest-consumer spawns
 # special save_event task for transactions avoiding the preprocess.
 register("store.save-transactions-ingest-consumer-rate", default=0.0)
+
+# Number of digest timelines delivered per task. Timelines of the same project
+# are delivered together and share their lookups. 0 delivers every timeline in
+# its own task.
+register("digests.bulk-delivery-batch-size", default=0)
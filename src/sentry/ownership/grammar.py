@@ -1,15 +1,15 @@
-import operator
 import re
 from collections import namedtuple
-from functools import reduce
 from typing import Iterable, List, Mapping, Pattern, Tuple
+from uuid import uuid4
 
-from django.db.models import Q
 from parsimonious.exceptions import ParseError  # noqa
 from parsimonious.grammar import Grammar, NodeVisitor
 from rest_framework.serializers import ValidationError
 
 from sentry.models import ActorTuple
+from sentry.utils import metrics
+from sentry.utils.cache import cache
 from sentry.utils.glob import glob_match
 from sentry.utils.safe import get_path
 
@@ -22,6 +22,8 @@ PATH = "path"
 MODULE = "module"
 CODEOWNERS = "codeowners"
 
+ACTOR_CACHE_DURATION = 3600
+
 # Grammar is defined in EBNF syntax.
 ownership_grammar = Grammar(
     fr"""
@@ -451,6 +453,74 @@ def convert_codeowners_syntax(codeowners, associations, code_mapping):
     return result
 
 
+def get_actor_cache_version_key(project_id: int) -> str:
+    return f"ownership_actors_version:1:{project_id}"
+
+
+def get_actor_cache_key(project_id: int, version: str) -> str:
+    return f"ownership_actors:1:{project_id}:{version}"
+
+
+def _build_actor_map(project_id: int) -> Mapping[str, Mapping[str, int]]:
+    """Load every identifier an owner rule could resolve to for a project
+    in bulk: the emails of all active members with access to the project
+    and the slugs of all teams on it."""
+    from sentry.models import Team, User
+
+    users = {
+        email.lower(): u_id
+        for u_id, email in User.objects.filter(
+            # We don't require verified emails
+            # emails__is_verified=True,
+            is_active=True,
+            sentry_orgmember_set__organizationmemberteam__team__projectteam__project_id=project_id,
+        )
+        .distinct()
+        .values_list("id", "emails__email")
+        if email
+    }
+    teams = {
+        slug: t_id
+        for t_id, slug in Team.objects.filter(projectteam__project_id=project_id).values_list(
+            "id", "slug"
+        )
+    }
+    return {"user": users, "team": teams}
+
+
+def get_actor_map(project_id: int) -> Mapping[str, Mapping[str, int]]:
+    """
+    Cached read access to the identifier -> actor id mapping of a project.
+
+    Entries are stored under a per-project version which is rotated by
+    `invalidate_actor_cache`, so a mapping built concurrently with an
+    invalidation is written under the old version and never read again.
+    """
+    version_key = get_actor_cache_version_key(project_id)
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid4().hex
+        cache.set(version_key, version, ACTOR_CACHE_DURATION)
+
+    cache_key = get_actor_cache_key(project_id, version)
+    actor_map = cache.get(cache_key)
+    if actor_map is None:
+        metrics.incr("ownership.resolve_actors.cache", tags={"result": "miss"})
+        actor_map = _build_actor_map(project_id)
+        cache.set(cache_key, actor_map, ACTOR_CACHE_DURATION)
+    else:
+        metrics.incr("ownership.resolve_actors.cache", tags={"result": "hit"})
+    return actor_map
+
+
+def invalidate_actor_cache(project_ids: Iterable[int]) -> None:
+    """Rotate the actor cache version of the given projects."""
+    cache.set_many(
+        {get_actor_cache_version_key(project_id): uuid4().hex for project_id in set(project_ids)},
+        ACTOR_CACHE_DURATION,
+    )
+
+
 def resolve_actors(owners: Iterable["Owner"], project_id: int) -> Mapping["Owner", "ActorTuple"]:
     """Convert a list of Owner objects into a dictionary
     of {Owner: Actor} pairs. Actors not identified are returned
@@ -460,47 +530,21 @@ def resolve_actors(owners: Iterable["Owner"], project_id: int) -> Mapping["Owner
     if not owners:
         return {}
 
-    users, teams = [], []
-    owners_lookup = {}
+    actor_map = get_actor_map(project_id)
+    actor_types = {"user": User, "team": Team}
 
+    actors = {}
     for owner in owners:
+        if owner.type not in actor_types:
+            actors[owner] = None
+            continue
         # teams aren't technical case insensitive, but teams also
         # aren't allowed to have non-lowercase in slugs, so
         # this kinda works itself out correctly since they won't match
-        owners_lookup[(owner.type, owner.identifier.lower())] = owner
-        if owner.type == "user":
-            users.append(owner)
-        elif owner.type == "team":
-            teams.append(owner)
-
-    actors = {}
-    if users:
-        actors.update(
-            {
-                ("user", email.lower()): ActorTuple(u_id, User)
-                for u_id, email in User.objects.filter(
-                    reduce(operator.or_, [Q(emails__email__iexact=o.identifier) for o in users]),
-                    # We don't require verified emails
-                    # emails__is_verified=True,
-                    is_active=True,
-                    sentry_orgmember_set__organizationmemberteam__team__projectteam__project_id=project_id,
-                )
-                .distinct()
-                .values_list("id", "emails__email")
-            }
-        )
-
-    if teams:
-        actors.update(
-            {
-                ("team", slug): ActorTuple(t_id, Team)
-                for t_id, slug in Team.objects.filter(
-                    slug__in=[o.identifier for o in teams], projectteam__project_id=project_id
-                ).values_list("id", "slug")
-            }
-        )
+        actor_id = actor_map[owner.type].get(owner.identifier.lower())
+        actors[owner] = ActorTuple(actor_id, actor_types[owner.type]) if actor_id else None
 
-    return {o: actors.get((o.type, o.identifier.lower())) for o in owners}
+    return actors
 
 
 def create_schema_from_issue_owners(issue_owners, project_id):
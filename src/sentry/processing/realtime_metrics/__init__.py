@@ -23,7 +23,10 @@ if TYPE_CHECKING:
     projects = realtime_metrics_store.projects
     get_counts_for_project = realtime_metrics_store.get_counts_for_project
     get_durations_for_project = realtime_metrics_store.get_durations_for_project
+    get_counts_for_projects = realtime_metrics_store.get_counts_for_projects
+    get_durations_for_projects = realtime_metrics_store.get_durations_for_projects
     get_lpq_projects = realtime_metrics_store.get_lpq_projects
     is_lpq_project = realtime_metrics_store.is_lpq_project
     add_project_to_lpq = realtime_metrics_store.add_project_to_lpq
+    add_projects_to_lpq = realtime_metrics_store.add_projects_to_lpq
     remove_projects_from_lpq = realtime_metrics_store.remove_projects_from_lpq
@@ -1,7 +1,7 @@
 import collections
 import dataclasses
 import enum
-from typing import ClassVar, DefaultDict, Iterable, List, Set, Union
+from typing import ClassVar, DefaultDict, Iterable, List, Mapping, Sequence, Set, Union
 
 from sentry.utils.services import Service
 
@@ -108,6 +108,13 @@ class DurationsHistogram:
         """Returns the sum of the counts of all the buckets in the histogram."""
         return sum(self._data.values())
 
+    def total_duration(self) -> float:
+        """Returns the estimated sum of all durations in the histogram, assuming that durations
+        are spread evenly within each bucket."""
+        return sum(
+            (duration + self.bucket_size / 2) * count for duration, count in self._data.items()
+        )
+
     def __repr__(self) -> str:
         return f"<DurationsHistogram [{sorted(self._data.items())}]>"
 
@@ -140,8 +147,11 @@ class RealtimeMetricsStore(Service):  # type: ignore
         "projects",
         "get_counts_for_project",
         "get_durations_for_project",
+        "get_counts_for_projects",
+        "get_durations_for_projects",
         "get_lpq_projects",
         "add_project_to_lpq",
+        "add_projects_to_lpq",
         "remove_projects_from_lpq",
     )
 
@@ -197,6 +207,30 @@ class RealtimeMetricsStore(Service):  # type: ignore
         """
         raise NotImplementedError
 
+    def get_counts_for_projects(
+        self, project_ids: Sequence[int], timestamp: int
+    ) -> Mapping[int, BucketedCounts]:
+        """
+        Returns the bucketed symbolicator request counts of every given project, like
+        `get_counts_for_project`.
+        """
+        return {
+            project_id: self.get_counts_for_project(project_id, timestamp)
+            for project_id in project_ids
+        }
+
+    def get_durations_for_projects(
+        self, project_ids: Sequence[int], timestamp: int
+    ) -> Mapping[int, BucketedDurationsHistograms]:
+        """
+        Returns the bucketed symbolication durations of every given project, like
+        `get_durations_for_project`.
+        """
+        return {
+            project_id: self.get_durations_for_project(project_id, timestamp)
+            for project_id in project_ids
+        }
+
     def get_lpq_projects(self) -> Set[int]:
         """
         Fetches the list of projects that are currently using the low priority queue.
@@ -227,6 +261,14 @@ class RealtimeMetricsStore(Service):  # type: ignore
         """
         raise NotImplementedError
 
+    def add_projects_to_lpq(self, project_ids: Set[int]) -> Set[int]:
+        """
+        Assigns many projects to the low priority queue, like `add_project_to_lpq`.
+
+        Returns the projects which were new additions to the queue.
+        """
+        return {project_id for project_id in project_ids if self.add_project_to_lpq(project_id)}
+
     def remove_projects_from_lpq(self, project_ids: Set[int]) -> int:
         """
         Unassigns projects from the low priority queue.
@@ -1,6 +1,6 @@
 import logging
 from itertools import chain
-from typing import Iterable, Sequence, Set
+from typing import Iterable, Mapping, Sequence, Set
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.utils import redis
@@ -10,6 +10,9 @@ from . import base
 # redis key for entry storing current list of LPQ members
 LPQ_MEMBERS_KEY = "store.symbolicate-event-lpq-selected"
 
+# The number of projects whose metrics are fetched in one pipeline
+BULK_READ_BATCH_SIZE = 500
+
 logger = logging.getLogger(__name__)
 
 
@@ -78,7 +81,7 @@ class RedisRealtimeMetricsStore(base.RealtimeMetricsStore):
                 # Can't use mset because it doesn't allow also specifying an expiry
                 pipeline.set(name=key, value="1", ex=self._backoff_timer)
 
-                pipeline.execute()
+            pipeline.execute()
 
     def _is_backing_off(self, project_id: int) -> bool:
         """
@@ -88,6 +91,27 @@ class RedisRealtimeMetricsStore(base.RealtimeMetricsStore):
         key = f"{self._backoff_key_prefix()}:{project_id}"
         return self.cluster.get(key) is not None
 
+    def _backing_off(self, project_ids: Sequence[int]) -> Set[int]:
+        """Returns the subset of projects which are currently in the middle of their backoff
+        timer."""
+        if not project_ids or self._backoff_timer == 0:
+            return set()
+
+        with self.cluster.pipeline(transaction=False) as pipeline:
+            for project_id in project_ids:
+                pipeline.get(f"{self._backoff_key_prefix()}:{project_id}")
+            values = pipeline.execute()
+
+        return {project_id for project_id, value in zip(project_ids, values) if value is not None}
+
+    def _buckets(self, timestamp: int, bucket_size: int, time_window: int) -> range:
+        now_bucket = timestamp - timestamp % bucket_size
+
+        first_bucket = timestamp - time_window
+        first_bucket = first_bucket - first_bucket % bucket_size
+
+        return range(first_bucket, now_bucket + bucket_size, bucket_size)
+
     def increment_project_event_counter(self, project_id: int, timestamp: int) -> None:
         """Increment the event counter for the given project_id.
 
@@ -164,19 +188,42 @@ class RedisRealtimeMetricsStore(base.RealtimeMetricsStore):
         This may throw an exception if there is some sort of issue fetching counts from the redis
         store.
         """
-        bucket_size = self._counter_bucket_size
-        now_bucket = timestamp - timestamp % bucket_size
-
-        first_bucket = timestamp - self._counter_time_window
-        first_bucket = first_bucket - first_bucket % bucket_size
-
-        buckets = range(first_bucket, now_bucket + bucket_size, bucket_size)
+        buckets = self._buckets(timestamp, self._counter_bucket_size, self._counter_time_window)
         keys = [f"{self._counter_key_prefix()}:{project_id}:{ts}" for ts in buckets]
         counts = self.cluster.mget(keys)
+        return self._make_counts(buckets, counts)
+
+    def _make_counts(self, buckets: range, counts: Sequence[str]) -> base.BucketedCounts:
         return base.BucketedCounts(
-            timestamp=buckets[0], width=bucket_size, counts=[int(c) if c else 0 for c in counts]
+            timestamp=buckets[0],
+            width=self._counter_bucket_size,
+            counts=[int(c) if c else 0 for c in counts],
         )
 
+    def get_counts_for_projects(
+        self, project_ids: Sequence[int], timestamp: int
+    ) -> Mapping[int, base.BucketedCounts]:
+        """Returns the event counts of many projects, like `get_counts_for_project`.
+
+        The counts are read with one pipeline per batch of projects instead of one request per
+        project.
+        """
+        buckets = self._buckets(timestamp, self._counter_bucket_size, self._counter_time_window)
+        prefix = self._counter_key_prefix()
+
+        result = {}
+        for start in range(0, len(project_ids), BULK_READ_BATCH_SIZE):
+            batch = project_ids[start : start + BULK_READ_BATCH_SIZE]
+            with self.cluster.pipeline(transaction=False) as pipeline:
+                for project_id in batch:
+                    pipeline.mget([f"{prefix}:{project_id}:{ts}" for ts in buckets])
+                all_counts = pipeline.execute()
+
+            for project_id, counts in zip(batch, all_counts):
+                result[project_id] = self._make_counts(buckets, counts)
+
+        return result
+
     def get_durations_for_project(
         self, project_id: int, timestamp: int
     ) -> base.BucketedDurationsHistograms:
@@ -198,32 +245,57 @@ class RedisRealtimeMetricsStore(base.RealtimeMetricsStore):
         This may throw an exception if there is some sort of issue fetching durations from the redis
         store.
         """
-        bucket_size = self._duration_bucket_size
-        now_bucket = timestamp - timestamp % bucket_size
-
-        first_bucket = timestamp - self._duration_time_window
-        first_bucket = first_bucket - first_bucket % bucket_size
-
-        buckets = range(first_bucket, now_bucket + bucket_size, bucket_size)
+        buckets = self._buckets(timestamp, self._duration_bucket_size, self._duration_time_window)
 
         with self.cluster.pipeline() as pipeline:
             for ts in buckets:
                 pipeline.hgetall(f"{self._duration_key_prefix()}:{project_id}:{ts}")
             histograms = pipeline.execute()
 
+        return self._make_durations(buckets, histograms)
+
+    def _make_durations(
+        self, buckets: range, histograms: Sequence[Mapping[str, str]]
+    ) -> base.BucketedDurationsHistograms:
         all_histograms = []
-        for ts, histogram_redis in zip(buckets, histograms):
+        for histogram_redis in histograms:
             histogram = base.DurationsHistogram(bucket_size=10)
             for duration, count in histogram_redis.items():
                 histogram.incr(int(duration), int(count))
             all_histograms.append(histogram)
 
         return base.BucketedDurationsHistograms(
-            timestamp=first_bucket,
-            width=bucket_size,
+            timestamp=buckets[0],
+            width=self._duration_bucket_size,
             histograms=all_histograms,
         )
 
+    def get_durations_for_projects(
+        self, project_ids: Sequence[int], timestamp: int
+    ) -> Mapping[int, base.BucketedDurationsHistograms]:
+        """Returns the durations of many projects, like `get_durations_for_project`.
+
+        The histograms are read with one pipeline per batch of projects instead of one pipeline
+        per project.
+        """
+        buckets = self._buckets(timestamp, self._duration_bucket_size, self._duration_time_window)
+        prefix = self._duration_key_prefix()
+
+        result = {}
+        for start in range(0, len(project_ids), BULK_READ_BATCH_SIZE):
+            batch = project_ids[start : start + BULK_READ_BATCH_SIZE]
+            with self.cluster.pipeline(transaction=False) as pipeline:
+                for project_id in batch:
+                    for ts in buckets:
+                        pipeline.hgetall(f"{prefix}:{project_id}:{ts}")
+                histograms = pipeline.execute()
+
+            for i, project_id in enumerate(batch):
+                project_histograms = histograms[i * len(buckets) : (i + 1) * len(buckets)]
+                result[project_id] = self._make_durations(buckets, project_histograms)
+
+        return result
+
     def get_lpq_projects(self) -> Set[int]:
         """
         Fetches the list of projects that are currently using the low priority queue.
@@ -263,6 +335,26 @@ class RedisRealtimeMetricsStore(base.RealtimeMetricsStore):
         self._register_backoffs([project_id])
         return was_added
 
+    def add_projects_to_lpq(self, project_ids: Set[int]) -> Set[int]:
+        """
+        Assigns many projects to the low priority queue, like `add_project_to_lpq`.
+
+        Returns the projects which were new additions to the queue.
+        """
+        addable = sorted(project_ids)
+        backing_off = self._backing_off(addable)
+        addable = [project_id for project_id in addable if project_id not in backing_off]
+        if not addable:
+            return set()
+
+        with self.cluster.pipeline(transaction=False) as pipeline:
+            for project_id in addable:
+                pipeline.sadd(LPQ_MEMBERS_KEY, project_id)
+            results = pipeline.execute()
+
+        self._register_backoffs(addable)
+        return {project_id for project_id, added in zip(addable, results) if int(added) > 0}
+
     def remove_projects_from_lpq(self, project_ids: Set[int]) -> int:
         """
         Unassigns projects from the low priority queue.
@@ -277,7 +369,8 @@ class RedisRealtimeMetricsStore(base.RealtimeMetricsStore):
         value. This may throw an exception if there is some sort of issue deregistering the projects
         from the queue.
         """
-        removable = [project for project in project_ids if not self._is_backing_off(project)]
+        backing_off = self._backing_off(list(project_ids))
+        removable = [project for project in project_ids if project not in backing_off]
 
         if not removable:
             return 0
@@ -84,6 +84,19 @@ local function variadic_argument_parser(argument_parser)
     end
 end
 
+local function counted_argument_parser(argument_parser)
+    -- Parses a count followed by that many arguments.
+    return function (cursor, arguments)
+        local count = tonumber(arguments[cursor])
+        cursor = cursor + 1
+        local results = {}
+        for i = 1, count do
+            cursor, results[i] = argument_parser(cursor, arguments)
+        end
+        return cursor, results
+    end
+end
+
 local function multiple_argument_parser(...)
     local parsers = {...}
     return function (cursor, arguments)
@@ -338,6 +351,27 @@ local function close_digest(configuration, timeline_id, delay_minimum, record_id
     end
 end
 
+local function digest_timelines(configuration, timeline_capacity, timeline_ids)
+    -- Digests every timeline that is in the ready state. Timelines that are
+    -- not are returned with a zero ready flag instead of raising an error, so
+    -- that they don't prevent the others from being digested.
+    local results = {}
+    for i, timeline_id in ipairs(timeline_ids) do
+        if redis.call('ZSCORE', configuration:get_schedule_ready_key(), timeline_id) == false then
+            results[i] = {timeline_id, 0, {}}
+        else
+            results[i] = {timeline_id, 1, digest_timeline(configuration, timeline_id, timeline_capacity)}
+        end
+    end
+    return results
+end
+
+local function close_digests(configuration, delay_minimum, digests)
+    for _, digest in ipairs(digests) do
+        close_digest(configuration, digest.timeline_id, delay_minimum, digest.record_ids)
+    end
+end
+
 local function delete_timeline(configuration, timeline_id)
     truncate_timeline(configuration, timeline_id, 0)
     truncate_digest(configuration, timeline_id, 0)
@@ -448,6 +482,25 @@ local commands = {
         )(cursor, arguments)
         return close_digest(configuration, timeline_id, delay_minimum, record_ids)
     end,
+    DIGEST_OPEN_MANY = function (cursor, arguments)
+        local cursor, configuration, timeline_capacity, timeline_ids = multiple_argument_parser(
+            configuration_argument_parser,
+            argument_parser(tonumber),
+            variadic_argument_parser(argument_parser())
+        )(cursor, arguments)
+        return digest_timelines(configuration, timeline_capacity, timeline_ids)
+    end,
+    DIGEST_CLOSE_MANY = function (cursor, arguments)
+        local cursor, configuration, delay_minimum, digests = multiple_argument_parser(
+            configuration_argument_parser,
+            argument_parser(tonumber),
+            variadic_argument_parser(object_argument_parser({
+                {"timeline_id", argument_parser()},
+                {"record_ids", counted_argument_parser(argument_parser())},
+            }))
+        )(cursor, arguments)
+        return close_digests(configuration, delay_minimum, digests)
+    end,
 }
 
 local cursor, command = argument_parser(
@@ -1,5 +1,6 @@
 import re
-from collections import defaultdict, namedtuple
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
 from copy import deepcopy
 from datetime import datetime
 from typing import Any, Callable, Dict, List, Mapping, Match, Optional, Sequence, Set, Tuple, Union
@@ -12,6 +13,7 @@ from snuba_sdk.column import Column
 from snuba_sdk.function import CurriedFunction, Function
 from snuba_sdk.orderby import Direction, OrderBy
 
+from sentry import options
 from sentry.discover.arithmetic import (
     OperandType,
     Operation,
@@ -56,6 +58,7 @@ from sentry.search.events.constants import (
 )
 from sentry.search.events.types import NormalizedArg, ParamsType, SelectType
 from sentry.search.utils import InvalidQuery, parse_duration
+from sentry.utils import metrics
 from sentry.utils.compat import zip
 from sentry.utils.numbers import format_grouped_length
 from sentry.utils.snuba import (
@@ -73,6 +76,10 @@ MAX_QUERYABLE_TRANSACTION_THRESHOLDS = 500
 ConditionalFunction = namedtuple("ConditionalFunction", "condition match fallback")
 FunctionDetails = namedtuple("FunctionDetails", "field instance arguments")
 ResolvedFunction = namedtuple("ResolvedFunction", "details column aggregate")
+PreparedSelect = namedtuple("PreparedSelect", "columns aggregates functions")
+
+# Cached properties of QueryFields that are computed from the params
+PARAMS_DERIVED_PROPERTIES = ("project_slugs", "_resolve_project_threshold_config")
 
 
 class InvalidFunctionArgument(Exception):
@@ -2305,6 +2312,103 @@ class SnQLFunction(DiscoverFunction):
         self.validate_result_type(self.default_result_type)
 
 
+class _RecordingParams(dict):
+    """A copy of the query params that remembers whether it was used at all"""
+
+    accessed = False
+    modified = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self.accessed = True
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self.accessed = True
+        return super().__iter__()
+
+    def __len__(self):
+        self.accessed = True
+        return super().__len__()
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def keys(self):
+        self.accessed = True
+        return super().keys()
+
+    def values(self):
+        self.accessed = True
+        return super().values()
+
+    def items(self):
+        self.accessed = True
+        return super().items()
+
+    def copy(self):
+        self.accessed = True
+        return dict(super().items())
+
+    def __setitem__(self, key, value):
+        self.accessed = self.modified = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.accessed = self.modified = True
+        super().__delitem__(key)
+
+    def pop(self, *args):
+        self.accessed = self.modified = True
+        return super().pop(*args)
+
+    def setdefault(self, key, default=None):
+        self.accessed = self.modified = True
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.accessed = self.modified = True
+        super().update(*args, **kwargs)
+
+
+class PreparedSelectCache:
+    """
+    A process local LRU cache of resolved select clauses.
+
+    Entries are keyed by the shape of the query they were resolved for and
+    only hold select clauses whose resolution did not depend on the params of
+    the request, such as the time range or the projects.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self._entries.move_to_end(key)
+        return prepared
+
+    def set(self, key, prepared, max_entries):
+        with self._lock:
+            self._entries[key] = prepared
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+prepared_selects = PreparedSelectCache()
+
+
 class QueryFields(QueryBase):
     """Field logic for a snql query"""
 
@@ -2833,11 +2937,92 @@ class QueryFields(QueryBase):
     ) -> List[SelectType]:
         """Given a public list of discover fields, construct the corresponding
         list of Snql Columns or Functions. Duplicate columns are ignored
+
+        Select clauses that resolve without looking at the params are reused
+        for later queries of the same shape when the prepared select cache is
+        enabled.
         """
 
         if selected_columns is None:
             return []
 
+        max_entries = options.get("discover2.prepared-select-cache-size")
+        if (
+            not max_entries
+            or self.columns
+            or any(name in self.__dict__ for name in PARAMS_DERIVED_PROPERTIES)
+        ):
+            return self._resolve_select(selected_columns, equations)
+
+        key = (
+            type(self),
+            self.dataset,
+            tuple(selected_columns),
+            tuple(equations or ()),
+            self.auto_fields,
+            tuple(sorted(self.functions_acl)),
+            tuple(sorted(self.equation_config.items())),
+            bool(self.aggregates),
+        )
+        prepared = prepared_selects.get(key)
+        if prepared is not None:
+            metrics.incr("discover.prepared_select", tags={"result": "hit"})
+            return self._bind_select(prepared)
+
+        resolved_columns, prepared = self._prepare_select(selected_columns, equations)
+        if prepared is None:
+            metrics.incr("discover.prepared_select", tags={"result": "uncacheable"})
+        else:
+            metrics.incr("discover.prepared_select", tags={"result": "miss"})
+            prepared_selects.set(key, prepared, max_entries)
+        return resolved_columns
+
+    def _prepare_select(
+        self, selected_columns: List[str], equations: Optional[List[str]]
+    ) -> Tuple[List[SelectType], Optional[PreparedSelect]]:
+        """Resolve the select clause while recording whether the params were
+        used. Returns the resolved columns, and a PreparedSelect of everything
+        the resolution added to this query if the params were not used
+        """
+        params = self.params
+        recording_params = _RecordingParams(params or {})
+        num_aggregates = len(self.aggregates)
+        function_alias_map = dict(self.function_alias_map)
+
+        self.params = recording_params
+        try:
+            resolved_columns = self._resolve_select(selected_columns, equations)
+        finally:
+            self.params = params
+            if recording_params.modified and params is not None:
+                params.clear()
+                params.update(recording_params)
+
+        if recording_params.accessed:
+            return resolved_columns, None
+
+        return resolved_columns, PreparedSelect(
+            columns=tuple(resolved_columns),
+            aggregates=tuple(self.aggregates[num_aggregates:]),
+            functions=tuple(
+                (alias, details.field, details.instance.name, details.arguments.copy())
+                for alias, details in self.function_alias_map.items()
+                if function_alias_map.get(alias) is not details
+            ),
+        )
+
+    def _bind_select(self, prepared: PreparedSelect) -> List[SelectType]:
+        """Add a prepared select clause to this query"""
+        self.aggregates.extend(prepared.aggregates)
+        for alias, field, name, arguments in prepared.functions:
+            self.function_alias_map[alias] = FunctionDetails(
+                field, self.function_converter[name], arguments.copy()
+            )
+        return list(prepared.columns)
+
+    def _resolve_select(
+        self, selected_columns: List[str], equations: Optional[List[str]]
+    ) -> List[SelectType]:
         resolved_columns = []
         stripped_columns = [column.strip() for column in selected_columns]
 
@@ -3,14 +3,18 @@ from __future__ import annotations
 import logging
 import time
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import replace
 from datetime import datetime, timedelta
 from hashlib import md5
 from typing import Any, List, Mapping, Sequence, Set, Tuple
 
 import sentry_sdk
+from django.core.cache import cache
+from django.db import connections
 from django.db.models import QuerySet
 from django.utils import timezone
+from sentry_sdk import Hub
 from snuba_sdk import Direction, Op
 from snuba_sdk.expressions import Expression
 from snuba_sdk.query import Column, Condition, Entity, Function, Join, Limit, OrderBy, Query
@@ -137,7 +141,87 @@ class AbstractQueryExecutor(metaclass=ABCMeta):
         * a sorted list of (group_id, group_score) tuples sorted descending by score,
         * the count of total results (rows) available for this query.
         """
+        query_kwargs, sort_field = self._prepare_snuba_search(
+            start=start,
+            end=end,
+            project_ids=project_ids,
+            environment_ids=environment_ids,
+            sort_field=sort_field,
+            organization_id=organization_id,
+            cursor=cursor,
+            group_ids=group_ids,
+            limit=limit,
+            offset=offset,
+            get_sample=get_sample,
+            search_filters=search_filters,
+        )
+        snuba_results = snuba.aliased_query(**query_kwargs)
+        return self._get_snuba_search_results(snuba_results, sort_field, get_sample)
 
+    def submit_snuba_search(self, pool: ThreadPoolExecutor, **kwargs: Any) -> Future:
+        """
+        Like `snuba_search`, but only sends the query to Snuba on a thread of
+        `pool`, returning a future of its results. The database lookups of the
+        query are done before this returns.
+        """
+        query_kwargs, sort_field = self._prepare_snuba_search(**kwargs)
+        referrer = query_kwargs.pop("referrer")
+        query = snuba.prepare_aliased_query(**query_kwargs)
+        return pool.submit(
+            self._run_prepared_snuba_search,
+            query,
+            referrer,
+            sort_field,
+            kwargs.get("get_sample", False),
+            Hub(Hub.current),
+        )
+
+    def _run_prepared_snuba_search(
+        self,
+        query: snuba.SnubaQueryBody,
+        referrer: str,
+        sort_field: str,
+        get_sample: bool,
+        hub: Hub,
+    ) -> Tuple[List[Tuple[int, Any]], int]:
+        try:
+            with hub:
+                snuba_results = snuba.run_prepared_query(query, referrer=referrer)
+        finally:
+            # Reading options can open a database connection on this thread
+            connections.close_all()
+        return self._get_snuba_search_results(snuba_results, sort_field, get_sample)
+
+    def _get_snuba_search_results(
+        self, snuba_results: Mapping[str, Any], sort_field: str, get_sample: bool
+    ) -> Tuple[List[Tuple[int, Any]], int]:
+        rows = snuba_results["data"]
+        total = snuba_results["totals"]["total"]
+
+        if not get_sample:
+            metrics.timing("snuba.search.num_result_groups", len(rows))
+
+        return [(row["group_id"], row[sort_field]) for row in rows], total
+
+    def _prepare_snuba_search(
+        self,
+        start: datetime,
+        end: datetime,
+        project_ids: Sequence[int],
+        environment_ids: Sequence[int],
+        sort_field: str,
+        organization_id: int,
+        cursor: Optional[Cursor] = None,
+        group_ids: Optional[Sequence[int]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        get_sample: bool = False,
+        search_filters: Optional[Sequence[SearchFilter]] = None,
+    ) -> Tuple[Mapping[str, Any], str]:
+        """
+        Returns the keyword arguments of the `snuba.aliased_query` call of
+        `snuba_search`, and the field its results are sorted by.
+        """
         filters = {"project_id": project_ids}
 
         environments = None
@@ -215,7 +299,7 @@ class AbstractQueryExecutor(metaclass=ABCMeta):
             ]  # ensure stable sort within the same score
             referrer = "search"
 
-        snuba_results = snuba.aliased_query(
+        query_kwargs = dict(
             dataset=self.dataset,
             start=start,
             end=end,
@@ -234,13 +318,7 @@ class AbstractQueryExecutor(metaclass=ABCMeta):
             sample=1,  # Don't use clickhouse sampling, even when in turbo mode.
             condition_resolver=snuba.get_snuba_column_name,
         )
-        rows = snuba_results["data"]
-        total = snuba_results["totals"]["total"]
-
-        if not get_sample:
-            metrics.timing("snuba.search.num_result_groups", len(rows))
-
-        return [(row["group_id"], row[sort_field]) for row in rows], total
+        return query_kwargs, sort_field
 
     def _transform_converted_filter(
         self,
@@ -426,112 +504,155 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
         chunk_limit = limit
         offset = 0
         num_chunks = 0
-        hits = self.calculate_hits(
-            group_ids,
-            too_many_candidates,
-            sort_field,
-            projects,
-            retention_window_start,
-            group_queryset,
-            environments,
-            sort_by,
-            limit,
-            cursor,
-            count_hits,
-            paginator_options,
-            search_filters,
-            start,
-            end,
-        )
-        if count_hits and hits == 0:
-            return self.empty_result
-
-        paginator_results = self.empty_result
-        result_groups = []
-        result_group_ids = set()
-
-        max_time = options.get("snuba.search.max-total-chunk-time-seconds")
-        time_start = time.time()
-        more_results = False
-
-        # Do smaller searches in chunks until we have enough results
-        # to answer the query (or hit the end of possible results). We do
-        # this because a common case for search is to return 100 groups
-        # sorted by `last_seen`, and we want to avoid returning all of
-        # a project's groups and then post-sorting them all in Postgres
-        # when typically the first N results will do.
-        while (time.time() - time_start) < max_time:
-            num_chunks += 1
 
+        def get_chunk_limit(previous_limit: int) -> int:
             # grow the chunk size on each iteration to account for huge projects
             # and weird queries, up to a max size
-            chunk_limit = min(int(chunk_limit * chunk_growth), max_chunk_size)
+            chunk_limit = min(int(previous_limit * chunk_growth), max_chunk_size)
             # but if we have group_ids always query for at least that many items
-            chunk_limit = max(chunk_limit, len(group_ids))
+            return max(chunk_limit, len(group_ids))
 
-            # {group_id: group_score, ...}
-            snuba_groups, total = self.snuba_search(
-                start=start,
-                end=end,
-                project_ids=[p.id for p in projects],
-                environment_ids=environments and [environment.id for environment in environments],
-                organization_id=projects[0].organization_id,
-                sort_field=sort_field,
-                cursor=cursor,
-                group_ids=group_ids,
-                limit=chunk_limit,
-                offset=offset,
-                search_filters=search_filters,
+        search_kwargs = dict(
+            start=start,
+            end=end,
+            project_ids=[p.id for p in projects],
+            environment_ids=environments and [environment.id for environment in environments],
+            organization_id=projects[0].organization_id,
+            sort_field=sort_field,
+            cursor=cursor,
+            group_ids=group_ids,
+            search_filters=search_filters,
+        )
+
+        # When post-filtering, the next chunk is fetched from Snuba while
+        # Postgres filters the current one, and the first chunk is fetched
+        # while the hits are estimated.
+        pipelined = too_many_candidates and options.get("snuba.search.pipelined-chunks")
+        # Prefetched chunks are sent from a thread of this search, so that they
+        # never queue behind the searches of other requests.
+        pool = ThreadPoolExecutor(max_workers=1) if pipelined else None
+        try:
+            next_chunk = None
+            if pipelined:
+                chunk_limit = get_chunk_limit(chunk_limit)
+                next_chunk = self.submit_snuba_search(
+                    pool, limit=chunk_limit, offset=0, **search_kwargs
+                )
+
+            hits = self.calculate_hits(
+                group_ids,
+                too_many_candidates,
+                sort_field,
+                projects,
+                retention_window_start,
+                group_queryset,
+                environments,
+                sort_by,
+                limit,
+                cursor,
+                count_hits,
+                paginator_options,
+                search_filters,
+                start,
+                end,
             )
-            metrics.timing("snuba.search.num_snuba_results", len(snuba_groups))
-            count = len(snuba_groups)
-            more_results = count >= limit and (offset + limit) < total
-            offset += len(snuba_groups)
-
-            if not snuba_groups:
-                break
-
-            if group_ids:
-                # pre-filtered candidates were passed down to Snuba, so we're
-                # finished with filtering and these are the only results. Note
-                # that because we set the chunk size to at least the size of
-                # the group_ids, we know we got all of them (ie there are
-                # no more chunks after the first)
-                result_groups = snuba_groups
-                if count_hits and hits is None:
-                    hits = len(snuba_groups)
-            else:
-                # pre-filtered candidates were *not* passed down to Snuba,
-                # so we need to do post-filtering to verify Sentry DB predicates
-                filtered_group_ids = group_queryset.filter(
-                    id__in=[gid for gid, _ in snuba_groups]
-                ).values_list("id", flat=True)
-
-                group_to_score = dict(snuba_groups)
-                for group_id in filtered_group_ids:
-                    if group_id in result_group_ids:
-                        # because we're doing multiple Snuba queries, which
-                        # happen outside of a transaction, there is a small possibility
-                        # of groups moving around in the sort scoring underneath us,
-                        # so we at least want to protect against duplicates
-                        continue
-
-                    group_score = group_to_score[group_id]
-                    result_group_ids.add(group_id)
-                    result_groups.append((group_id, group_score))
-
-            # break the query loop for one of three reasons:
-            # * we started with Postgres candidates and so only do one Snuba query max
-            # * the paginator is returning enough results to satisfy the query (>= the limit)
-            # * there are no more groups in Snuba to post-filter
-            # TODO do we actually have to rebuild this SequencePaginator every time
-            # or can we just make it after we've broken out of the loop?
-            paginator_results = SequencePaginator(
-                [(score, id) for (id, score) in result_groups], reverse=True, **paginator_options
-            ).get_result(limit, cursor, known_hits=hits, max_hits=max_hits)
-
-            if group_ids or len(paginator_results.results) >= limit or not more_results:
-                break
+            if count_hits and hits == 0:
+                if next_chunk is not None:
+                    next_chunk.cancel()
+                return self.empty_result
+
+            paginator_results = self.empty_result
+            result_groups = []
+            result_group_ids = set()
+
+            max_time = options.get("snuba.search.max-total-chunk-time-seconds")
+            time_start = time.time()
+            more_results = False
+
+            # Do smaller searches in chunks until we have enough results
+            # to answer the query (or hit the end of possible results). We do
+            # this because a common case for search is to return 100 groups
+            # sorted by `last_seen`, and we want to avoid returning all of
+            # a project's groups and then post-sorting them all in Postgres
+            # when typically the first N results will do.
+            while (time.time() - time_start) < max_time:
+                num_chunks += 1
+
+                # {group_id: group_score, ...}
+                if next_chunk is not None:
+                    snuba_groups, total = next_chunk.result()
+                    next_chunk = None
+                else:
+                    chunk_limit = get_chunk_limit(chunk_limit)
+                    snuba_groups, total = self.snuba_search(
+                        limit=chunk_limit, offset=offset, **search_kwargs
+                    )
+                metrics.timing("snuba.search.num_snuba_results", len(snuba_groups))
+                count = len(snuba_groups)
+                more_results = count >= limit and (offset + limit) < total
+                offset += len(snuba_groups)
+
+                if not snuba_groups:
+                    break
+
+                if pipelined and count >= chunk_limit and more_results:
+                    chunk_limit = get_chunk_limit(chunk_limit)
+                    next_chunk = self.submit_snuba_search(
+                        pool, limit=chunk_limit, offset=offset, **search_kwargs
+                    )
+
+                if group_ids:
+                    # pre-filtered candidates were passed down to Snuba, so we're
+                    # finished with filtering and these are the only results. Note
+                    # that because we set the chunk size to at least the size of
+                    # the group_ids, we know we got all of them (ie there are
+                    # no more chunks after the first)
+                    result_groups = snuba_groups
+                    if count_hits and hits is None:
+                        hits = len(snuba_groups)
+                else:
+                    # pre-filtered candidates were *not* passed down to Snuba,
+                    # so we need to do post-filtering to verify Sentry DB predicates
+                    filtered_group_ids = group_queryset.filter(
+                        id__in=[gid for gid, _ in snuba_groups]
+                    ).values_list("id", flat=True)
+
+                    group_to_score = dict(snuba_groups)
+                    for group_id in filtered_group_ids:
+                        if group_id in result_group_ids:
+                            # because we're doing multiple Snuba queries, which
+                            # happen outside of a transaction, there is a small possibility
+                            # of groups moving around in the sort scoring underneath us,
+                            # so we at least want to protect against duplicates
+                            continue
+
+                        group_score = group_to_score[group_id]
+                        result_group_ids.add(group_id)
+                        result_groups.append((group_id, group_score))
+
+                # break the query loop for one of three reasons:
+                # * we started with Postgres candidates and so only do one Snuba query max
+                # * the paginator is returning enough results to satisfy the query (>= the limit)
+                # * there are no more groups in Snuba to post-filter
+                # TODO do we actually have to rebuild this SequencePaginator every time
+                # or can we just make it after we've broken out of the loop?
+                paginator_results = SequencePaginator(
+                    [(score, id) for (id, score) in result_groups],
+                    reverse=True,
+                    **paginator_options,
+                ).get_result(limit, cursor, known_hits=hits, max_hits=max_hits)
+
+                if group_ids or len(paginator_results.results) >= limit or not more_results:
+                    break
+
+            if next_chunk is not None:
+                # The page was filled before the prefetched chunk was needed
+                next_chunk.cancel()
+                metrics.incr("snuba.search.discarded_chunks", skip_internal=False)
+        finally:
+            if pool is not None:
+                # A discarded chunk that is already running is not waited for
+                pool.shutdown(wait=False)
 
         # HACK: We're using the SequencePaginator to mask the complexities of going
         # back and forth between two databases. This causes a problem with pagination
@@ -617,6 +738,17 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             # requires the most samples) we would need 96 samples to achieve
             # +/-10% @ 95% confidence.
 
+            hits_cache_ttl = options.get("snuba.search.hits-cache-ttl")
+            if hits_cache_ttl:
+                cache_key = self.get_hits_cache_key(
+                    projects, environments, search_filters, start, end, hits_cache_ttl
+                )
+                hits = cache.get(cache_key)
+                if hits is not None:
+                    metrics.incr("snuba.search.hits_cache.hit", skip_internal=False)
+                    return hits
+                metrics.incr("snuba.search.hits_cache.miss", skip_internal=False)
+
             sample_size = options.get("snuba.search.hits-sample-size")
             kwargs = dict(
                 start=start,
@@ -637,7 +769,7 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             snuba_count = len(snuba_groups)
             if snuba_count == 0:
                 # Maybe check for 0 hits and return EMPTY_RESULT in ::query? self.empty_result
-                return 0
+                hits = 0
             else:
                 filtered_count = group_queryset.filter(
                     id__in=[gid for gid, _ in snuba_groups]
@@ -645,10 +777,38 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
 
                 hit_ratio = filtered_count / float(snuba_count)
                 hits = int(hit_ratio * snuba_total)
-                return hits
+
+            if hits_cache_ttl:
+                cache.set(cache_key, hits, hits_cache_ttl)
+            return hits
 
         return None
 
+    def get_hits_cache_key(
+        self,
+        projects: Sequence[Project],
+        environments: Optional[Sequence[Environment]],
+        search_filters: Sequence[SearchFilter],
+        start: datetime,
+        end: datetime,
+        ttl: int,
+    ) -> str:
+        """
+        Estimates are shared by searches with the same filters over the same
+        projects and environments. The time range is rounded to the TTL, as
+        searches up to "now" never have the same end.
+        """
+        key = json.dumps(
+            [
+                sorted(p.id for p in projects),
+                sorted(e.id for e in environments or ()),
+                sorted(repr(search_filter) for search_filter in search_filters or ()),
+                int(start.timestamp()) // ttl,
+                int(end.timestamp()) // ttl,
+            ]
+        )
+        return "search:hits:{}".format(md5(key.encode("utf-8")).hexdigest())
+
 
 class InvalidQueryForExecutor(Exception):
     pass
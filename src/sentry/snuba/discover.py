@@ -24,6 +24,7 @@ from sentry.search.events.fields import (
 )
 from sentry.search.events.filter import get_filter
 from sentry.search.events.types import ParamsType
+from sentry.snuba import timeseries_cache
 from sentry.tagstore.base import TOP_VALUES_DEFAULT_LIMIT
 from sentry.utils.compat import filter
 from sentry.utils.dates import to_timestamp
@@ -47,6 +48,7 @@ from sentry.utils.snuba import (
     raw_snql_query,
     resolve_column,
     resolve_snuba_aliases,
+    stream_raw_query,
     to_naive_timestamp,
 )
 
@@ -105,6 +107,14 @@ def resolve_discover_aliases(snuba_filter, function_translations=None):
     )
 
 
+def use_timeseries_cache(params, comparison_delta=None):
+    return (
+        options.get("discover2.timeseries-bucket-cache")
+        and comparison_delta is None
+        and params.get("organization_id") is not None
+    )
+
+
 def zerofill(data, start, end, rollup, orderby):
     rv = []
     start = int(to_naive_timestamp(naiveify_datetime(start)) / rollup) * rollup
@@ -154,6 +164,21 @@ def transform_meta(results, function_alias_map):
     return meta
 
 
+def transform_row(row, translated_columns):
+    transformed = {}
+    for key, value in row.items():
+        if isinstance(value, float):
+            # 0 for nan, and none for inf were chosen arbitrarily, nan and inf are invalid json
+            # so needed to pick something valid to use instead
+            if math.isnan(value):
+                value = 0
+            elif math.isinf(value):
+                value = None
+        transformed[translated_columns.get(key, key)] = value
+
+    return transformed
+
+
 def transform_data(result, translated_columns, snuba_filter):
     """
     Transform internal names back to the public schema ones.
@@ -165,21 +190,7 @@ def transform_data(result, translated_columns, snuba_filter):
         # Translate back column names that were converted to snuba format
         col["name"] = translated_columns.get(col["name"], col["name"])
 
-    def get_row(row):
-        transformed = {}
-        for key, value in row.items():
-            if isinstance(value, float):
-                # 0 for nan, and none for inf were chosen arbitrarily, nan and inf are invalid json
-                # so needed to pick something valid to use instead
-                if math.isnan(value):
-                    value = 0
-                elif math.isinf(value):
-                    value = None
-            transformed[translated_columns.get(key, key)] = value
-
-        return transformed
-
-    result["data"] = [get_row(row) for row in result["data"]]
+    result["data"] = [transform_row(row, translated_columns) for row in result["data"]]
 
     if snuba_filter and snuba_filter.rollup and snuba_filter.rollup > 0:
         rollup = snuba_filter.rollup
@@ -314,6 +325,63 @@ def query(
         )
 
 
+def stream_query(
+    selected_columns,
+    query,
+    params,
+    equations=None,
+    orderby=None,
+    offset=None,
+    limit=50,
+    referrer=None,
+    auto_fields=False,
+    auto_aggregations=False,
+    use_aggregate_conditions=False,
+    conditions=None,
+    functions_acl=None,
+):
+    """
+    Like `query`, but returns an iterator over the rows of the result, which
+    are decoded from the snuba response while it is read instead of loading
+    the whole response at once. The meta of the result is not returned.
+    """
+    if not selected_columns:
+        raise InvalidSearchQuery("No columns selected")
+
+    snuba_query = prepare_discover_query(
+        selected_columns[:],
+        query,
+        params,
+        equations,
+        orderby,
+        auto_fields,
+        auto_aggregations,
+        use_aggregate_conditions,
+        conditions,
+        functions_acl,
+    )
+    snuba_filter = snuba_query.filter
+
+    with sentry_sdk.start_span(op="discover.discover", description="query.snuba_query"):
+        result = stream_raw_query(
+            start=snuba_filter.start,
+            end=snuba_filter.end,
+            groupby=snuba_filter.groupby,
+            conditions=snuba_filter.conditions,
+            aggregations=snuba_filter.aggregations,
+            selected_columns=snuba_filter.selected_columns,
+            filter_keys=snuba_filter.filter_keys,
+            having=snuba_filter.having,
+            orderby=snuba_filter.orderby,
+            dataset=Dataset.Discover,
+            limit=limit,
+            offset=offset,
+            referrer=referrer,
+        )
+
+    return (transform_row(row, snuba_query.columns) for row in result)
+
+
 def prepare_discover_query(
     selected_columns,
     query,
@@ -537,9 +605,33 @@ def timeseries_query(
                 )
                 query_list.append(comparison_builder)
 
-            query_results = bulk_snql_query(
-                [query.get_snql_query() for query in query_list], referrer
-            )
+            fingerprint = None
+            if use_timeseries_cache(params, comparison_delta):
+                base_query = base_builder.get_snql_query()
+                fingerprint = timeseries_cache.get_snql_fingerprint(base_query)
+
+            if fingerprint is not None:
+
+                def run_query(ranges):
+                    range_queries = [
+                        timeseries_cache.set_snql_time_range(base_query, time_range)
+                        for time_range in ranges
+                    ]
+                    range_results = bulk_snql_query(range_queries, referrer)
+                    return [[result] for result in range_results]
+
+                query_results = timeseries_cache.query_with_bucket_cache(
+                    [fingerprint],
+                    params["start"],
+                    params["end"],
+                    rollup,
+                    params["organization_id"],
+                    run_query,
+                )
+            else:
+                query_results = bulk_snql_query(
+                    [query.get_snql_query() for query in query_list], referrer
+                )
 
         with sentry_sdk.start_span(
             op="discover.discover", description="timeseries.transform_results"
@@ -606,7 +698,33 @@ def timeseries_query(
             comp_query_params.start -= comparison_delta
             comp_query_params.end -= comparison_delta
             query_params_list.append(comp_query_params)
-        query_results = bulk_raw_query(query_params_list, referrer=referrer)
+
+        fingerprint = None
+        if use_timeseries_cache(params, comparison_delta):
+            fingerprint = timeseries_cache.get_query_params_fingerprint(base_query_params)
+
+        if fingerprint is not None:
+
+            def run_query(ranges):
+                range_query_params_list = []
+                for start, end in ranges:
+                    range_query_params = deepcopy(base_query_params)
+                    range_query_params.start = start
+                    range_query_params.end = end
+                    range_query_params_list.append(range_query_params)
+                range_results = bulk_raw_query(range_query_params_list, referrer=referrer)
+                return [[result] for result in range_results]
+
+            query_results = timeseries_cache.query_with_bucket_cache(
+                [fingerprint],
+                snuba_filter.start,
+                snuba_filter.end,
+                rollup,
+                params["organization_id"],
+                run_query,
+            )
+        else:
+            query_results = bulk_raw_query(query_params_list, referrer=referrer)
 
     with sentry_sdk.start_span(
         op="discover.discover", description="timeseries.transform_results"
@@ -726,7 +844,8 @@ def top_events_timeseries(
             timeseries_columns=timeseries_columns,
             equations=equations,
         )
-        if len(top_events["data"]) == limit and include_other:
+        include_other_query = len(top_events["data"]) == limit and include_other
+        if include_other_query:
             other_events_builder = TopEventsQueryBuilder(
                 Dataset.Discover,
                 params,
@@ -738,12 +857,50 @@ def top_events_timeseries(
                 timeseries_columns=timeseries_columns,
                 equations=equations,
             )
-            result, other_result = bulk_snql_query(
-                [top_events_builder.get_snql_query(), other_events_builder.get_snql_query()],
-                referrer=referrer,
+            builders = [top_events_builder, other_events_builder]
+        else:
+            builders = [top_events_builder]
+
+        fingerprints = None
+        if use_timeseries_cache(params):
+            base_queries = [builder.get_snql_query() for builder in builders]
+            fingerprints = [
+                timeseries_cache.get_snql_fingerprint(base_query) for base_query in base_queries
+            ]
+
+        if fingerprints is not None and None not in fingerprints:
+
+            def run_query(ranges):
+                range_queries = [
+                    timeseries_cache.set_snql_time_range(base_query, time_range)
+                    for time_range in ranges
+                    for base_query in base_queries
+                ]
+                range_results = bulk_snql_query(range_queries, referrer=referrer)
+                return [
+                    range_results[index : index + len(builders)]
+                    for index in range(0, len(range_results), len(builders))
+                ]
+
+            query_results = timeseries_cache.query_with_bucket_cache(
+                fingerprints,
+                params["start"],
+                params["end"],
+                rollup,
+                params["organization_id"],
+                run_query,
+            )
+        elif include_other_query:
+            query_results = bulk_snql_query(
+                [builder.get_snql_query() for builder in builders], referrer=referrer
             )
         else:
-            result = raw_snql_query(top_events_builder.get_snql_query(), referrer=referrer)
+            query_results = [raw_snql_query(top_events_builder.get_snql_query(), referrer=referrer)]
+
+        if include_other_query:
+            result, other_result = query_results
+        else:
+            result = query_results[0]
             other_result = {"data": []}
         if (
             not allow_empty
@@ -935,12 +1092,51 @@ def top_events_timeseries(
                 "limit": 10000,
                 "referrer": referrer + ".other",
             }
-            result, other_result = bulk_raw_query(
-                [SnubaQueryParams(**top_5_query), SnubaQueryParams(**other_query)],
+            query_dicts = [top_5_query, other_query]
+        else:
+            query_dicts = [top_5_query]
+
+        fingerprints = None
+        if use_timeseries_cache(params):
+            fingerprints = [
+                timeseries_cache.get_query_params_fingerprint(SnubaQueryParams(**query_dict))
+                for query_dict in query_dicts
+            ]
+
+        if fingerprints is not None and None not in fingerprints:
+
+            def run_query(ranges):
+                range_query_params = [
+                    SnubaQueryParams(**{**deepcopy(query_dict), "start": start, "end": end})
+                    for start, end in ranges
+                    for query_dict in query_dicts
+                ]
+                range_results = bulk_raw_query(range_query_params, referrer=referrer)
+                return [
+                    range_results[index : index + len(query_dicts)]
+                    for index in range(0, len(range_results), len(query_dicts))
+                ]
+
+            query_results = timeseries_cache.query_with_bucket_cache(
+                fingerprints,
+                snuba_filter.start,
+                snuba_filter.end,
+                rollup,
+                params["organization_id"],
+                run_query,
+            )
+        elif len(query_dicts) == 2:
+            query_results = bulk_raw_query(
+                [SnubaQueryParams(**query_dict) for query_dict in query_dicts],
                 referrer=referrer,
             )
         else:
-            result = raw_query(**top_5_query)
+            query_results = [raw_query(**top_5_query)]
+
+        if len(query_dicts) == 2:
+            result, other_result = query_results
+        else:
+            result = query_results[0]
             other_result = {"data": []}
 
     if (
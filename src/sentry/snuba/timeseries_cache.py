@@ -0,0 +1,230 @@
+"""
+A cache of the completed buckets of timeseries queries.
+
+The buckets of a timeseries only change while events for them are still
+being ingested. Once a bucket ended a few minutes ago its rows are stored
+per (query fingerprint, rollup, bucket), and later queries for the same
+fingerprint only ask Snuba for the buckets that are missing from the cache
+or still changing.
+"""
+import math
+from datetime import datetime, timedelta
+from hashlib import sha1
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pytz
+from dateutil.parser import parse as parse_datetime
+from django.core.cache import cache
+from django.utils import timezone
+from snuba_sdk.column import Column
+from snuba_sdk.conditions import Condition, Op
+from snuba_sdk.query import Query
+
+from sentry import quotas
+from sentry.models import Organization
+from sentry.utils import json, metrics
+from sentry.utils.dates import to_timestamp
+from sentry.utils.snuba import SnubaQueryParams, naiveify_datetime, to_naive_timestamp
+
+# Buckets which ended at least this long ago are considered complete.
+SETTLED_AFTER = timedelta(minutes=5)
+# How long completed buckets are kept. Events that arrive after their
+# bucket was cached only show up once it expired.
+BUCKET_TTL = 6 * 60 * 60
+# Queries with fewer completed buckets are not worth caching.
+MIN_CACHED_BUCKETS = 2
+
+TIME_COLUMN = Column("timestamp")
+
+TimeRange = Tuple[datetime, datetime]
+# Runs the queries of all fingerprints for each time range, returning the
+# results of each range in the order of the fingerprints.
+RunQuery = Callable[[Sequence[TimeRange]], Sequence[Sequence[Mapping[str, Any]]]]
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return [[key, _canonical(value[key])] for key in sorted(value)]
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(item) for item in value)
+    return value
+
+
+def get_fingerprint(*parts: Any) -> Optional[str]:
+    """Hash the parts of a timeseries query that are not the time range.
+    Returns None if the parts cannot be serialized."""
+    try:
+        encoded = json.dumps(_canonical(parts))
+    except (TypeError, ValueError):
+        return None
+    return sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def get_query_params_fingerprint(query_params: SnubaQueryParams) -> Optional[str]:
+    return get_fingerprint(
+        query_params.dataset,
+        query_params.groupby,
+        query_params.conditions,
+        query_params.filter_keys,
+        query_params.aggregations,
+        query_params.rollup,
+        query_params.is_grouprelease,
+        query_params.kwargs,
+    )
+
+
+def _without_time_range(query: Query) -> List[Any]:
+    """
+    Returns the conditions of `query` without the bounds that query builders
+    add for the `start` and `end` params. The builders append them after the
+    conditions of the user, so they are the last `>=` and `<` conditions on
+    the timestamp. Their values can't be compared to the params, as the start
+    is moved to the retention of the organization first.
+    """
+    where = list(query.where or [])
+    for op in (Op.GTE, Op.LT):
+        for index in reversed(range(len(where))):
+            condition = where[index]
+            if (
+                isinstance(condition, Condition)
+                and condition.lhs == TIME_COLUMN
+                and condition.op == op
+            ):
+                del where[index]
+                break
+    return where
+
+
+def get_snql_fingerprint(query: Query) -> Optional[str]:
+    return get_fingerprint(
+        repr(query.match),
+        repr(query.select),
+        repr(_without_time_range(query)),
+        repr(query.having),
+        repr(query.groupby),
+        repr(query.orderby),
+        repr(query.granularity),
+        repr(query.limit),
+    )
+
+
+def set_snql_time_range(query: Query, time_range: TimeRange) -> Query:
+    """
+    Returns `query`, which was built by a query builder, over `time_range`
+    instead. The query is not built again, as filters on the timestamp may
+    not be valid for a narrower range of params.
+    """
+    return query.set_where(
+        _without_time_range(query)
+        + [
+            Condition(TIME_COLUMN, Op.GTE, time_range[0]),
+            Condition(TIME_COLUMN, Op.LT, time_range[1]),
+        ]
+    )
+
+
+def get_bucket_key(fingerprint: str, rollup: int, bucket: int) -> str:
+    return f"tsbc:{fingerprint}:{rollup}:{bucket}"
+
+
+def get_row_time(row: Dict[str, Any]) -> int:
+    # SnQL returns the time as a string
+    if isinstance(row["time"], str):
+        row["time"] = int(to_timestamp(parse_datetime(row["time"])))
+    return row["time"]
+
+
+def _to_datetime(timestamp: int, like: datetime) -> datetime:
+    value = datetime.utcfromtimestamp(timestamp)
+    return value.replace(tzinfo=pytz.utc) if like.tzinfo else value
+
+
+def query_with_bucket_cache(
+    fingerprints: Sequence[str],
+    start: datetime,
+    end: datetime,
+    rollup: int,
+    organization_id: int,
+    run_query: RunQuery,
+) -> List[Mapping[str, Any]]:
+    """
+    Returns a result for each of `fingerprints` over the time range from
+    `start` to `end`, fetching only the buckets that are not cached.
+
+    At most two time ranges are queried: the partial bucket at `start`, and
+    everything from the first bucket that is missing from the cache up to
+    `end`. The last bucket is always queried, so there is always a fresh
+    result to take the `meta` from.
+    """
+    start_ts = to_naive_timestamp(naiveify_datetime(start))
+    end_ts = to_naive_timestamp(naiveify_datetime(end))
+    now_ts = to_naive_timestamp(naiveify_datetime(timezone.now()))
+
+    # Snuba moves the start of queries to the retention of the organization,
+    # the buckets before that may not be served from the cache either.
+    retention = quotas.get_event_retention(organization=Organization(organization_id))
+    if retention:
+        start_ts = max(start_ts, now_ts - timedelta(days=retention).total_seconds())
+
+    first_bucket = int(math.ceil(start_ts / rollup)) * rollup
+    settled_end = int((now_ts - SETTLED_AFTER.total_seconds()) // rollup) * rollup
+    buckets = list(range(first_bucket, min(int(end_ts // rollup) * rollup, settled_end), rollup))
+
+    if start_ts >= end_ts or len(buckets) < MIN_CACHED_BUCKETS:
+        return list(run_query([(start, end)])[0])
+
+    keys = [
+        [get_bucket_key(fingerprint, rollup, bucket) for bucket in buckets]
+        for fingerprint in fingerprints
+    ]
+    cached = cache.get_many([key for fingerprint_keys in keys for key in fingerprint_keys])
+
+    # The first bucket any of the queries is missing, the last one is
+    # always queried again.
+    num_cached = len(buckets) - 1
+    for index in range(num_cached):
+        if any(fingerprint_keys[index] not in cached for fingerprint_keys in keys):
+            num_cached = index
+            break
+
+    metrics.timing("discover.timeseries_cache.cached_buckets", num_cached)
+    metrics.timing("discover.timeseries_cache.queried_buckets", len(buckets) - num_cached)
+
+    ranges: List[TimeRange] = []
+    if num_cached > 0:
+        if start_ts < first_bucket:
+            ranges.append((_to_datetime(start_ts, start), _to_datetime(first_bucket, start)))
+        ranges.append((_to_datetime(buckets[num_cached], start), end))
+    else:
+        ranges.append((start, end))
+
+    range_results = run_query(ranges)
+
+    results = []
+    to_cache = {}
+    for index, fingerprint_keys in enumerate(keys):
+        data = []
+        if num_cached > 0 and len(ranges) == 2:
+            data.extend(range_results[0][index]["data"])
+        for key in fingerprint_keys[:num_cached]:
+            data.extend(json.loads(cached[key]))
+
+        queried = range_results[-1][index]
+        rows_by_bucket: Dict[int, List[Dict[str, Any]]] = {
+            bucket: [] for bucket in buckets[num_cached:]
+        }
+        for row in queried["data"]:
+            bucket_rows = rows_by_bucket.get(get_row_time(row))
+            if bucket_rows is not None:
+                bucket_rows.append(row)
+            data.append(row)
+
+        for bucket, bucket_rows in rows_by_bucket.items():
+            to_cache[get_bucket_key(fingerprints[index], rollup, bucket)] = json.dumps(bucket_rows)
+
+        results.append({**queried, "data": data})
+
+    cache.set_many(to_cache, BUCKET_TTL)
+    return results
@@ -1,12 +1,15 @@
 import logging
-from collections import OrderedDict, namedtuple
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
 from datetime import datetime
 
 import sentry_sdk
 from django.utils import timezone
 
+from sentry import options
 from sentry.models import Project, Release
 from sentry.stacktraces.functions import set_in_app, trim_function_name
+from sentry.utils import metrics
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import get_path, safe_execute
@@ -20,6 +23,8 @@ StacktraceInfo.__hash__ = lambda x: id(x)
 StacktraceInfo.__eq__ = lambda a, b: a is b
 StacktraceInfo.__ne__ = lambda a, b: a is not b
 
+FRAME_CACHE_TIMEOUT = 3600
+
 
 class ProcessableFrame:
     def __init__(self, frame, idx, processor, stacktrace_info, processable_frames):
@@ -30,6 +35,7 @@ class ProcessableFrame:
         self.data = None
         self.cache_key = None
         self.cache_value = None
+        self.pending_cache_value = None
         self.processable_frames = processable_frames
 
     def __repr__(self):
@@ -63,8 +69,11 @@ class ProcessableFrame:
         return self.processable_frames[last_idx]
 
     def set_cache_value(self, value):
+        """Remember ``value`` for the cache key of this frame.  The values of
+        all frames are written to the cache together once the stacktraces are
+        processed."""
         if self.cache_key is not None:
-            cache.set(self.cache_key, value, 3600)
+            self.pending_cache_value = value
             return True
         return False
 
@@ -93,6 +102,17 @@ class StacktraceProcessingTask:
     def iter_processable_stacktraces(self):
         return self.processable_stacktraces.items()
 
+    def flush_frame_cache(self):
+        """Write the cache values set on frames with one cache call."""
+        values = {}
+        for frame in self.iter_processable_frames():
+            if frame.cache_key is not None and frame.pending_cache_value is not None:
+                values[frame.cache_key] = frame.pending_cache_value
+                frame.pending_cache_value = None
+        if values:
+            cache.set_many(values, FRAME_CACHE_TIMEOUT)
+            _local_frame_cache.update(values)
+
     def iter_processable_frames(self, processor=None):
         for _, frames in self.iter_processable_stacktraces():
             for frame in frames:
@@ -440,11 +460,64 @@ def get_crash_frame_from_event_data(data, frame_filter=None):
         return default
 
 
+class LocalFrameCache:
+    """
+    A process wide LRU of frame cache values in front of the shared cache.  It
+    holds at most ``processing.frame-cache-local-size`` values and is disabled
+    if that is 0.  Values are shared between events and must not be modified.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = OrderedDict()
+
+    def get_many(self, keys):
+        if not options.get("processing.frame-cache-local-size"):
+            return {}
+        rv = {}
+        with self._lock:
+            for key in keys:
+                value = self._values.get(key)
+                if value is not None:
+                    self._values.move_to_end(key)
+                    rv[key] = value
+        return rv
+
+    def update(self, values):
+        max_size = options.get("processing.frame-cache-local-size")
+        if not max_size:
+            return
+        with self._lock:
+            self._values.update(values)
+            for key in values:
+                self._values.move_to_end(key)
+            while len(self._values) > max_size:
+                self._values.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+_local_frame_cache = LocalFrameCache()
+
+
+def _lookup_frame_cache(keys):
+    """Returns the frame cache values of ``keys`` and the keys that were
+    found in the local cache."""
+    keys = list(keys)
+    rv = _local_frame_cache.get_many(keys)
+    local_keys = set(rv)
+    missing = [key for key in keys if key not in rv]
+    if missing:
+        found = cache.get_many(missing)
+        _local_frame_cache.update(found)
+        rv.update(found)
+    return {key: rv.get(key) for key in keys}, local_keys
+
+
 def lookup_frame_cache(keys):
-    rv = {}
-    for key in keys:
-        rv[key] = cache.get(key)
-    return rv
+    return _lookup_frame_cache(keys)[0]
 
 
 def get_stacktrace_processing_task(infos, processors):
@@ -470,9 +543,26 @@ def get_stacktrace_processing_task(infos, processors):
             if processable_frame.cache_key is not None:
                 to_lookup[processable_frame.cache_key] = processable_frame
 
-    frame_cache = lookup_frame_cache(to_lookup)
-    for cache_key, processable_frame in to_lookup.items():
-        processable_frame.cache_value = frame_cache.get(cache_key)
+    if to_lookup:
+        frame_cache, local_hits = _lookup_frame_cache(to_lookup)
+        results = defaultdict(int)
+        for cache_key, processable_frame in to_lookup.items():
+            processable_frame.cache_value = frame_cache.get(cache_key)
+            if cache_key in local_hits:
+                result = "local"
+            elif processable_frame.cache_value is not None:
+                result = "hit"
+            else:
+                result = "miss"
+            results[(processable_frame.processor.__class__.__name__, result)] += 1
+
+        for (processor, result), count in results.items():
+            metrics.incr(
+                "stacktraces.frame_cache",
+                amount=count,
+                tags={"processor": processor, "result": result},
+                skip_internal=True,
+            )
 
     return StacktraceProcessingTask(
         processable_stacktraces=by_stacktrace_info, processors=by_processor
@@ -563,6 +653,10 @@ def process_stacktraces(data, make_processors=None, set_raw_stacktrace=True):
         data.setdefault("_metrics", {})["flag.processing.error"] = True
         changed = True
     finally:
+        try:
+            processing_task.flush_frame_cache()
+        except Exception:
+            logger.exception("stacktraces.processing.frame_cache_flush_failed")
         for processor in processors:
             processor.close()
         processing_task.close()
@@ -70,6 +70,7 @@ class TagStorage(Service):
                 "get_standardized_key",
                 "get_tag_key_label",
                 "get_tag_value_label",
+                "refresh_group_tag_summary",
             ]
         )
         | __read_methods__
@@ -315,3 +316,12 @@ class TagStorage(Service):
         self, project_ids, group_id_list, environment_ids, start=None, end=None
     ):
         raise NotImplementedError
+
+    def refresh_group_tag_summary(
+        self, project_id, group_id, environment_ids, keys=None, value_limit=TOP_VALUES_DEFAULT_LIMIT
+    ):
+        """
+        Refreshes the cached tag keys and top values of a group that
+        `get_group_tag_keys_and_top_values` serves.
+        """
+        raise NotImplementedError
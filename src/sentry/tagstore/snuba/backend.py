@@ -2,13 +2,16 @@ import functools
 import re
 from collections import OrderedDict, defaultdict
 from collections.abc import Iterable
+from datetime import timedelta
 from typing import Optional, Sequence
 
 from dateutil.parser import parse as parse_datetime
 from django.core.cache import cache
+from django.utils import timezone
 from pytz import UTC
 from sentry_relay.consts import SPAN_STATUS_CODE_TO_NAME
 
+from sentry import options
 from sentry.api.utils import default_start_end_dates
 from sentry.models import (
     Project,
@@ -57,6 +60,10 @@ FUZZY_NUMERIC_DISTANCE = 50
 # storage in Snuba.
 DEFAULT_TYPE_CONDITION = ["type", "!=", "transaction"]
 
+# Events can still arrive for this long after their timestamp, so cached tag
+# summaries only cover the events up to this long ago.
+GROUP_TAG_SUMMARY_SETTLED_AFTER = timedelta(minutes=5)
+
 tag_value_data_transformers = {"first_seen": parse_datetime, "last_seen": parse_datetime}
 
 
@@ -75,6 +82,48 @@ def get_project_list(project_id):
     return project_id if isinstance(project_id, Iterable) else [project_id]
 
 
+def get_group_tag_summary_cache_key(project_id, group_id, environment_ids, keys, value_limit):
+    return "tagstore.group-tag-summary:{}".format(
+        md5_text(
+            sorted(get_project_list(project_id)),
+            group_id,
+            sorted(environment_ids or []),
+            sorted(keys) if keys is not None else None,
+            value_limit,
+        ).hexdigest()
+    )
+
+
+def merge_group_tag_summaries(summary, delta, value_limit):
+    """
+    Adds the counts of the tag summary `delta` to those of `summary`, where a
+    summary maps each tag key to its count and its top values.
+
+    Only the top values are kept, so values which only make it into the top
+    values with the events of `delta` are counted with those events alone.
+    """
+    merged = {}
+    for key in set(summary) | set(delta):
+        old = summary.get(key, {"count": 0, "values": {}})
+        new = delta.get(key, {"count": 0, "values": {}})
+
+        values = dict(old["values"])
+        for value, (times_seen, first_seen, last_seen) in new["values"].items():
+            if value in values:
+                old_times_seen, old_first_seen, old_last_seen = values[value]
+                values[value] = (
+                    old_times_seen + times_seen,
+                    min(old_first_seen, first_seen),
+                    max(old_last_seen, last_seen),
+                )
+            else:
+                values[value] = (times_seen, first_seen, last_seen)
+
+        top_values = sorted(values.items(), key=lambda item: -item[1][0])[:value_limit]
+        merged[key] = {"count": old["count"] + new["count"], "values": dict(top_values)}
+    return merged
+
+
 class SnubaTagStorage(TagStorage):
     def __get_tag_key(self, project_id, group_id, environment_id, key):
         tag = f"tags[{key}]"
@@ -495,6 +544,182 @@ class SnubaTagStorage(TagStorage):
         keys=None,
         value_limit=TOP_VALUES_DEFAULT_LIMIT,
         **kwargs,
+    ):
+        if (
+            group_id is not None
+            and not kwargs
+            and options.get("snuba.tagstore.group-tag-summary-cache")
+        ):
+            summary = self.__get_group_tag_summary(
+                project_id, group_id, environment_ids, keys, value_limit
+            )
+            return {
+                GroupTagKey(
+                    group_id=group_id,
+                    key=key,
+                    count=data["count"],
+                    top_values=[
+                        GroupTagValue(
+                            group_id=group_id,
+                            key=key,
+                            value=value,
+                            times_seen=times_seen,
+                            first_seen=first_seen,
+                            last_seen=last_seen,
+                        )
+                        for value, (times_seen, first_seen, last_seen) in data["values"].items()
+                    ],
+                )
+                for key, data in summary.items()
+            }
+
+        return self.__get_group_tag_keys_and_top_values(
+            project_id, group_id, environment_ids, keys=keys, value_limit=value_limit, **kwargs
+        )
+
+    def refresh_group_tag_summary(
+        self, project_id, group_id, environment_ids, keys=None, value_limit=TOP_VALUES_DEFAULT_LIMIT
+    ):
+        cache_key = get_group_tag_summary_cache_key(
+            project_id, group_id, environment_ids, keys, value_limit
+        )
+        entry = cache.get(cache_key)
+        self.__refresh_group_tag_summary(
+            cache_key, entry, project_id, group_id, environment_ids, keys, value_limit
+        )
+
+    def __get_group_tag_summary(self, project_id, group_id, environment_ids, keys, value_limit):
+        """
+        Returns the cached tag summary of a group, refreshing it when it is
+        older than the fresh seconds. With stale-while-revalidate the cached
+        summary is returned as is, and refreshed in a task instead.
+        """
+        cache_key = get_group_tag_summary_cache_key(
+            project_id, group_id, environment_ids, keys, value_limit
+        )
+        entry = cache.get(cache_key)
+        fresh_seconds = options.get("snuba.tagstore.group-tag-summary-fresh-seconds")
+
+        if entry is not None and timezone.now() - entry["refreshed_at"] < timedelta(
+            seconds=fresh_seconds
+        ):
+            metrics.incr("tagstore.group_tag_summary", tags={"status": "fresh"})
+            return entry["keys"]
+
+        if entry is not None and options.get(
+            "snuba.tagstore.group-tag-summary-stale-while-revalidate"
+        ):
+            from sentry.tasks.tagstore import refresh_group_tag_summary
+
+            metrics.incr("tagstore.group_tag_summary", tags={"status": "stale"})
+            # Only one refresh is scheduled while the summary is stale
+            if cache.add(f"{cache_key}:refresh", True, max(fresh_seconds, 1)):
+                refresh_group_tag_summary.delay(
+                    project_id=project_id,
+                    group_id=group_id,
+                    environment_ids=environment_ids,
+                    keys=keys,
+                    value_limit=value_limit,
+                )
+            return entry["keys"]
+
+        metrics.incr(
+            "tagstore.group_tag_summary", tags={"status": "miss" if entry is None else "refresh"}
+        )
+        entry = self.__refresh_group_tag_summary(
+            cache_key, entry, project_id, group_id, environment_ids, keys, value_limit
+        )
+        return entry["keys"]
+
+    def __refresh_group_tag_summary(
+        self, cache_key, entry, project_id, group_id, environment_ids, keys, value_limit
+    ):
+        """
+        Recomputes the summary when there is none or it is older than the full
+        refresh seconds, and otherwise only queries the events since the end of
+        the summary and merges them into it.
+
+        The summary itself ends a settle period ago, as events can still arrive
+        for times before that. The events since are queried again on every
+        refresh and only merged into the summary that is returned.
+        """
+        now = timezone.now()
+        end = now - GROUP_TAG_SUMMARY_SETTLED_AFTER
+        full_refresh = timedelta(
+            seconds=options.get("snuba.tagstore.group-tag-summary-full-refresh-seconds")
+        )
+
+        if entry is None or now - entry["computed_at"] >= full_refresh:
+            computed_at = now
+            settled = self.__query_group_tag_summary(
+                project_id, group_id, environment_ids, keys, value_limit, start=None, end=end
+            )
+        elif entry["end"] < end:
+            computed_at = entry["computed_at"]
+            delta = self.__query_group_tag_summary(
+                project_id,
+                group_id,
+                environment_ids,
+                keys,
+                value_limit,
+                start=entry["end"],
+                end=end,
+            )
+            settled = merge_group_tag_summaries(entry["settled"], delta, value_limit)
+        else:
+            computed_at, end, settled = entry["computed_at"], entry["end"], entry["settled"]
+
+        recent = self.__query_group_tag_summary(
+            project_id, group_id, environment_ids, keys, value_limit, start=end, end=now
+        )
+        entry = {
+            "computed_at": computed_at,
+            "refreshed_at": now,
+            "end": end,
+            "settled": settled,
+            "keys": merge_group_tag_summaries(settled, recent, value_limit),
+        }
+
+        # Stale summaries are kept around for longer than they are merged
+        # into, so that stale-while-revalidate can serve them in the meantime
+        cache.set(cache_key, entry, int(full_refresh.total_seconds()) * 2)
+        return entry
+
+    def __query_group_tag_summary(
+        self, project_id, group_id, environment_ids, keys, value_limit, start, end
+    ):
+        tag_keys = self.__get_group_tag_keys_and_top_values(
+            project_id,
+            group_id,
+            environment_ids,
+            keys=keys,
+            value_limit=value_limit,
+            start=start,
+            end=end,
+        )
+        return {
+            tag_key.key: {
+                "count": tag_key.count,
+                "values": {
+                    tag_value.value: (
+                        tag_value.times_seen,
+                        tag_value.first_seen,
+                        tag_value.last_seen,
+                    )
+                    for tag_value in tag_key.top_values
+                },
+            }
+            for tag_key in tag_keys
+        }
+
+    def __get_group_tag_keys_and_top_values(
+        self,
+        project_id,
+        group_id,
+        environment_ids,
+        keys=None,
+        value_limit=TOP_VALUES_DEFAULT_LIMIT,
+        **kwargs,
     ):
         # Similar to __get_tag_key_and_top_values except we get the top values
         # for all the keys provided. value_limit in this case means the number
@@ -502,7 +727,14 @@ class SnubaTagStorage(TagStorage):
         # num_keys * limit.
 
         # First get totals and unique counts by key.
-        keys_with_counts = self.get_group_tag_keys(project_id, group_id, environment_ids, keys=keys)
+        keys_with_counts = self.get_group_tag_keys(
+            project_id,
+            group_id,
+            environment_ids,
+            keys=keys,
+            start=kwargs.get("start"),
+            end=kwargs.get("end"),
+        )
 
         # Then get the top values with first_seen/last_seen/count for each
         filters = {"project_id": get_project_list(project_id)}
@@ -1068,24 +1300,32 @@ class SnubaTagStorage(TagStorage):
         }
         if environment_ids:
             filters["environment"] = environment_ids
-        results = snuba.query(
-            dataset=Dataset.Events,
-            groupby=["tags_value"],
-            filter_keys=filters,
-            aggregations=[
-                ["count()", "", "times_seen"],
-                ["min", "timestamp", "first_seen"],
-                ["max", "timestamp", "last_seen"],
-            ],
-            orderby="-first_seen",  # Closest thing to pre-existing `-id` order
-            limit=limit,
-            referrer="tagstore.get_group_tag_value_iter",
-            offset=offset,
-        )
+        try:
+            # Rows are decoded as they are read, so the raw response isn't
+            # held next to the values. The values of a page are still built
+            # as one list, as the callbacks look them up in bulk.
+            rows = snuba.stream_raw_query(
+                dataset=Dataset.Events,
+                groupby=["tags_value"],
+                filter_keys=filters,
+                aggregations=[
+                    ["count()", "", "times_seen"],
+                    ["min", "timestamp", "first_seen"],
+                    ["max", "timestamp", "last_seen"],
+                ],
+                orderby="-first_seen",  # Closest thing to pre-existing `-id` order
+                limit=limit,
+                referrer="tagstore.get_group_tag_value_iter",
+                offset=offset,
+            )
+        except (snuba.QueryOutsideRetentionError, snuba.QueryOutsideGroupActivityError):
+            rows = []
 
         group_tag_values = [
-            GroupTagValue(group_id=group_id, key=key, value=value, **fix_tag_value_data(data))
-            for value, data in results.items()
+            GroupTagValue(
+                group_id=group_id, key=key, value=row.pop("tags_value"), **fix_tag_value_data(row)
+            )
+            for row in rows
         ]
 
         for cb in callbacks:
@@ -1,9 +1,12 @@
+import itertools
 import logging
 import time
+from collections import defaultdict
 
+from sentry import eventstore, options
 from sentry.digests import get_option_key
 from sentry.digests.backends.base import InvalidState
-from sentry.digests.notifications import build_digest, split_key
+from sentry.digests.notifications import build_digest, fetch_shared_state, fetch_state, split_key
 from sentry.models import Project, ProjectOption
 from sentry.tasks.base import instrumented_task
 from sentry.utils import snuba
@@ -28,14 +31,25 @@ def schedule_digests():
     timeout = 300
     digests.maintenance(deadline - timeout)
 
+    batch_size = options.get("digests.bulk-delivery-batch-size")
+    if not batch_size:
+        for entry in digests.schedule(deadline):
+            deliver_digest.delay(entry.key, entry.timestamp)
+        return
+
+    # Timelines of a project are delivered together so they can share lookups.
+    keys_by_project = defaultdict(list)
     for entry in digests.schedule(deadline):
-        deliver_digest.delay(entry.key, entry.timestamp)
+        keys_by_project[entry.key.split(":", 3)[2]].append(entry.key)
+
+    keys = list(itertools.chain.from_iterable(keys_by_project.values()))
+    for i in range(0, len(keys), batch_size):
+        deliver_digests.delay(keys[i : i + batch_size])
 
 
 @instrumented_task(name="sentry.tasks.digests.deliver_digest", queue="digests.delivery")
 def deliver_digest(key, schedule_timestamp=None):
     from sentry import digests
-    from sentry.mail import mail_adapter
 
     try:
         project, target_type, target_identifier = split_key(key)
@@ -51,20 +65,80 @@ def deliver_digest(key, schedule_timestamp=None):
     with snuba.options_override({"consistent": True}):
         try:
             with digests.digest(key, minimum_delay=minimum_delay) as records:
+                _bind_records(records)
                 digest, logs = build_digest(project, records)
         except InvalidState as error:
             logger.info(f"Skipped digest delivery: {error}", exc_info=True)
             return
 
-        if digest:
-            mail_adapter.notify_digest(project, digest, target_type, target_identifier)
-        else:
-            logger.info(
-                "Skipped digest delivery due to empty digest",
-                extra={
-                    "project": project.id,
-                    "target_type": target_type.value,
-                    "target_identifier": target_identifier,
-                    "build_digest_logs": logs,
-                },
-            )
+        _notify_digest(project, target_type, target_identifier, digest, logs)
+
+
+def _bind_records(records):
+    # Records that were stored with their event data don't need to be
+    # fetched from nodestore again, the others are fetched in one request.
+    unbound_events = [
+        record.value.event for record in records if not record.value.event.data.loaded
+    ]
+    if unbound_events:
+        eventstore.bind_nodes(unbound_events, "data")
+
+
+def _notify_digest(project, target_type, target_identifier, digest, logs):
+    from sentry.mail import mail_adapter
+
+    if digest:
+        mail_adapter.notify_digest(project, digest, target_type, target_identifier)
+    else:
+        logger.info(
+            "Skipped digest delivery due to empty digest",
+            extra={
+                "project": project.id,
+                "target_type": target_type.value,
+                "target_identifier": target_identifier,
+                "build_digest_logs": logs,
+            },
+        )
+
+
+@instrumented_task(name="sentry.tasks.digests.deliver_digests", queue="digests.delivery")
+def deliver_digests(keys):
+    """
+    Deliver the digests of many timelines in one pass. The timelines of each
+    project are digested together, their events are loaded from nodestore in
+    one request and group and rule lookups are shared between them.
+    """
+    from sentry import digests
+
+    targets_by_project = defaultdict(dict)
+    for key in keys:
+        try:
+            project, target_type, target_identifier = split_key(key)
+        except Project.DoesNotExist as error:
+            logger.info(f"Cannot deliver digest {key} due to error: {error}")
+            digests.delete(key)
+            continue
+        targets_by_project[project][key] = (target_type, target_identifier)
+
+    for project, targets in targets_by_project.items():
+        minimum_delay = ProjectOption.objects.get_value(
+            project, get_option_key("mail", "minimum_delay")
+        )
+
+        with snuba.options_override({"consistent": True}):
+            results = []
+            with digests.digest_many(list(targets), minimum_delay=minimum_delay) as records_by_key:
+                all_records = [record for records in records_by_key.values() for record in records]
+                if not all_records:
+                    continue
+
+                _bind_records(all_records)
+                shared_state = fetch_shared_state(all_records)
+                for key, records in records_by_key.items():
+                    state = fetch_state(project, records, shared_state) if records else None
+                    digest, logs = build_digest(project, records, state)
+                    results.append((key, digest, logs))
+
+            for key, digest, logs in results:
+                target_type, target_identifier = targets[key]
+                _notify_digest(project, target_type, target_identifier, digest, logs)
@@ -6,11 +6,16 @@ This has three major tasks, executed in the following general order:
 1. Scan for new suspect projects in Redis that need to be checked for LPQ eligibility. Triggers 2 and 3.
 2. Determine a project's eligibility for the LPQ based on their recorded metrics.
 3. Remove some specified project from the LPQ.
+
+If a symbolication budget is configured, the scan instead reads the metrics of all projects at
+once and assigns the projects which use more than their budget of the symbolication capacity to
+the LPQ (see `compute_lpq_changes`).
 """
 
+import dataclasses
 import logging
 import time
-from typing import Literal
+from typing import Literal, Mapping, Set
 
 import sentry_sdk
 
@@ -43,9 +48,17 @@ def scan_for_suspect_projects() -> None:
 
 
 def _scan_for_suspect_projects() -> None:
-    suspect_projects = set()
     now = int(time.time())
 
+    budget = options.get("store.symbolicate-event-lpq-budget")
+    capacity = options.get("store.symbolicate-event-lpq-capacity")
+    if budget > 0 and capacity > 0:
+        applied = _scan_with_budget(now, budget, capacity)
+        if applied:
+            return
+
+    suspect_projects = set()
+
     for project_id in realtime_metrics.projects():
         suspect_projects.add(project_id)
         update_lpq_eligibility.delay(project_id=project_id, cutoff=now)
@@ -64,6 +77,86 @@ def _scan_for_suspect_projects() -> None:
         _report_change(project_id=project_id, change="removed", reason="no metrics")
 
 
+@dataclasses.dataclass(frozen=True)
+class LpqChanges:
+    """The projects to move in and out of the LPQ, and the share of the symbolication capacity
+    each project used."""
+
+    add: Set[int]
+    remove: Set[int]
+    usage: Mapping[int, float]
+
+
+def compute_lpq_changes(
+    durations: Mapping[int, BucketedDurationsHistograms],
+    lpq_projects: Set[int],
+    budget: float,
+    capacity: float,
+) -> LpqChanges:
+    """
+    Decides which projects belong in the LPQ based on how much of the symbolication capacity they
+    used.
+
+    `capacity` is the number of seconds of symbolication available per second, `budget` the share
+    of that capacity a single project may use before it is moved to the LPQ. A project is only
+    moved back once it uses less than half of its budget, so that projects close to their budget
+    do not flap between the queues.
+    """
+    usage = {}
+    for project_id, project_durations in durations.items():
+        available = capacity * project_durations.total_time()
+        if available > 0:
+            used = sum(histogram.total_duration() for histogram in project_durations.histograms)
+            usage[project_id] = used / available
+
+    add = {
+        project_id
+        for project_id, share in usage.items()
+        if share > budget and project_id not in lpq_projects
+    }
+    remove = {project_id for project_id in lpq_projects if usage.get(project_id, 0.0) <= budget / 2}
+    return LpqChanges(add=add, remove=remove, usage=usage)
+
+
+def _scan_with_budget(now: int, budget: float, capacity: float) -> bool:
+    """
+    Moves projects in and out of the LPQ based on their share of the symbolication capacity.
+
+    Returns whether the changes were applied. In dry-run mode the changes are only logged.
+    """
+    project_ids = list(realtime_metrics.projects())
+    durations = realtime_metrics.get_durations_for_projects(project_ids, now)
+    lpq_projects = realtime_metrics.get_lpq_projects() or set()
+
+    changes = compute_lpq_changes(durations, lpq_projects, budget, capacity)
+    metrics.gauge("symbolication.lpq.budget.projects", len(project_ids))
+    metrics.gauge("symbolication.lpq.budget.add", len(changes.add))
+    metrics.gauge("symbolication.lpq.budget.remove", len(changes.remove))
+
+    if options.get("store.symbolicate-event-lpq-dry-run"):
+        logger.info(
+            "symbolication.lpq.dry_run",
+            extra={
+                "add": sorted(changes.add),
+                "remove": sorted(changes.remove),
+                "usage": {project_id: changes.usage[project_id] for project_id in changes.add},
+            },
+        )
+        return False
+
+    added = realtime_metrics.add_projects_to_lpq(changes.add)
+    for project_id in added:
+        _report_change(project_id=project_id, change="added", reason="budget")
+
+    if changes.remove:
+        realtime_metrics.remove_projects_from_lpq(changes.remove)
+        for project_id in changes.remove:
+            reason = "ineligible" if project_id in durations else "no metrics"
+            _report_change(project_id=project_id, change="removed", reason=reason)
+
+    return True
+
+
 @instrumented_task(  # type: ignore
     name="sentry.tasks.low_priority_symbolication.update_lpq_eligibility",
     queue="symbolications.compute_low_priority_projects",
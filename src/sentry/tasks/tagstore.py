@@ -0,0 +1,13 @@
+from sentry import tagstore
+from sentry.tasks.base import instrumented_task
+
+
+@instrumented_task(
+    name="sentry.tasks.tagstore.refresh_group_tag_summary",
+    time_limit=60,
+    soft_time_limit=50,
+)
+def refresh_group_tag_summary(project_id, group_id, environment_ids, keys, value_limit, **kwargs):
+    tagstore.refresh_group_tag_summary(
+        project_id, group_id, environment_ids, keys=keys, value_limit=value_limit
+    )
@@ -0,0 +1,10 @@
+__all__ = ["benchmark_available"]
+
+
+def benchmark_available():
+    try:
+        import pytest_benchmark  # NOQA
+    except ModuleNotFoundError:
+        return False
+    else:
+        return True
@@ -80,6 +80,14 @@ class KafkaConsumerFacade(abc.ABC):
         """
         raise NotImplementedError
 
+    def consume(self, num_messages, timeout):
+        """
+        Consume up to num_messages messages from the topic, waiting at most timeout for the first one. Consumers
+        that can fetch several messages at once should override this, the default polls a single message.
+        """
+        message = self.poll(timeout)
+        return [message] if message is not None else []
+
     @abc.abstractmethod
     def commit(self, *args, **kwargs):
         """
@@ -129,6 +137,19 @@ class AbstractBatchWorker(metaclass=abc.ABCMeta):
 
         A simple example would be closing any remaining backend connections."""
 
+    def join(self, partitions=None):
+        """Called before the final commit when partitions are revoked (with
+        the revoked `TopicPartition`s) or when the consumer shuts down (with
+        `None`). Workers which keep work in flight after `flush_batch`
+        returns should wait for that work here."""
+
+    def get_committable_offsets(self):
+        """Called before Kafka offsets are committed. Workers which complete
+        messages after `flush_batch` returns can return the list of
+        `TopicPartition`s that are safe to commit. The default of `None`
+        commits the current consumer positions."""
+        return None
+
 
 class BatchingKafkaConsumer:
     """The `BatchingKafkaConsumer` is an abstraction over most Kafka consumer's main event
@@ -200,6 +221,7 @@ class BatchingKafkaConsumer:
         metrics_sample_rates=None,
         metrics_default_tags=None,
         commit_on_shutdown: bool = False,
+        consume_batch_size: int = 1,
     ):
         assert isinstance(worker, AbstractBatchWorker)
         self.worker = worker
@@ -213,6 +235,7 @@ class BatchingKafkaConsumer:
         self.__metrics_default_tags = metrics_default_tags or {}
         self.group_id = group_id
         self.commit_on_shutdown = commit_on_shutdown
+        self.consume_batch_size = consume_batch_size
 
         self.shutdown = False
 
@@ -255,6 +278,7 @@ class BatchingKafkaConsumer:
         def on_partitions_revoked(consumer, partitions):
             "Reset the current in-memory batch, letting the next consumer take over where we left off."
             logger.info("Partitions revoked: %r", partitions)
+            self.worker.join(partitions)
             self._flush(force=True)
 
         self.consumer.subscribe(
@@ -322,17 +346,20 @@ class BatchingKafkaConsumer:
         if self.producer:
             self.producer.poll(0.0)
 
-        msg = self.consumer.poll(timeout=1.0)
+        if self.consume_batch_size > 1:
+            messages = self.consumer.consume(self.consume_batch_size, timeout=1.0)
+        else:
+            msg = self.consumer.poll(timeout=1.0)
+            messages = [msg] if msg is not None else []
 
-        if msg is None:
-            return
-        if msg.error():
-            if msg.error().code() in self.RECOVERABLE_ERRORS:
-                return
-            else:
-                raise Exception(msg.error())
+        for msg in messages:
+            if msg.error():
+                if msg.error().code() in self.RECOVERABLE_ERRORS:
+                    continue
+                else:
+                    raise Exception(msg.error())
 
-        self._handle_message(msg)
+            self._handle_message(msg)
 
     def signal_shutdown(self):
         """Tells the `BatchingKafkaConsumer` to shutdown on the next run loop iteration.
@@ -385,6 +412,7 @@ class BatchingKafkaConsumer:
         logger.debug("Stopping")
 
         if self.commit_on_shutdown:
+            self.worker.join()
             self._flush(force=True)
         else:
             # drop in-memory events, letting the next consumer take over where we left off
@@ -413,6 +441,12 @@ class BatchingKafkaConsumer:
         batch size or time. If so, delegate to the worker, clear the current batch,
         and commit offsets to Kafka."""
         if not self.__batch_messages_processed_count > 0:
+            if force:
+                # Work completed after the last flush may still have offsets
+                # to commit.
+                offsets = self.worker.get_committable_offsets()
+                if offsets:
+                    self._commit(offsets)
             return  # No messages were processed, so there's nothing to do.
 
         batch_by_size = len(self.__batch_results) >= self.max_batch_size
@@ -449,7 +483,9 @@ class BatchingKafkaConsumer:
 
         logger.debug("Committing Kafka offsets")
         commit_start = time.time()
-        self._commit()
+        offsets = self.worker.get_committable_offsets()
+        if offsets is None or offsets:
+            self._commit(offsets)
         commit_duration = (time.time() - commit_start) * 1000
         logger.debug("Kafka offset commit took %dms", commit_duration)
 
@@ -459,11 +495,14 @@ class BatchingKafkaConsumer:
         if error is not None:
             raise Exception(error.str())
 
-    def _commit(self):
+    def _commit(self, offsets=None):
         retries = 3
         while True:
             try:
-                offsets = self.consumer.commit(asynchronous=False)
+                if offsets is None:
+                    offsets = self.consumer.commit(asynchronous=False)
+                else:
+                    offsets = self.consumer.commit(offsets=offsets, asynchronous=False)
                 logger.debug("Committed offsets: %s", offsets)
                 break  # success
             except KafkaException as e:
@@ -15,6 +15,8 @@ from sentry.utils.safe import get_path
 
 PATH_SEPARATORS = frozenset(["/", "\\"])
 
+SUSPECT_COMMITS_CACHE_DURATION = 3600
+
 
 def tokenize_path(path):
     for sep in PATH_SEPARATORS:
@@ -86,7 +88,9 @@ def _get_commit_file_changes(commits, path_name_set):
     # build a single query to get all of the commit file that might match the first n frames
     path_query = reduce(operator.or_, (Q(filename__iendswith=path) for path in filenames))
 
-    commit_file_change_matches = CommitFileChange.objects.filter(path_query, commit__in=commits)
+    commit_file_change_matches = CommitFileChange.objects.filter(
+        path_query, commit__in=commits
+    ).select_related("commit")
 
     return list(commit_file_change_matches)
 
@@ -111,6 +115,53 @@ def _match_commits_path(commit_file_changes, path):
     return list(matching_commits.values())
 
 
+def suspect_commits_cache_key(group_id, releases, commits):
+    # The commit ids are part of the key, so any change to the commits of the
+    # considered releases starts a fresh set of matches.
+    return "suspect_commits:1:%s:%s" % (
+        group_id,
+        hash_values([r.id for r in releases] + sorted(c.id for c in commits)),
+    )
+
+
+def _get_commit_path_matches(group_id, releases, commits, path_set):
+    """
+    Match each frame path against the file changes of `commits`.
+
+    Matches are cached per group and release set as `{path: [(commit_id, score)]}`,
+    so events of a group only query file changes for frame paths that have not
+    been seen before and merge them into the cached result.
+    """
+    if not path_set:
+        return {}
+
+    cache_key = suspect_commits_cache_key(group_id, releases, commits)
+    path_matches = cache.get(cache_key) or {}
+
+    missing = {path for path in path_set if path not in path_matches}
+    metrics.incr(
+        "sentry.committers.path_matches.cache",
+        tags={"result": "miss" if missing else "hit"},
+    )
+    if missing:
+        file_changes = _get_commit_file_changes(commits, missing)
+        for path in missing:
+            path_matches[path] = [
+                (commit.id, score) for commit, score in _match_commits_path(file_changes, path)
+            ]
+        cache.set(cache_key, path_matches, SUSPECT_COMMITS_CACHE_DURATION)
+
+    commits_by_id = {commit.id: commit for commit in commits}
+    return {
+        path: [
+            (commits_by_id[commit_id], score)
+            for commit_id, score in path_matches[path]
+            if commit_id in commits_by_id
+        ]
+        for path in path_set
+    }
+
+
 def _get_committers(annotated_frames, commits):
     # extract the unique committers and return their serialized sentry accounts
     committers = defaultdict(int)
@@ -238,11 +289,7 @@ def get_event_file_committers(project, group_id, event_frames, event_platform, f
         f for f in (frame.get("filename") or frame.get("abs_path") for frame in app_frames) if f
     }
 
-    file_changes = []
-    if path_set:
-        file_changes = _get_commit_file_changes(commits, path_set)
-
-    commit_path_matches = {path: _match_commits_path(file_changes, path) for path in path_set}
+    commit_path_matches = _get_commit_path_matches(group.id, releases, commits, path_set)
 
     annotated_frames = [
         {
@@ -65,6 +65,34 @@ class StringCursor(Cursor):
         return cls(*bits)
 
 
+class KeysetCursor(Cursor):
+    """
+    A cursor whose value is the `(sort value, id)` of the row it continues
+    from, so that pages never need an offset. It is encoded as
+    `<sort value>,<id>:0:<is_prev>`, and `0:0:<is_prev>` starts at the end.
+    """
+
+    def __str__(self):
+        value = "{},{}".format(*self.value) if self.value else "0"
+        return f"{value}:{self.offset}:{int(self.is_prev)}"
+
+    @classmethod
+    def from_string(cls, value):
+        bits = value.split(":")
+        if len(bits) != 3:
+            raise ValueError
+        try:
+            if bits[0] == "0":
+                value = 0
+            else:
+                sort_value, id = bits[0].split(",")
+                value = (int(sort_value), int(id))
+            bits = value, int(bits[1]), int(bits[2])
+        except (TypeError, ValueError):
+            raise ValueError
+        return cls(*bits)
+
+
 class CursorResult(Sequence):
     def __init__(self, results, next, prev, hits=None, max_hits=None):
         self.results = results
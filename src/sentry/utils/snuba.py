@@ -1,17 +1,31 @@
+import codecs
 import functools
 import logging
 import os
 import random
 import re
+import threading
 import time
 from collections import OrderedDict, namedtuple
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
 from hashlib import sha1
 from operator import itemgetter
-from typing import Any, Callable, List, Mapping, MutableMapping, Optional, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 
 import pytz
@@ -21,9 +35,11 @@ from dateutil.parser import parse as parse_datetime
 from django.conf import settings
 from django.core.cache import cache
 from sentry_sdk import Hub
+from simplejson import JSONDecoder
 from snuba_sdk.legacy import json_to_snql
 from snuba_sdk.query import Query
 
+from sentry import options
 from sentry.models import (
     Environment,
     Group,
@@ -40,6 +56,7 @@ from sentry.snuba.events import Columns
 from sentry.utils import json, metrics
 from sentry.utils.compat import map
 from sentry.utils.dates import outside_retention_with_modified_start, to_timestamp
+from sentry.utils.locking import UnableToAcquireLock
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +87,10 @@ OVERRIDE_OPTIONS = {
     "consistent": os.environ.get("SENTRY_SNUBA_CONSISTENT", "false").lower() in ("true", "1")
 }
 
+# How long identical queries wait for the first of them to finish before they
+# query snuba themselves.
+SINGLE_FLIGHT_TIMEOUT = 30
+
 # Show the snuba query params and the corresponding sql or errors in the server logs
 SNUBA_INFO = os.environ.get("SENTRY_SNUBA_INFO", "false").lower() in ("true", "1")
 
@@ -689,14 +710,56 @@ def bulk_snql_query(
     return _apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache)
 
 
-def get_cache_key(query: SnubaQuery) -> str:
+def get_cache_key(query: SnubaQuery, ttl: Optional[int] = None) -> str:
     if isinstance(query, Query):
         hashable = str(query)
     else:
         hashable = json.dumps(query, sort_keys=True)
 
     # sqc - Snuba Query Cache
-    return f"sqc:{sha1(hashable.encode('utf-8')).hexdigest()}"
+    key_hash = sha1(hashable.encode("utf-8")).hexdigest()
+    if ttl is None:
+        return f"sqc:{key_hash}"
+
+    # Results are shared for one time window, which ends at a different time
+    # for every query so that they do not all expire at once.
+    window = quantize_time(datetime.utcnow(), int(key_hash[:8], 16), duration=min(ttl, 3600))
+    return f"sqc:{key_hash}:{int(to_timestamp(window))}"
+
+
+class _QueryFlights:
+    """
+    Tracks the cached queries that are currently sent to snuba by this
+    process, so that identical queries wait for the result of the first one
+    instead of sending the same query again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: MutableMapping[str, Future] = {}
+
+    def join(self, cache_key: str) -> Tuple[Future, bool]:
+        """Returns the future of the query's result, and whether the caller
+        has to run the query and `land` the result."""
+        with self._lock:
+            future = self._flights.get(cache_key)
+            if future is not None:
+                return future, False
+            future = self._flights[cache_key] = Future()
+            return future, True
+
+    def land(
+        self, cache_key: str, result: Optional[str] = None, error: Optional[Exception] = None
+    ) -> None:
+        with self._lock:
+            future = self._flights.pop(cache_key)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+
+_query_flights = _QueryFlights()
 
 
 def bulk_raw_query(
@@ -722,8 +785,17 @@ def _apply_cache_and_build_results(
 
     results = []
 
+    # Referrers with their own TTL are always cached
+    ttl = options.get("snuba.query-cache.referrer-ttls").get(referrer)
+    use_cache = use_cache or ttl is not None
+    ttl = ttl or settings.SENTRY_SNUBA_CACHE_TTL_SECONDS
+    single_flight = options.get("snuba.query-cache.single-flight")
+
     if use_cache:
-        cache_keys = [get_cache_key(query_params[0]) for _, query_params in query_param_list]
+        key_ttl = ttl if single_flight else None
+        cache_keys = [
+            get_cache_key(query_params[0], key_ttl) for _, query_params in query_param_list
+        ]
         cache_data = cache.get_many(cache_keys)
         to_query: List[Tuple[int, SnubaQueryBody, Optional[str]]] = []
         for (query_pos, query_params), cache_key in zip(query_param_list, cache_keys):
@@ -738,11 +810,13 @@ def _apply_cache_and_build_results(
     else:
         to_query = [(query_pos, query_params, None) for query_pos, query_params in query_param_list]
 
-    if to_query:
+    if to_query and use_cache and single_flight:
+        results.extend(_single_flight_query(to_query, headers, ttl))
+    elif to_query:
         query_results = _bulk_snuba_query(map(itemgetter(1), to_query), headers)
         for result, (query_pos, _, cache_key) in zip(query_results, to_query):
             if cache_key:
-                cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
+                cache.set(cache_key, json.dumps(result), ttl)
             results.append((query_pos, result))
 
     # Sort so that we get the results back in the original param list order
@@ -751,6 +825,170 @@ def _apply_cache_and_build_results(
     return map(itemgetter(1), results)
 
 
+def _single_flight_query(
+    to_query: Sequence[Tuple[int, SnubaQueryBody, str]],
+    headers: Mapping[str, str],
+    ttl: int,
+) -> List[Tuple[int, Any]]:
+    """
+    Runs cached queries such that identical queries which are running at the
+    same time are only sent to snuba once.
+
+    Within the process, later queries wait for the result of the first one.
+    Across processes this is coordinated with a lock per query if the
+    `snuba.query-cache.distributed-lock` option is set: processes that do not
+    get the lock wait for the result to show up in the cache.
+    """
+    metric_tags = {"referrer": headers.get("referer", "<unknown>")}
+    leaders = []
+    followers = []
+    for query_pos, query_params, cache_key in to_query:
+        future, is_leader = _query_flights.join(cache_key)
+        if is_leader:
+            leaders.append((query_pos, query_params, cache_key))
+        else:
+            followers.append((query_pos, query_params, cache_key, future))
+
+    results = []
+    if leaders:
+        results.extend(_lead_queries(leaders, headers, ttl))
+
+    unanswered = []
+    for query_pos, query_params, cache_key, future in followers:
+        try:
+            result = future.result(timeout=SINGLE_FLIGHT_TIMEOUT)
+        except FutureTimeoutError:
+            unanswered.append((query_pos, query_params, cache_key))
+        else:
+            metrics.incr("snuba.query_cache.coalesced", tags={**metric_tags, "source": "thread"})
+            results.append((query_pos, json.loads(result)))
+
+    if unanswered:
+        query_results = _bulk_snuba_query(map(itemgetter(1), unanswered), headers)
+        for result, (query_pos, _, cache_key) in zip(query_results, unanswered):
+            cache.set(cache_key, json.dumps(result), ttl)
+            results.append((query_pos, result))
+
+    return results
+
+
+def _lead_queries(
+    leaders: Sequence[Tuple[int, SnubaQueryBody, str]],
+    headers: Mapping[str, str],
+    ttl: int,
+) -> List[Tuple[int, Any]]:
+    metric_tags = {"referrer": headers.get("referer", "<unknown>")}
+    results = []
+    landed = set()
+    held_locks = []
+
+    try:
+        if options.get("snuba.query-cache.distributed-lock"):
+            to_run = []
+            for item, serialized, lock in _wait_for_other_processes(leaders):
+                if lock is not None:
+                    held_locks.append(lock)
+                if serialized is None:
+                    to_run.append(item)
+                else:
+                    metrics.incr(
+                        "snuba.query_cache.coalesced", tags={**metric_tags, "source": "process"}
+                    )
+                    query_pos, _, cache_key = item
+                    _query_flights.land(cache_key, serialized)
+                    landed.add(cache_key)
+                    results.append((query_pos, json.loads(serialized)))
+        else:
+            to_run = list(leaders)
+
+        if to_run:
+            query_results = _bulk_snuba_query(map(itemgetter(1), to_run), headers)
+            for result, (query_pos, _, cache_key) in zip(query_results, to_run):
+                serialized = json.dumps(result)
+                cache.set(cache_key, serialized, ttl)
+                _query_flights.land(cache_key, serialized)
+                landed.add(cache_key)
+                results.append((query_pos, result))
+    except Exception as e:
+        # Queries waiting for these results fail the same way.
+        for _, _, cache_key in leaders:
+            if cache_key not in landed:
+                _query_flights.land(cache_key, error=e)
+        raise
+    finally:
+        for lock in held_locks:
+            lock.release()
+
+    return results
+
+
+def _wait_for_other_processes(
+    items: Sequence[Tuple[int, SnubaQueryBody, str]]
+) -> List[Tuple[Tuple[int, SnubaQueryBody, str], Optional[str], Optional[Any]]]:
+    """
+    Takes a lock for every query. Queries whose lock is held by another
+    process wait until that process either cached the result or released the
+    lock.
+
+    Returns every query with its cached result, or with the acquired lock if
+    it still needs to run. Queries that are still locked after the timeout are
+    returned with neither and run regardless.
+    """
+    from sentry.app import locks
+
+    done = []
+    held = []
+    waiting = [
+        (item, locks.get(f"{item[2]}:lock", duration=SINGLE_FLIGHT_TIMEOUT)) for item in items
+    ]
+    deadline = time.monotonic() + SINGLE_FLIGHT_TIMEOUT
+    delay = 0.05
+
+    try:
+        while waiting:
+            acquired = []
+            still_waiting = []
+            for item, lock in waiting:
+                try:
+                    lock.acquire()
+                except UnableToAcquireLock:
+                    still_waiting.append((item, lock))
+                else:
+                    held.append(lock)
+                    acquired.append((item, lock))
+
+            # The lock may have been released by a process that cached the
+            # result, which then does not need to run again.
+            cached = cache.get_many([item[2] for item, _ in acquired + still_waiting])
+            for item, lock in acquired:
+                if item[2] in cached:
+                    lock.release()
+                    held.remove(lock)
+                    done.append((item, cached[item[2]], None))
+                else:
+                    done.append((item, None, lock))
+
+            waiting = []
+            for item, lock in still_waiting:
+                if item[2] in cached:
+                    done.append((item, cached[item[2]], None))
+                else:
+                    waiting.append((item, lock))
+
+            if waiting:
+                if time.monotonic() + delay > deadline:
+                    done.extend((item, None, None) for item, _ in waiting)
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+    except Exception:
+        for lock in held:
+            lock.release()
+        raise
+
+    return done
+
+
 def _bulk_snuba_query(
     snuba_param_list: Sequence[SnubaQueryBody],
     headers: Mapping[str, str],
@@ -823,20 +1061,7 @@ def _bulk_snuba_query(
             raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
 
         if response.status != 200:
-            if body.get("error"):
-                error = body["error"]
-                if response.status == 429:
-                    raise RateLimitExceeded(error["message"])
-                elif error["type"] == "schema":
-                    raise SchemaValidationError(error["message"])
-                elif error["type"] == "clickhouse":
-                    raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
-                        error["message"]
-                    )
-                else:
-                    raise SnubaError(error["message"])
-            else:
-                raise SnubaError(f"HTTP {response.status}")
+            _raise_for_error_response(response.status, body)
 
         # Forward and reverse translation maps from model ids to snuba keys, per column
         body["data"] = [reverse(d) for d in body["data"]]
@@ -845,6 +1070,232 @@ def _bulk_snuba_query(
     return results
 
 
+def _raise_for_error_response(status: int, body: Mapping[str, Any]) -> None:
+    if body.get("error"):
+        error = body["error"]
+        if status == 429:
+            raise RateLimitExceeded(error["message"])
+        elif error["type"] == "schema":
+            raise SchemaValidationError(error["message"])
+        elif error["type"] == "clickhouse":
+            raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
+                error["message"]
+            )
+        else:
+            raise SnubaError(error["message"])
+    else:
+        raise SnubaError(f"HTTP {status}")
+
+
+class _JSONStreamReader:
+    """
+    Decodes JSON values one at a time from a stream of byte chunks, keeping
+    only the undecoded rest of the stream in memory.
+    """
+
+    # Drop the consumed part of the buffer once it grows past this size
+    COMPACT_SIZE = 1 << 16
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._decoder = JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+
+    def _read_more(self) -> bool:
+        if self._exhausted:
+            return False
+
+        if self._pos > self.COMPACT_SIZE:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+
+        self._buffer += self._utf8.decode(b"", final=True)
+        self._exhausted = True
+        return False
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or "" at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\n\r":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise UnexpectedResponseError(f"Expected {char!r} in JSON response")
+        self._pos += 1
+
+    def value(self) -> Any:
+        while True:
+            self.peek()
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise UnexpectedResponseError("Could not decode JSON response")
+                continue
+
+            # A number at the end of the buffer might continue in the next chunk
+            if end == len(self._buffer) and self._read_more():
+                continue
+
+            self._pos = end
+            return value
+
+
+class StreamedResult:
+    """
+    The result of a snuba query which is decoded while it is read.
+
+    Iterating yields the rows of ``data`` one at a time, translated with the
+    query's reverse translator, without ever holding the whole response or all
+    rows in memory. The rows can only be iterated once. Other fields of the
+    response are available by key, fields which snuba sends after ``data``
+    (like ``totals`` or ``timing``) consume the remaining rows when accessed
+    before the iteration finished.
+    """
+
+    def __init__(
+        self, response: urllib3.response.HTTPResponse, reverse: Callable[[Any], Any]
+    ) -> None:
+        self._response = response
+        self._reverse = reverse
+        self._reader = _JSONStreamReader(response.stream(1 << 16, decode_content=True))
+        self._fields: MutableMapping[str, Any] = {}
+        self._rows: Optional[Iterator[Mapping[str, Any]]] = None
+        self._iterated = False
+        self._finished = False
+        self._closed = False
+
+        self._reader.expect("{")
+        self._read_fields()
+
+    def _read_fields(self) -> None:
+        """Reads fields of the response until the data rows or its end."""
+        reader = self._reader
+        while True:
+            char = reader.peek()
+            if char == "}":
+                self._finished = True
+                self.close()
+                return
+            if char == ",":
+                reader.expect(",")
+                continue
+
+            key = reader.value()
+            reader.expect(":")
+            if key == "data":
+                self._rows = self._iter_rows()
+                return
+            self._fields[key] = reader.value()
+
+    def _iter_rows(self) -> Iterator[Mapping[str, Any]]:
+        reader = self._reader
+        try:
+            reader.expect("[")
+            while reader.peek() != "]":
+                yield self._reverse(reader.value())
+                if reader.peek() == ",":
+                    reader.expect(",")
+            reader.expect("]")
+            self._read_fields()
+        finally:
+            self.close()
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        if self._iterated:
+            raise RuntimeError("The rows of a streamed result can only be iterated once")
+        self._iterated = True
+        if self._rows is not None:
+            yield from self._rows
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields and not self._closed:
+            # Skip all remaining rows to find fields sent after them
+            for _ in self._rows or ():
+                pass
+        return self._fields[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._finished:
+            # Read what is left after the JSON document, so that the
+            # connection can be reused.
+            self._response.read()
+        else:
+            # The rest of the response may still be arriving, so its
+            # connection can't be reused.
+            self._response.close()
+        self._response.release_conn()
+
+
+def _stream_snuba_query(query_body: SnubaQueryBody, headers: Mapping[str, str]) -> StreamedResult:
+    query, forward, reverse = query_body
+    if not isinstance(query, Query):
+        query = json_to_snql(query, query["dataset"])
+
+    try:
+        response = _raw_snql_query(query, Hub(Hub.current), headers, preload_content=False)
+    except urllib3.exceptions.HTTPError as err:
+        raise SnubaError(err)
+
+    if response.status != 200:
+        try:
+            body = json.loads(response.data)
+        except ValueError:
+            logger.error("snuba.query.invalid-json")
+            raise SnubaError("Failed to parse snuba error response")
+        finally:
+            response.release_conn()
+        _raise_for_error_response(response.status, body)
+
+    try:
+        return StreamedResult(response, reverse)
+    except Exception:
+        response.close()
+        response.release_conn()
+        raise
+
+
+def stream_raw_query(referrer: Optional[str] = None, **kwargs: Any) -> StreamedResult:
+    """
+    Sends a query to snuba like `raw_query`, but returns the result as a
+    `StreamedResult` which decodes rows while iterating. Streamed queries are
+    never cached.
+    """
+    headers = {"referer": referrer} if referrer else {}
+    query_body = _prepare_query_params(SnubaQueryParams(**kwargs))
+    return _stream_snuba_query(query_body, headers)
+
+
+def stream_snql_query(query: Query, referrer: Optional[str] = None) -> StreamedResult:
+    """Sends a SnQL query like `raw_snql_query`, and streams the result."""
+    metrics.incr("snql.sdk.api", tags={"referrer": referrer or "unknown"})
+    headers = {"referer": referrer} if referrer else {}
+    return _stream_snuba_query((query, lambda x: x, lambda x: x), headers)
+
+
 RawResult = Tuple[urllib3.response.HTTPResponse, Callable[[Any], Any], Callable[[Any], Any]]
 
 
@@ -876,7 +1327,7 @@ def _legacy_snql_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> Raw
 
 
 def _raw_snql_query(
-    query: Query, thread_hub: Hub, headers: Mapping[str, str]
+    query: Query, thread_hub: Hub, headers: Mapping[str, str], preload_content: bool = True
 ) -> urllib3.response.HTTPResponse:
     with timer("snql_query"):
         referrer = headers.get("referer", "<unknown>")
@@ -905,7 +1356,13 @@ def _raw_snql_query(
         with thread_hub.start_span(op="snuba_snql", description=f"query {referrer}") as span:
             span.set_tag("referrer", referrer)
             span.set_data("snql", str(query))
-            return _snuba_pool.urlopen("POST", f"/{query.dataset}/snql", body=body, headers=headers)
+            return _snuba_pool.urlopen(
+                "POST",
+                f"/{query.dataset}/snql",
+                body=body,
+                headers=headers,
+                preload_content=preload_content,
+            )
 
 
 def query(
@@ -1095,10 +1552,30 @@ def aliased_query(**kwargs):
     sentry.tagstore, or sentry.snuba.discover instead when reading data.
     """
     with sentry_sdk.start_span(op="sentry.snuba.aliased_query"):
-        return _aliased_query_impl(**kwargs)
+        return raw_query(**_resolve_aliased_query_params(**kwargs))
+
+
+def prepare_aliased_query(**kwargs) -> SnubaQueryBody:
+    """
+    Does all the work of `aliased_query` up to sending the query to Snuba,
+    including the database lookups needed to translate the filter keys.
+
+    The returned query is sent with `run_prepared_query`, which takes the
+    `referrer`. It needs no database lookups of the query anymore, but may
+    still read options, so threads calling it must close their database
+    connections when done.
+    """
+    with sentry_sdk.start_span(op="sentry.snuba.prepare_aliased_query"):
+        return _prepare_query_params(SnubaQueryParams(**_resolve_aliased_query_params(**kwargs)))
+
+
+def run_prepared_query(
+    query: SnubaQueryBody, referrer: Optional[str] = None, use_cache: bool = False
+) -> Mapping[str, Any]:
+    return list(_apply_cache_and_build_results([query], referrer=referrer, use_cache=use_cache))[0]
 
 
-def _aliased_query_impl(
+def _resolve_aliased_query_params(
     start=None,
     end=None,
     groupby=None,
@@ -1151,7 +1628,7 @@ def _aliased_query_impl(
             updated_order.append("{}{}".format("-" if order.startswith("-") else "", order_field))
         orderby = updated_order
 
-    return raw_query(
+    return dict(
         start=start,
         end=end,
         groupby=groupby,
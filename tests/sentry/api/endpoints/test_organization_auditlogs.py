@@ -4,6 +4,7 @@ from django.utils import timezone
 
 from sentry.models import AuditLogEntry, AuditLogEntryEvent
 from sentry.testutils import APITestCase
+from sentry.testutils.helpers import parse_link_header
 
 
 class OrganizationAuditLogsTest(APITestCase):
@@ -36,3 +37,22 @@ class OrganizationAuditLogsTest(APITestCase):
         assert len(response.data) == 2
         assert response.data[0]["id"] == str(entry2.id)
         assert response.data[1]["id"] == str(entry1.id)
+        assert response["X-Hits"] == "2"
+
+    def test_paginate_same_datetime(self):
+        now = timezone.now()
+        org = self.create_organization(owner=self.user, name="baz")
+        entries = [
+            AuditLogEntry.objects.create(
+                organization=org, event=AuditLogEntryEvent.ORG_EDIT, actor=self.user, datetime=now
+            )
+            for _ in range(3)
+        ]
+
+        response = self.get_success_response(org.slug, qs_params={"per_page": 2})
+        assert [entry["id"] for entry in response.data] == [str(entries[2].id), str(entries[1].id)]
+
+        links = parse_link_header(response["Link"])
+        cursor = [link for link in links.values() if link["rel"] == "next"][0]["cursor"]
+        response = self.get_success_response(org.slug, qs_params={"per_page": 2, "cursor": cursor})
+        assert [entry["id"] for entry in response.data] == [str(entries[0].id)]
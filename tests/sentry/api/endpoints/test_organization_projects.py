@@ -1,5 +1,7 @@
 from base64 import b64encode
 
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from sentry.models import ApiKey
@@ -40,6 +42,19 @@ class OrganizationProjectsTest(OrganizationProjectsTestBase):
         self.check_valid_response(response, [project])
         assert self.client.session["activeorg"] == self.organization.slug
 
+    def test_num_queries_independent_of_projects(self):
+        def count_queries():
+            with CaptureQueriesContext(connections["default"]) as queries:
+                self.get_valid_response(self.organization.slug)
+            return len(queries)
+
+        self.create_project(teams=[self.team])
+        count_queries()
+        num_queries = count_queries()
+        for _ in range(4):
+            self.create_project(teams=[self.team])
+        assert count_queries() == num_queries
+
     def test_with_stats(self):
         projects = [self.create_project(teams=[self.team])]
 
@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 from unittest.mock import patch
 
 import pytz
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from exam import fixture
@@ -96,6 +98,28 @@ class OrganizationReleaseListTest(APITestCase, SnubaTestCase):
         response = self.get_valid_response(org.slug)
         self.assert_expected_versions(response, [release4, release1, release3])
 
+    def test_num_queries_independent_of_releases(self):
+        self.login_as(user=self.user)
+        project = self.create_project()
+
+        def create_releases(versions):
+            for version in versions:
+                release = Release.objects.create(
+                    organization_id=self.organization.id, version=version, owner=self.user
+                )
+                release.add_project(project)
+
+        def count_queries():
+            with CaptureQueriesContext(connections["default"]) as queries:
+                self.get_valid_response(self.organization.slug)
+            return len(queries)
+
+        create_releases(["1", "2"])
+        count_queries()
+        num_queries = count_queries()
+        create_releases(["3", "4", "5", "6"])
+        assert count_queries() == num_queries
+
     def test_release_list_order_by_date_added(self):
         """
         Test that ensures that by relying on the default date sorting, releases
@@ -1,4 +1,5 @@
 from sentry.api.serializers import Serializer, serialize
+from sentry.models import Project
 from sentry.testutils import TestCase
 
 
@@ -53,3 +54,89 @@ class BaseSerializerTest(TestCase):
         user = self.create_user()
         result = serialize(foo, user, VariadicSerializer(), kw="keyword")
         assert result["kw"] == "keyword"
+
+    def test_memoize(self):
+        user = self.create_user()
+        other_user = self.create_user()
+        calls = []
+
+        class MemoizedSerializer(Serializer):
+            memoize = True
+
+            def get_attrs(self, item_list, user):
+                calls.append(list(item_list))
+                return {item: {"id": item.id} for item in item_list}
+
+            def serialize(self, obj, attrs, user):
+                return {"id": attrs["id"], "nested": {"id": attrs["id"]}}
+
+        memoized_serializer = MemoizedSerializer()
+
+        class OuterSerializer(Serializer):
+            def serialize(self, obj, attrs, user):
+                # Separate instances of the serializer share their results
+                return {
+                    "first": serialize([user, obj], user, MemoizedSerializer()),
+                    "second": serialize(obj, user, MemoizedSerializer()),
+                }
+
+        result = serialize([other_user, user], user, OuterSerializer())
+        assert calls == [[user, other_user]]
+        assert result[0]["second"] == {"id": other_user.id, "nested": {"id": other_user.id}}
+        assert result[1]["first"] == [
+            {"id": user.id, "nested": {"id": user.id}},
+            {"id": user.id, "nested": {"id": user.id}},
+        ]
+
+        # Results are copies, changing one does not change the others
+        result[0]["first"][0]["id"] = None
+        result[0]["first"][0]["nested"]["id"] = None
+        assert result[1]["second"] == {"id": user.id, "nested": {"id": user.id}}
+
+        # The memo only lasts for the outermost call
+        calls[:] = []
+        serialize(user, user, memoized_serializer)
+        serialize(user, user, memoized_serializer)
+        assert calls == [[user], [user]]
+
+    def test_memoize_unhashable_kwargs(self):
+        user = self.create_user()
+        calls = []
+
+        class MemoizedSerializer(Serializer):
+            memoize = True
+
+            def get_attrs(self, item_list, user, kw):
+                calls.append(list(item_list))
+                return {}
+
+            def serialize(self, obj, attrs, user, kw):
+                return {"kw": kw}
+
+        memoized_serializer = MemoizedSerializer()
+
+        class OuterSerializer(Serializer):
+            def serialize(self, obj, attrs, user):
+                return [
+                    serialize(obj, user, memoized_serializer, kw=["a"]),
+                    serialize(obj, user, memoized_serializer, kw=["a"]),
+                ]
+
+        assert serialize(user, user, OuterSerializer()) == [{"kw": ["a"]}, {"kw": ["a"]}]
+        assert calls == [[user], [user]]
+
+    def test_prefetch_related(self):
+        projects = [self.create_project(), self.create_project()]
+        projects = list(Project.objects.filter(id__in=[p.id for p in projects]))
+
+        class PrefetchSerializer(Serializer):
+            prefetch_related = ("organization",)
+
+            def serialize(self, obj, attrs, user):
+                return obj.organization.slug
+
+        with self.assertNumQueries(1):
+            assert serialize(projects, serializer=PrefetchSerializer()) == [
+                self.organization.slug,
+                self.organization.slug,
+            ]
@@ -7,6 +7,7 @@ from django.test import SimpleTestCase
 from django.utils import timezone
 from freezegun import freeze_time
 
+from sentry.api import event_search
 from sentry.api.event_search import (
     AggregateKey,
     SearchConfig,
@@ -14,10 +15,12 @@ from sentry.api.event_search import (
     SearchKey,
     SearchValue,
     parse_search_query,
+    parse_search_tree,
 )
 from sentry.constants import MODULE_ROOT
 from sentry.exceptions import InvalidSearchQuery
 from sentry.search.utils import parse_datetime_string, parse_duration, parse_numeric_value
+from sentry.testutils.helpers import benchmark_available
 from sentry.utils import json
 
 fixture_path = "tests/fixtures/search-syntax"
@@ -47,6 +50,14 @@ def register_fixture_tests(cls, skipped):
         assign_test_case(name, tests)
 
 
+def load_fixture_queries():
+    queries = []
+    for file in sorted(os.listdir(abs_fixtures_path)):
+        with open(os.path.join(abs_fixtures_path, file)) as fp:
+            queries.extend(case["query"] for case in json.load(fp))
+    return queries
+
+
 def result_transformer(result):
     """
     This is used to translate the expected token results from the format used
@@ -476,3 +487,63 @@ class ParseSearchQueryBackendTest(SimpleTestCase):
 def test_search_value(raw, result):
     search_value = SearchValue(raw)
     assert search_value.value == result
+
+
+class ParseSearchTreeCacheTest(SimpleTestCase):
+    def setUp(self):
+        event_search._parse_search_tree.cache_clear()
+
+    def test_cached(self):
+        tree = parse_search_tree("user.email:foo@example.com release:1.2.1")
+        assert parse_search_tree("user.email:foo@example.com release:1.2.1") is tree
+        assert parse_search_tree("user.email:foo@example.com") is not tree
+
+    def test_long_query_not_cached(self):
+        query = "message:" + "a" * event_search.MAX_CACHED_QUERY_LENGTH
+        assert parse_search_tree(query) is not parse_search_tree(query)
+        assert event_search._parse_search_tree.cache_info().currsize == 0
+
+    def test_relative_dates_resolved_per_parse(self):
+        now = timezone.now()
+        with freeze_time(now):
+            assert parse_search_query("first_seen:-2w")[0].value.raw_value == now - timedelta(
+                days=14
+            )
+
+        later = now + timedelta(hours=1)
+        with freeze_time(later):
+            assert parse_search_query("first_seen:-2w")[0].value.raw_value == later - timedelta(
+                days=14
+            )
+
+    def test_config_resolved_per_parse(self):
+        config = SearchConfig(numeric_keys={"custom_num"})
+        assert parse_search_query("custom_num:>10") == [
+            SearchFilter(key=SearchKey(name="custom_num"), operator="=", value=SearchValue(">10"))
+        ]
+        assert parse_search_query("custom_num:>10", config=config) == [
+            SearchFilter(key=SearchKey(name="custom_num"), operator=">", value=SearchValue(10))
+        ]
+
+    def test_invalid_query_raises_every_time(self):
+        for _ in range(2):
+            with pytest.raises(InvalidSearchQuery):
+                parse_search_query("(user.email:foo@example.com")
+
+
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize("cached", [False, True], ids=["uncached", "cached"])
+def test_benchmark_parse_search_query(cached, benchmark):
+    queries = load_fixture_queries()
+
+    def parse_all():
+        if not cached:
+            event_search._parse_search_tree.cache_clear()
+        for query in queries:
+            try:
+                parse_search_query(query)
+            except InvalidSearchQuery:
+                pass
+
+    parse_all()
+    benchmark(parse_all)
@@ -1,5 +1,6 @@
 from datetime import timedelta
 from unittest import TestCase as SimpleTestCase
+from unittest import mock
 
 from django.utils import timezone
 
@@ -10,6 +11,7 @@ from sentry.api.paginator import (
     CombinedQuerysetPaginator,
     DateTimePaginator,
     GenericOffsetPaginator,
+    KeysetPaginator,
     OffsetPaginator,
     Paginator,
     SequencePaginator,
@@ -18,7 +20,7 @@ from sentry.api.paginator import (
 from sentry.incidents.models import AlertRule
 from sentry.models import Rule, User
 from sentry.testutils import APITestCase, TestCase
-from sentry.utils.cursors import Cursor
+from sentry.utils.cursors import Cursor, KeysetCursor
 
 
 class PaginatorTest(TestCase):
@@ -403,6 +405,127 @@ def test_reverse_bisect_left():
     assert reverse_bisect_left([3, 2, 1], 2, hi=10) == 1
 
 
+class KeysetPaginatorTest(TestCase):
+    def test_ascending(self):
+        joined = timezone.now()
+
+        res1 = self.create_user("foo@example.com", date_joined=joined)
+        res2 = self.create_user("bar@example.com", date_joined=joined + timedelta(seconds=1))
+        res3 = self.create_user("baz@example.com", date_joined=joined + timedelta(seconds=2))
+        res4 = self.create_user("qux@example.com", date_joined=joined + timedelta(seconds=3))
+
+        paginator = KeysetPaginator(User.objects.all(), "date_joined")
+        result1 = paginator.get_result(limit=2, cursor=None)
+        assert list(result1) == [res1, res2]
+        assert result1.next
+        assert not result1.prev
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == [res3, res4]
+        assert not result2.next
+        assert result2.prev
+
+        result3 = paginator.get_result(limit=1, cursor=result2.prev)
+        assert list(result3) == [res2]
+        assert result3.next
+        assert result3.prev
+
+        result4 = paginator.get_result(limit=1, cursor=result3.prev)
+        assert list(result4) == [res1]
+        assert result4.next
+        assert not result4.prev
+
+    def test_descending_same_value(self):
+        joined = timezone.now()
+        users = [self.create_user(f"{i}@example.com", date_joined=joined) for i in range(5)]
+        users.reverse()
+
+        paginator = KeysetPaginator(User.objects.all(), "-date_joined")
+        seen = []
+        cursor = None
+        for _ in range(3):
+            result = paginator.get_result(limit=2, cursor=cursor)
+            seen.extend(result)
+            cursor = result.next
+        assert seen == users
+        assert not cursor
+
+        result = paginator.get_result(limit=2, cursor=result.prev)
+        assert list(result) == users[2:4]
+        assert result.prev
+
+    def test_empty_page_goes_back(self):
+        res1 = self.create_user("foo@example.com")
+        res2 = self.create_user("bar@example.com")
+
+        paginator = KeysetPaginator(User.objects.all(), "-id")
+        result1 = paginator.get_result(limit=2, cursor=None)
+        assert list(result1) == [res2, res1]
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == []
+        assert not result2.next
+        assert result2.prev
+
+        result3 = paginator.get_result(limit=2, cursor=result2.prev)
+        assert list(result3) == [res2, res1]
+
+    def test_prev_with_new(self):
+        res1 = self.create_user("foo@example.com")
+
+        paginator = KeysetPaginator(User.objects.all(), "-date_joined")
+        result1 = paginator.get_result(limit=10, cursor=None)
+        assert list(result1) == [res1]
+
+        res2 = self.create_user("bar@example.com")
+        result2 = paginator.get_result(limit=10, cursor=result1.prev)
+        assert list(result2) == [res2]
+
+    def test_cursor_string(self):
+        joined = timezone.now()
+        res1 = self.create_user("foo@example.com", date_joined=joined)
+        self.create_user("bar@example.com", date_joined=joined)
+
+        paginator = KeysetPaginator(User.objects.all(), "date_joined")
+        result1 = paginator.get_result(limit=1, cursor=None)
+        cursor = KeysetCursor.from_string(str(result1.next))
+        assert cursor.value == result1.next.value
+        assert cursor.value[1] == res1.id
+
+        result2 = paginator.get_result(limit=1, cursor=cursor)
+        assert len(result2) == 1
+        assert result2[0] != res1
+
+        with self.assertRaises(BadPaginationError):
+            paginator.get_result(limit=1, cursor=Cursor(10, 0, 0))
+
+    def test_approximate_hits(self):
+        for i in range(3):
+            self.create_user(f"{i}@example.com")
+
+        paginator = KeysetPaginator(User.objects.all(), "id", approximate_hits=True)
+        assert paginator.estimate_hits(0) == 0
+
+        # Few planned rows are counted exactly
+        with mock.patch.object(paginator, "_get_planned_rows", return_value=10):
+            result = paginator.get_result(limit=1, count_hits=True)
+        assert result.hits == 3
+        assert result.max_hits == 1000
+
+        # Many planned rows are never counted
+        with mock.patch.object(paginator, "_get_planned_rows", return_value=5000):
+            with mock.patch.object(paginator, "count_hits") as count_hits:
+                result = paginator.get_result(limit=1, count_hits=True)
+        assert result.hits == 1000
+        assert not count_hits.called
+
+        h_sql, h_params = paginator._get_hits_sql()
+        assert paginator._get_planned_rows(h_sql, h_params) >= 0
+
+        paginator = KeysetPaginator(User.objects.none(), "id", approximate_hits=True)
+        assert paginator.estimate_hits(1000) == 0
+
+
 class SequencePaginatorTestCase(SimpleTestCase):
     def test_empty_results(self):
         paginator = SequencePaginator([])
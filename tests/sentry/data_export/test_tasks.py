@@ -383,7 +383,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
 
         assert emailer.called
 
-    @patch("sentry.snuba.discover.raw_query")
+    @patch("sentry.snuba.discover.stream_raw_query")
     @patch("sentry.data_export.models.ExportedData.email_failure")
     def test_discover_outside_retention(self, emailer, mock_query):
         """
@@ -410,7 +410,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         error = emailer.call_args[1]["message"]
         assert error == "Invalid date range. Please try a more recent date range."
 
-    @patch("sentry.snuba.discover.query")
+    @patch("sentry.snuba.discover.stream_query")
     @patch("sentry.data_export.models.ExportedData.email_failure")
     def test_discover_invalid_search_query(self, emailer, mock_query):
         de = ExportedData.objects.create(
@@ -433,7 +433,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         error = emailer.call_args[1]["message"]
         assert error == "Invalid query. Please fix the query and try again."
 
-    @patch("sentry.snuba.discover.raw_query")
+    @patch("sentry.snuba.discover.stream_raw_query")
     def test_retries_on_recoverable_snuba_errors(self, mock_query):
         de = ExportedData.objects.create(
             user=self.user,
@@ -443,10 +443,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         )
         mock_query.side_effect = [
             QueryMemoryLimitExceeded("test"),
-            {
-                "data": [{"count": 3}],
-                "meta": [{"name": "count", "type": "UInt64"}],
-            },
+            [{"count": 3}],
         ]
         with self.tasks():
             assemble_download(de.id, count_down=0)
@@ -461,7 +458,7 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         assert file.checksum is not None
         header, row = file.getfile().read().strip().split(b"\r\n")
 
-    @patch("sentry.snuba.discover.raw_query")
+    @patch("sentry.snuba.discover.stream_raw_query")
     @patch("sentry.data_export.models.ExportedData.email_failure")
     def test_discover_snuba_error(self, emailer, mock_query):
         de = ExportedData.objects.create(
@@ -39,6 +39,39 @@ class RedisBackendTestCase(TestCase):
         # longer exist at this point.
         assert set(backend.schedule(time.time())) == set()
 
+    def test_digest_many(self):
+        backend = RedisBackend()
+
+        record_1 = Record("record:1", "value", time.time())
+        record_2 = Record("record:2", "value", time.time())
+        backend.add("timeline:1", record_1)
+        backend.add("timeline:2", record_2)
+
+        with backend.digest_many(["timeline:1", "timeline:2", "timeline:3"], 0) as records:
+            assert records == {"timeline:1": [record_1], "timeline:2": [record_2]}
+
+        # Both timelines were closed and are waiting to be scheduled again.
+        assert {entry.key for entry in backend.schedule(time.time())} == {
+            "timeline:1",
+            "timeline:2",
+        }
+
+        with backend.digest_many(["timeline:1", "timeline:2"], 0) as records:
+            assert records == {"timeline:1": [], "timeline:2": []}
+
+        assert set(backend.schedule(time.time())) == set()
+
+    def test_digest_many_skips_waiting(self):
+        backend = RedisBackend()
+
+        backend.add("timeline:1", Record("record:1", "value", time.time()))
+        with backend.digest("timeline:1", 0):
+            pass
+
+        # The closed timeline is waiting to be scheduled, not ready.
+        with backend.digest_many(["timeline:1"], 0) as records:
+            assert records == {}
+
     def test_truncation(self):
         backend = RedisBackend(capacity=2, truncation_chance=1.0)
 
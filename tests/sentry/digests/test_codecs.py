@@ -0,0 +1,31 @@
+from sentry.digests.codecs import CompactRecordCodec, CompressedPickleCodec
+from sentry.digests.notifications import event_to_record
+from sentry.models.rule import Rule
+from sentry.testutils import TestCase
+from sentry.testutils.helpers.datetime import before_now, iso_format
+
+
+class CompactRecordCodecTest(TestCase):
+    def setUp(self):
+        self.rule = Rule.objects.create(project=self.project, label="Test Rule", data={})
+        self.event = self.store_event(
+            data={"timestamp": iso_format(before_now(minutes=1)), "message": "hello"},
+            project_id=self.project.id,
+        )
+        self.notification = event_to_record(self.event, [self.rule]).value
+
+    def test_roundtrip(self):
+        codec = CompactRecordCodec()
+        event, rules = codec.decode(codec.encode(self.notification))
+        assert event.project_id == self.project.id
+        assert event.event_id == self.event.event_id
+        assert event.group_id == self.event.group_id
+        assert rules == [self.rule.id]
+        # The payload is loaded from nodestore on access.
+        assert event.data["logentry"]["formatted"] == "hello"
+
+    def test_decodes_pickled_records(self):
+        value = CompressedPickleCodec().encode(self.notification)
+        event, rules = CompactRecordCodec().decode(value)
+        assert event.event_id == self.event.event_id
+        assert rules == [self.rule.id]
@@ -138,6 +138,83 @@ def test_consumer_start_from_partition_start(requires_kafka):
         assert consumer.poll(1) is None
 
 
+def test_consumer_consume_batch(requires_kafka):
+    synchronize_commit_group = f"consumer-{uuid.uuid1().hex}"
+
+    messages_delivered = defaultdict(list)
+
+    def record_message_delivered(error, message):
+        assert error is None
+        messages_delivered[message.topic()].append(message)
+
+    producer = Producer(
+        {
+            "bootstrap.servers": os.environ["SENTRY_KAFKA_HOSTS"],
+            "on_delivery": record_message_delivered,
+        }
+    )
+
+    with create_topic() as topic, create_topic() as commit_log_topic:
+
+        # Produce some messages into the topic.
+        for i in range(5):
+            producer.produce(topic, f"{i}".encode())
+
+        assert producer.flush(5) == 0, "producer did not successfully flush queue"
+
+        # Create the synchronized consumer.
+        consumer = SynchronizedConsumer(
+            cluster_name="default",
+            consumer_group=f"consumer-{uuid.uuid1().hex}",
+            commit_log_topic=commit_log_topic,
+            synchronize_commit_group=synchronize_commit_group,
+            initial_offset_reset="earliest",
+        )
+
+        assignments_received = []
+
+        def on_assign(c, assignment):
+            assert c is consumer
+            assignments_received.append(assignment)
+
+        consumer.subscribe([topic], on_assign=on_assign)
+
+        # Wait until we have received our assignments.
+        for i in range(10):  # this takes a while
+            assert consumer.consume(10, 1) == []
+            if assignments_received:
+                break
+
+        assert len(assignments_received) == 1, "expected to receive partition assignment"
+
+        # Make sure that there are no messages ready to consume.
+        assert consumer.consume(10, 1) == []
+
+        # Move the committed offset forward for our synchronizing group, past
+        # the first three messages.
+        message = messages_delivered[topic][2]
+        producer.produce(
+            commit_log_topic,
+            key=f"{message.topic()}:{message.partition()}:{synchronize_commit_group}".encode(),
+            value=f"{message.offset() + 1}".encode(),
+        )
+
+        assert producer.flush(5) == 0, "producer did not successfully flush queue"
+
+        # We should receive exactly the committed messages, even though more
+        # were requested.
+        messages = []
+        for i in range(5):
+            messages.extend(consumer.consume(10, 1))
+            if len(messages) >= 3:
+                break
+
+        assert [m.offset() for m in messages] == [m.offset() for m in messages_delivered[topic][:3]]
+
+        # We should not be able to continue reading into the topic.
+        assert consumer.consume(10, 1) == []
+
+
 def test_consumer_start_from_committed_offset(requires_kafka):
     consumer_group = f"consumer-{uuid.uuid1().hex}"
     synchronize_commit_group = f"consumer-{uuid.uuid1().hex}"
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from sentry.eventstream.kafka.dispatcher import OrderedPartitionDispatcher
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = OrderedPartitionDispatcher(concurrency=4, max_in_flight=3)
+    yield dispatcher
+    dispatcher.shutdown()
+
+
+def offsets(dispatcher):
+    return {(p.topic, p.partition): p.offset for p in dispatcher.get_committable_offsets()}
+
+
+def test_slow_message_holds_back_commit_only(dispatcher):
+    blocked = threading.Event()
+    dispatched = []
+
+    def dispatch(value, wait=False):
+        if wait:
+            blocked.wait(5)
+        dispatched.append(value)
+
+    dispatcher.submit("events", 0, 10, None, dispatch, "slow", True)
+    dispatcher.submit("events", 0, 11, None, dispatch, "a")
+    dispatcher.submit("events", 1, 20, None, dispatch, "b").result(5)
+    dispatcher.join([("events", 1)])
+
+    # Later messages were dispatched while the first one is still running,
+    # but partition 0 can't be committed past it.
+    assert "slow" not in dispatched
+    assert offsets(dispatcher) == {("events", 1): 21}
+
+    blocked.set()
+    dispatcher.join()
+    assert offsets(dispatcher) == {("events", 0): 12}
+
+
+def test_same_key_is_ordered(dispatcher):
+    blocked = threading.Event()
+    dispatched = []
+
+    def dispatch(value, wait=False):
+        if wait:
+            blocked.wait(5)
+        dispatched.append(value)
+
+    dispatcher.submit("events", 0, 0, "group-1", dispatch, 1, True)
+    dispatcher.submit("events", 1, 0, "group-1", dispatch, 2)
+    dispatcher.submit("events", 0, 1, "group-2", dispatch, 3).result(5)
+    assert dispatched == [3]
+
+    blocked.set()
+    dispatcher.join()
+    assert dispatched == [3, 1, 2]
+
+
+def test_window_blocks_submit():
+    dispatcher = OrderedPartitionDispatcher(concurrency=2, max_in_flight=1)
+    blocked = threading.Event()
+    dispatcher.submit("events", 0, 0, None, blocked.wait, 5)
+
+    submitted = threading.Event()
+
+    def submit():
+        dispatcher.submit("events", 0, 1, None, lambda: None)
+        submitted.set()
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    assert not submitted.wait(0.1)
+
+    blocked.set()
+    assert submitted.wait(5)
+    thread.join()
+    dispatcher.join()
+    assert offsets(dispatcher) == {("events", 0): 2}
+    dispatcher.shutdown()
+
+
+def test_skip(dispatcher):
+    dispatcher.skip("events", 0, 4)
+    assert offsets(dispatcher) == {("events", 0): 5}
+
+    blocked = threading.Event()
+    dispatcher.submit("events", 0, 5, None, blocked.wait, 5)
+    dispatcher.skip("events", 0, 6)
+    assert offsets(dispatcher) == {("events", 0): 5}
+
+    blocked.set()
+    dispatcher.join()
+    assert offsets(dispatcher) == {("events", 0): 7}
+
+
+def test_error_is_raised_and_not_committed(dispatcher):
+    def fail():
+        raise ValueError("nope")
+
+    dispatcher.submit("events", 0, 0, None, lambda: None)
+    dispatcher.submit("events", 0, 1, None, fail)
+    dispatcher.submit("events", 0, 2, None, lambda: None)
+
+    with pytest.raises(ValueError):
+        dispatcher.join()
+
+    assert offsets(dispatcher) == {("events", 0): 1}
+    with pytest.raises(ValueError):
+        dispatcher.submit("events", 0, 3, None, lambda: None)
+
+
+def test_revoked_partitions_are_dropped(dispatcher):
+    dispatcher.submit("events", 0, 0, None, lambda: None)
+    dispatcher.submit("events", 1, 0, None, lambda: None).result(5)
+    dispatcher.join([("events", 0)])
+
+    assert offsets(dispatcher) == {("events", 0): 1, ("events", 1): 1}
+    assert offsets(dispatcher) == {("events", 1): 1}
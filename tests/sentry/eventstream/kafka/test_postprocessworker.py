@@ -286,3 +286,56 @@ def test_transactions_post_process_forwarder_true_headers(
     )
 
     forwarder.shutdown()
+
+
+@pytest.mark.django_db
+@patch("sentry.eventstream.kafka.postprocessworker.dispatch_post_process_group_task")
+def test_post_process_forwarder_max_in_flight(
+    dispatch_post_process_group_task, kafka_message_without_transaction_header
+):
+    """
+    Tests that with max_in_flight set, messages are dispatched through the ordered dispatcher and only
+    the offsets of completed messages are committable.
+    """
+    kafka_message_without_transaction_header.topic = MagicMock(return_value="events")
+    kafka_message_without_transaction_header.partition = MagicMock(return_value=1)
+    kafka_message_without_transaction_header.offset = MagicMock(return_value=41)
+
+    forwarder = PostProcessForwarderWorker(concurrency=2, max_in_flight=10)
+    future = forwarder.process_message(kafka_message_without_transaction_header)
+    future.result(5)
+    forwarder.flush_batch([future])
+
+    dispatch_post_process_group_task.assert_called_once_with(
+        event_id="fe0ee9a2bc3b415497bad68aaf70dc7f",
+        project_id=1,
+        group_id=43,
+        primary_hash="311ee66a5b8e697929804ceb1c456ffe",
+        is_new=False,
+        is_regression=None,
+        is_new_group_environment=False,
+    )
+    [offset] = forwarder.get_committable_offsets()
+    assert (offset.topic, offset.partition, offset.offset) == ("events", 1, 42)
+
+    forwarder.shutdown()
+
+
+@pytest.mark.django_db
+def test_transactions_post_process_forwarder_max_in_flight_skips(
+    kafka_message_without_transaction_header,
+):
+    """
+    Tests that messages which are not forwarded still advance the committable offset.
+    """
+    kafka_message_without_transaction_header.topic = MagicMock(return_value="events")
+    kafka_message_without_transaction_header.partition = MagicMock(return_value=1)
+    kafka_message_without_transaction_header.offset = MagicMock(return_value=41)
+
+    forwarder = TransactionsPostProcessForwarderWorker(concurrency=1, max_in_flight=10)
+    assert forwarder.process_message(kafka_message_without_transaction_header) is None
+
+    [offset] = forwarder.get_committable_offsets()
+    assert (offset.topic, offset.partition, offset.offset) == ("events", 1, 42)
+
+    forwarder.shutdown()
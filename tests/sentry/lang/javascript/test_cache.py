@@ -1,6 +1,8 @@
 from unittest import TestCase
+from unittest.mock import Mock
 
-from sentry.lang.javascript.cache import SourceCache
+from sentry.lang.javascript.cache import ParsedSourceCache, SourceCache
+from sentry.testutils.helpers.options import override_options
 
 
 class BasicCacheTest(TestCase):
@@ -37,3 +39,56 @@ class BasicCacheTest(TestCase):
         # fall back to utf-8
         cache.add(url, "foobar".encode("utf-32"), encoding="utf-32")
         assert cache.get(url)[0] == "foobar"
+
+
+class ParsedSourceCacheTest(TestCase):
+    def test_parses_once(self):
+        cache = ParsedSourceCache()
+        parse = Mock(side_effect=lambda body: body.upper())
+
+        with override_options({"sourcemaps.parsed-cache-size": 100}):
+            assert cache.get_or_parse(("source", "a"), b"foo", parse) == b"FOO"
+            assert cache.get_or_parse(("source", "a"), b"foo", parse) == b"FOO"
+
+        assert parse.call_count == 1
+        assert len(cache) == 1
+        assert cache.size == 6
+
+    def test_evicts_least_recently_used(self):
+        cache = ParsedSourceCache()
+        parse = Mock(side_effect=lambda body: body)
+
+        with override_options({"sourcemaps.parsed-cache-size": 100}):
+            cache.get_or_parse(("source", "a"), b"a" * 12, parse)
+            cache.get_or_parse(("source", "b"), b"b" * 12, parse)
+            cache.get_or_parse(("source", "c"), b"c" * 12, parse)
+            cache.get_or_parse(("source", "a"), b"a" * 12, parse)
+            cache.get_or_parse(("source", "d"), b"d" * 12, parse)
+            cache.get_or_parse(("source", "e"), b"e" * 12, parse)
+
+            assert cache.size == 96
+            assert parse.call_count == 5
+            # "b" was the least recently used entry and was evicted.
+            cache.get_or_parse(("source", "b"), b"b" * 12, parse)
+            assert parse.call_count == 6
+
+    def test_rejects_large_entries(self):
+        cache = ParsedSourceCache()
+        parse = Mock(side_effect=lambda body: body)
+
+        with override_options({"sourcemaps.parsed-cache-size": 100}):
+            assert cache.get_or_parse(("source", "a"), b"a" * 13, parse) == b"a" * 13
+            assert cache.get_or_parse(("sourcemap", "b"), b"b" * 6, parse) == b"b" * 6
+
+        assert len(cache) == 0
+
+    def test_disabled(self):
+        cache = ParsedSourceCache()
+        parse = Mock(side_effect=lambda body: body)
+
+        with override_options({"sourcemaps.parsed-cache-size": 0}):
+            cache.get_or_parse(("source", "a"), b"foo", parse)
+            cache.get_or_parse(("source", "a"), b"foo", parse)
+
+        assert parse.call_count == 2
+        assert len(cache) == 0
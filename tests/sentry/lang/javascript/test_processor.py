@@ -1,9 +1,11 @@
 import errno
+import os
 import re
 import unittest
 import zipfile
 from copy import deepcopy
 from io import BytesIO
+from tempfile import TemporaryDirectory
 from unittest.mock import ANY, MagicMock, call, patch
 
 import pytest
@@ -25,6 +27,7 @@ from sentry.lang.javascript.processor import (
     fetch_release_file,
     fetch_sourcemap,
     generate_module,
+    get_index_entry,
     get_max_age,
     get_release_file_cache_key,
     get_release_file_cache_key_meta,
@@ -32,7 +35,11 @@ from sentry.lang.javascript.processor import (
     trim_line,
 )
 from sentry.models import EventError, File, Release, ReleaseFile
-from sentry.models.releasefile import ARTIFACT_INDEX_FILENAME, update_artifact_index
+from sentry.models.releasefile import (
+    ARTIFACT_INDEX_FILENAME,
+    load_artifact_index,
+    update_artifact_index,
+)
 from sentry.testutils import TestCase
 from sentry.testutils.helpers.options import override_options
 from sentry.utils import json
@@ -94,6 +101,51 @@ class JavaScriptStacktraceProcessorTest(TestCase):
         assert processor.dist.name == "foo"
         assert processor.dist.date_added.timestamp() == processor.data["timestamp"]
 
+    @patch("sentry.lang.javascript.processor.connections")
+    @patch("sentry.lang.javascript.processor.fetch_sourcemap")
+    @patch("sentry.lang.javascript.processor.fetch_file")
+    def test_populate_source_cache_concurrent(
+        self, mock_fetch_file, mock_fetch_sourcemap, mock_connections
+    ):
+        project = self.create_project()
+
+        def fetch_file(url, **kwargs):
+            if url.endswith("missing.js"):
+                raise http.BadSource({"type": EventError.JS_MISSING_SOURCE, "url": url})
+            body = b"foo()\n//# sourceMappingURL=bundle.js.map"
+            return http.UrlResult(url, {}, body, 200, "utf-8")
+
+        mock_fetch_file.side_effect = fetch_file
+        mock_fetch_sourcemap.side_effect = http.BadSource(
+            {"type": EventError.JS_MISSING_SOURCE, "url": "http://example.com/bundle.js.map"}
+        )
+
+        processor = JavaScriptStacktraceProcessor(data={}, stacktrace_infos=None, project=project)
+        frames = [
+            {"abs_path": f"http://example.com/{name}.js", "lineno": 1, "colno": 1}
+            for name in ("bundle", "bundle", "missing")
+        ] + [{"abs_path": "http://example.com/bundle.js?v=1", "lineno": 1, "colno": 1}]
+
+        with override_options({"sourcemaps.fetch-concurrency": 4}):
+            processor.populate_source_cache(frames)
+
+        assert mock_fetch_file.call_count == 3
+        # Both bundles reference the same source map, which is fetched once.
+        assert mock_fetch_sourcemap.call_count == 1
+        # Only the source files were fetched on worker threads.
+        assert mock_connections.close_all.call_count == 3
+        assert processor.fetch_count == 3
+
+        assert processor.cache.get("http://example.com/bundle.js")
+        assert processor.cache.get("http://example.com/bundle.js?v=1")
+        assert processor.cache.get_errors("http://example.com/missing.js") == [
+            {"type": EventError.JS_MISSING_SOURCE, "url": "http://example.com/missing.js"}
+        ]
+        for filename in ("http://example.com/bundle.js", "http://example.com/bundle.js?v=1"):
+            assert processor.cache.get_errors(filename) == [
+                {"type": EventError.JS_MISSING_SOURCE, "url": "http://example.com/bundle.js.map"}
+            ]
+
 
 def test_build_fetch_retry_condition() -> None:
     e = OSError()
@@ -579,6 +631,46 @@ class FetchFileTest(TestCase):
         result2 = fetch_file("/example.js", release=release)
         assert result2 == result
 
+    def test_non_url_with_mapped_release_archive(self):
+        compressed = BytesIO()
+        with zipfile.ZipFile(compressed, mode="w") as zip_file:
+            zip_file.writestr("example.js", b"foo")
+            zip_file.writestr("other.js", b"bar")
+            zip_file.writestr(
+                "manifest.json",
+                json.dumps(
+                    {
+                        "files": {
+                            "example.js": {"url": "/example.js"},
+                            "other.js": {"url": "/other.js"},
+                        }
+                    }
+                ),
+            )
+
+        release = Release.objects.create(version="1", organization_id=self.project.organization_id)
+        release.add_project(self.project)
+
+        compressed.seek(0)
+        file_ = File.objects.create(name="foo", type="release.bundle")
+        file_.putfile(compressed)
+        update_artifact_index(release, None, file_)
+
+        ReleaseFile.archive_cache.clear()
+        with TemporaryDirectory() as cache_path, override_options(
+            {"releasefile.mmap-archives": True, "releasefile.cache-path": cache_path}
+        ), patch.object(File, "save_to", autospec=True, side_effect=File.save_to) as save_to:
+            assert fetch_file("/example.js", release=release).body == b"foo"
+            assert fetch_file("/other.js", release=release).body == b"bar"
+            with pytest.raises(http.BadSource):
+                fetch_file("does-not-exist.js", release=release)
+
+            # The archive was only written to disk once and kept open.
+            assert save_to.call_count == 1
+            assert os.listdir(os.path.join(cache_path, "archives")) == [file_.checksum]
+
+        ReleaseFile.archive_cache.clear()
+
     def _create_archive(self, release, url):
         pseudo_archive = File.objects.create(name="", type="release.bundle")
         pseudo_archive.putfile(BytesIO(b"0123456789"))
@@ -600,6 +692,23 @@ class FetchFileTest(TestCase):
             file=file,
         )
 
+    @patch("sentry.lang.javascript.processor.load_artifact_index", side_effect=load_artifact_index)
+    def test_artifact_index_decoded_once(self, mock_load_artifact_index):
+        release = Release.objects.create(version="1", organization_id=self.project.organization_id)
+        self._create_archive(release, "foo")
+
+        assert get_index_entry(release, None, "foo") is not None
+        # Only the checksum is kept in the Django cache, the decoded index is
+        # reused even after it expires.
+        cache.delete(
+            "artifact-index:v2:{}:{}".format(
+                release.id, ReleaseFile.get_ident(ARTIFACT_INDEX_FILENAME)
+            )
+        )
+        assert get_index_entry(release, None, "foo") is not None
+        assert get_index_entry(release, None, "bar") is None
+        assert mock_load_artifact_index.call_count == 1
+
     @patch("sentry.lang.javascript.processor.cache.set", side_effect=cache.set)
     @patch("sentry.lang.javascript.processor.cache.get", side_effect=cache.get)
     def test_archive_caching(self, cache_get, cache_set):
@@ -1,10 +1,16 @@
 import copy
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
 
 import pytest
 
 from sentry.lang.native import symbolicator
 from sentry.lang.native.symbolicator import get_sources_for_project, redact_internal_sources
-from sentry.testutils.helpers import Feature
+from sentry.tasks.symbolication import RetrySymbolication
+from sentry.testutils.helpers import Feature, override_options
+from sentry.utils import json
 
 CUSTOM_SOURCE_CONFIG = """
 [{
@@ -88,6 +94,32 @@ def test_sources_custom(default_project):
     assert source_ids == ["sentry:project", "custom"]
 
 
+@pytest.mark.django_db
+def test_sources_custom_cached(default_project):
+    features = {"organizations:symbol-sources": True, "organizations:custom-symbol-sources": True}
+    symbolicator.sources_cache.clear()
+
+    default_project.update_option("sentry:builtin_symbol_sources", [])
+    default_project.update_option("sentry:symbol_sources", CUSTOM_SOURCE_CONFIG)
+
+    with Feature(features), override_options({"symbolicator.sources-cache-size": 10}):
+        with patch.object(
+            symbolicator, "parse_sources", wraps=symbolicator.parse_sources
+        ) as parse_sources:
+            sources = get_sources_for_project(default_project)
+            assert get_sources_for_project(default_project) == sources
+            assert parse_sources.call_count == 1
+
+            default_project.update_option(
+                "sentry:symbol_sources", CUSTOM_SOURCE_CONFIG.replace('"custom"', '"other"')
+            )
+            sources = get_sources_for_project(default_project)
+            assert parse_sources.call_count == 2
+
+    source_ids = list(map(lambda s: s["id"], sources))
+    assert source_ids == ["sentry:project", "other"]
+
+
 # Test that previously saved custom sources are not returned if the feature for
 # custom sources is missing at query time.
 @pytest.mark.django_db
@@ -264,3 +296,167 @@ class TestAliasReversion:
         reverse_aliases = symbolicator.reverse_aliases_map(builtin_sources)
         expected = {"sentry:ios-source": "sentry:ios", "sentry:tvos-source": "sentry:ios"}
         assert reverse_aliases == expected
+
+
+@pytest.mark.django_db
+def test_pooled_session():
+    with override_options({"symbolicator.keep-alive": True}):
+        with symbolicator.SymbolicatorSession(url="http://symbolicator/") as sess:
+            session = sess.session
+        assert sess.session is None
+
+        with symbolicator.SymbolicatorSession(url="http://symbolicator/") as sess:
+            assert sess.session is session
+
+    with override_options({"symbolicator.keep-alive": False}):
+        with symbolicator.SymbolicatorSession(url="http://symbolicator/") as sess:
+            assert sess.session is not session
+
+
+class FakeSymbolicator(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _symbolicated(self, request):
+        stacktraces = [
+            {"frames": [dict(frame, status="symbolicated") for frame in stacktrace["frames"]]}
+            for stacktrace in request["stacktraces"]
+        ]
+        return {"status": "completed", "stacktraces": stacktraces, "modules": request["modules"]}
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        request = json.loads(self.rfile.read(length))
+        self.server.requests.append(request)
+        if self.server.pending:
+            self.server.tasks["task-1"] = request
+            self._respond({"status": "pending", "request_id": "task-1", "retry_after": 0})
+        else:
+            self._respond(self._symbolicated(request))
+
+    def do_GET(self):
+        self.server.polls += 1
+        request = self.server.tasks.pop(self.path.split("?")[0].split("/")[-1], None)
+        if request is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._respond(self._symbolicated(request))
+
+
+@pytest.mark.django_db
+class TestSymbolicatorBatcher:
+    @pytest.fixture
+    def server(self):
+        server = HTTPServer(("127.0.0.1", 0), FakeSymbolicator)
+        server.requests = []
+        server.tasks = {}
+        server.polls = 0
+        server.pending = False
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def make_session(self, server, event_id):
+        return symbolicator.SymbolicatorSession(
+            url="http://127.0.0.1:%s/" % server.server_port,
+            project_id="1",
+            event_id=event_id,
+            timeout=0,
+            sources=[],
+        )
+
+    def symbolicate_concurrently(self, server, modules):
+        batcher = symbolicator.SymbolicatorBatcher()
+        results = {}
+
+        def symbolicate(event_id, addresses):
+            stacktraces = [{"frames": [{"instruction_addr": addr}]} for addr in addresses]
+            results[event_id] = batcher.symbolicate(
+                self.make_session(server, event_id), stacktraces, modules[event_id], None, 0.5
+            )
+
+        threads = [
+            threading.Thread(target=symbolicate, args=("a", ["0x1", "0x2"])),
+            threading.Thread(target=symbolicate, args=("b", ["0x3"])),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_merges_requests(self, server):
+        modules = [{"type": "elf", "code_id": "abc"}]
+        results = self.symbolicate_concurrently(server, {"a": modules, "b": modules})
+
+        assert len(server.requests) == 1
+        assert len(server.requests[0]["stacktraces"]) == 3
+        assert [
+            [frame["instruction_addr"] for frame in stacktrace["frames"]]
+            for stacktrace in results["a"]["stacktraces"]
+        ] == [["0x1"], ["0x2"]]
+        assert results["b"]["stacktraces"] == [
+            {"frames": [{"instruction_addr": "0x3", "status": "symbolicated"}]}
+        ]
+        assert results["a"]["modules"] == results["b"]["modules"] == modules
+        assert results["a"]["modules"] is not results["b"]["modules"]
+
+    def test_different_modules(self, server):
+        results = self.symbolicate_concurrently(
+            server, {"a": [{"type": "elf", "code_id": "abc"}], "b": [{"type": "elf"}]}
+        )
+
+        assert len(server.requests) == 2
+        assert len(results["a"]["stacktraces"]) == 2
+        assert len(results["b"]["stacktraces"]) == 1
+
+    def test_polls_pending(self, server):
+        server.pending = True
+        modules = [{"type": "elf", "code_id": "abc"}]
+        results = self.symbolicate_concurrently(server, {"a": modules, "b": modules})
+
+        assert len(server.requests) == 1
+        assert server.polls == 1
+        assert results["a"]["status"] == results["b"]["status"] == "completed"
+        assert len(results["a"]["stacktraces"]) == 2
+        assert len(results["b"]["stacktraces"]) == 1
+
+
+@pytest.mark.django_db
+class TestBatchFallback:
+    @pytest.fixture
+    def native_symbolicator(self, default_project):
+        with override_options({"symbolicator.batch-window": 0.5}):
+            with patch.object(symbolicator.Symbolicator, "_process") as process:
+                process.return_value = {"status": "completed"}
+                yield symbolicator.Symbolicator(default_project, "a" * 32)
+
+    def test_timeout_retries_unbatched(self, native_symbolicator):
+        with patch.object(symbolicator.batcher, "symbolicate") as symbolicate:
+            symbolicate.side_effect = FutureTimeoutError()
+            with pytest.raises(RetrySymbolication):
+                native_symbolicator.process_payload([], [])
+
+            assert native_symbolicator.process_payload([], []) == {"status": "completed"}
+
+        assert symbolicate.call_count == 1
+        assert native_symbolicator._process.call_count == 1
+
+    def test_error_falls_back(self, native_symbolicator):
+        with patch.object(symbolicator.batcher, "symbolicate") as symbolicate:
+            symbolicate.side_effect = ValueError()
+            assert native_symbolicator.process_payload([], []) == {"status": "completed"}
+
+        assert native_symbolicator._process.call_count == 1
@@ -1,12 +1,18 @@
 import os
+import time
+from hashlib import sha1
 from io import BytesIO
 from unittest.mock import patch
 
+import pytest
 from django.core.files.base import ContentFile
 from django.db import DatabaseError
 
-from sentry.models import File, FileBlob, FileBlobIndex
+from sentry.models import File, FileBlob, FileBlobIndex, FileBlobOwner
+from sentry.models.file import ChunkedFileBlobIndexWrapper
 from sentry.testutils import TestCase
+from sentry.testutils.helpers import benchmark_available
+from sentry.testutils.helpers.options import override_options
 
 
 class FileBlobTest(TestCase):
@@ -25,6 +31,32 @@ class FileBlobTest(TestCase):
         assert my_file1.checksum == my_file2.checksum
         assert my_file1.path == my_file2.path
 
+    def test_from_files(self):
+        existing = FileBlob.from_file(ContentFile(b"foo"))
+        files = [
+            (ContentFile(b"foo"), sha1(b"foo").hexdigest()),
+            (ContentFile(b"bar"), sha1(b"bar").hexdigest()),
+            (ContentFile(b"bar"), None),
+            (ContentFile(b"baz"), None),
+        ]
+
+        FileBlob.from_files(files, organization=self.organization)
+
+        blobs = FileBlob.objects.filter(
+            checksum__in=[sha1(data).hexdigest() for data in (b"foo", b"bar", b"baz")]
+        )
+        assert len(blobs) == 3
+        assert existing in blobs
+        for blob in blobs:
+            assert blob.getfile().read() in (b"foo", b"bar", b"baz")
+        assert FileBlobOwner.objects.filter(organization_id=self.organization.id).count() == 3
+
+    def test_from_files_checksum_mismatch(self):
+        files = [(ContentFile(b"foo"), sha1(b"bar").hexdigest())]
+        with pytest.raises(OSError):
+            FileBlob.from_files(files, organization=self.organization)
+        assert not FileBlob.objects.filter(checksum=sha1(b"foo").hexdigest()).exists()
+
     def test_generate_unique_path(self):
         path = FileBlob.generate_unique_path()
         assert path
@@ -163,3 +195,123 @@ class FileTest(TestCase):
 
         f = file.getfile(prefetch=True)
         assert f.read() == random_data
+
+
+class SlowBlob:
+    """Stand-in for a ``FileBlob`` on a remote filestore with latency."""
+
+    def __init__(self, data, latency=0.0):
+        self.data = data
+        self.size = len(data)
+        self.latency = latency
+        self.fetches = 0
+
+    def getfile(self):
+        self.fetches += 1
+        time.sleep(self.latency)
+        return BytesIO(self.data)
+
+
+class SlowBlobIndex:
+    def __init__(self, offset, blob):
+        self.offset = offset
+        self.blob = blob
+
+
+def make_indexes(data, chunk_size, latency=0.0):
+    return [
+        SlowBlobIndex(offset, SlowBlob(data[offset : offset + chunk_size], latency))
+        for offset in range(0, len(data), chunk_size)
+    ]
+
+
+class ChunkedFileBlobIndexWrapperTest(TestCase):
+    data = bytes(range(256)) * 4
+
+    def test_read_ahead(self):
+        indexes = make_indexes(self.data, 100)
+        with override_options({"filestore.blob-read-ahead": 2}):
+            with ChunkedFileBlobIndexWrapper(indexes) as f:
+                assert f.read(150) == self.data[:150]
+                f.seek(550)
+                assert f.read() == self.data[550:]
+                f.seek(10)
+                assert f.read(10) == self.data[10:20]
+
+    def test_read_range(self):
+        indexes = make_indexes(self.data, 100)
+        with ChunkedFileBlobIndexWrapper(indexes) as f:
+            fetches = [index.blob.fetches for index in indexes]
+            assert f.read_range(250, 200) == self.data[250:450]
+            assert f.read_range(1000, 100) == self.data[1000:]
+            # The position is unchanged.
+            assert f.tell() == 0
+            assert f.read(5) == self.data[:5]
+
+        # Only the blobs overlapping the ranges were fetched.
+        fetched = [index.blob.fetches - n for index, n in zip(indexes, fetches)]
+        assert fetched[2:5] == [1, 1, 1]
+        assert fetched[10] == 1
+        assert sum(fetched[5:10]) == 0
+
+    def test_read_range_prefetched(self):
+        indexes = make_indexes(self.data, 100)
+        with ChunkedFileBlobIndexWrapper(indexes, prefetch=True) as f:
+            assert f.read_range(250, 200) == self.data[250:450]
+            assert f.read() == self.data
+
+
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize("read_ahead", [0, 4])
+def test_benchmark_sequential_read(benchmark, read_ahead):
+    data = os.urandom(64 * 1024)
+    indexes = make_indexes(data, 1024, latency=0.005)
+
+    def read():
+        with ChunkedFileBlobIndexWrapper(indexes) as f:
+            return f.read()
+
+    with override_options(
+        {"filestore.blob-fetch-concurrency": 4, "filestore.blob-read-ahead": read_ahead}
+    ):
+        assert benchmark(read) == data
+
+
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize("concurrency", [1, 8])
+def test_benchmark_range_read(benchmark, concurrency):
+    data = os.urandom(64 * 1024)
+    indexes = make_indexes(data, 1024, latency=0.005)
+
+    def read_range():
+        with ChunkedFileBlobIndexWrapper(indexes) as f:
+            return f.read_range(10 * 1024, 16 * 1024)
+
+    with override_options(
+        {"filestore.blob-fetch-concurrency": concurrency, "filestore.blob-read-ahead": 0}
+    ):
+        assert benchmark(read_range) == data[10 * 1024 : 26 * 1024]
+
+
+class SlowStorage:
+    """Stand-in for a remote filestore with latency on writes."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def save(self, path, fileobj):
+        time.sleep(self.latency)
+        return path
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+def test_benchmark_from_files(benchmark, default_organization):
+    storage = SlowStorage(latency=0.002)
+
+    def setup():
+        files = [(BytesIO(os.urandom(64)), None) for _ in range(2000)]
+        return (files,), {"organization": default_organization}
+
+    with patch("sentry.models.file.get_storage", return_value=storage):
+        benchmark.pedantic(FileBlob.from_files, setup=setup, rounds=3)
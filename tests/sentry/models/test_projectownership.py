@@ -1,5 +1,12 @@
 from sentry.models import ActorTuple, ProjectOwnership, Team, User
-from sentry.ownership.grammar import Matcher, Owner, Rule, dump_schema, resolve_actors
+from sentry.ownership.grammar import (
+    Matcher,
+    Owner,
+    Rule,
+    dump_schema,
+    get_actor_cache_version_key,
+    resolve_actors,
+)
 from sentry.testutils import TestCase
 from sentry.utils.cache import cache
 
@@ -245,6 +252,11 @@ class ProjectOwnershipTestCase(TestCase):
 
 
 class ResolveActorsTestCase(TestCase):
+    def tearDown(self):
+        cache.delete(get_actor_cache_version_key(self.project.id))
+
+        super().tearDown()
+
     def test_no_actors(self):
         assert resolve_actors([], self.project.id) == {}
 
@@ -315,3 +327,63 @@ class ResolveActorsTestCase(TestCase):
             owner5: actor5,
             owner6: actor6,
         }
+
+    def test_cached(self):
+        owners = [Owner("user", self.user.email), Owner("team", self.team.slug)]
+        expected = {
+            owners[0]: ActorTuple(self.user.id, User),
+            owners[1]: ActorTuple(self.team.id, Team),
+        }
+        assert resolve_actors(owners, self.project.id) == expected
+
+        with self.assertNumQueries(0):
+            assert resolve_actors(owners, self.project.id) == expected
+
+    def test_invalidated_on_team_change(self):
+        team = self.create_team(organization=self.organization, slug="late-team")
+        owner = Owner("team", "late-team")
+        assert resolve_actors([owner], self.project.id) == {owner: None}
+
+        with self.capture_on_commit_callbacks(execute=True):
+            self.project.add_team(team)
+        assert resolve_actors([owner], self.project.id) == {owner: ActorTuple(team.id, Team)}
+
+        with self.capture_on_commit_callbacks(execute=True):
+            team.update(slug="renamed-team")
+        assert resolve_actors([owner], self.project.id) == {owner: None}
+
+    def test_invalidated_on_commit(self):
+        team = self.create_team(organization=self.organization, slug="late-team")
+        owner = Owner("team", "late-team")
+        assert resolve_actors([owner], self.project.id) == {owner: None}
+
+        with self.capture_on_commit_callbacks() as callbacks:
+            self.project.add_team(team)
+        # Until the change is committed, the cached mapping is still used
+        assert resolve_actors([owner], self.project.id) == {owner: None}
+
+        for callback in callbacks:
+            callback()
+        assert resolve_actors([owner], self.project.id) == {owner: ActorTuple(team.id, Team)}
+
+    def test_invalidated_on_member_change(self):
+        user = self.create_user()
+        owner = Owner("user", user.email)
+        assert resolve_actors([owner], self.project.id) == {owner: None}
+
+        with self.capture_on_commit_callbacks(execute=True):
+            member = self.create_member(
+                user=user, organization=self.organization, teams=[self.team]
+            )
+        assert resolve_actors([owner], self.project.id) == {owner: ActorTuple(user.id, User)}
+
+        with self.capture_on_commit_callbacks(execute=True):
+            email = self.create_useremail(user, "new-address@example.com").email
+        new_owner = Owner("user", email)
+        assert resolve_actors([new_owner], self.project.id) == {
+            new_owner: ActorTuple(user.id, User)
+        }
+
+        with self.capture_on_commit_callbacks(execute=True):
+            member.delete()
+        assert resolve_actors([owner], self.project.id) == {owner: None}
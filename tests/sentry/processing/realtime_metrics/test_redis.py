@@ -505,3 +505,58 @@ def test_get_durations_for_projects_with_gap(
     assert durations.histograms[-3].total_count() == 0
     assert durations.histograms[-4].total_count() == 0
     assert durations.histograms[-5].total_count() == 3
+
+
+#
+# get_counts_for_projects() / get_durations_for_projects()
+#
+
+
+def test_get_counts_for_projects(
+    store: RedisRealtimeMetricsStore, redis_cluster: redis._RedisCluster
+) -> None:
+    redis_cluster.set("symbolicate_event_low_priority:counter:10:42:110", 3)
+    redis_cluster.set("symbolicate_event_low_priority:counter:10:53:100", 5)
+
+    counts = store.get_counts_for_projects([42, 53, 64], timestamp=113)
+
+    assert counts == {
+        project_id: store.get_counts_for_project(project_id, timestamp=113)
+        for project_id in (42, 53, 64)
+    }
+    assert counts[42].total_count() == 3
+    assert counts[53].total_count() == 5
+    assert counts[64].total_count() == 0
+
+
+def test_get_durations_for_projects(
+    store: RedisRealtimeMetricsStore, redis_cluster: redis._RedisCluster
+) -> None:
+    redis_cluster.hset("symbolicate_event_low_priority:duration:10:42:110", 20, 3)
+    redis_cluster.hset("symbolicate_event_low_priority:duration:10:53:100", 30, 17)
+
+    durations = store.get_durations_for_projects([42, 53, 64], timestamp=113)
+
+    assert set(durations) == {42, 53, 64}
+    assert [h.total_count() for h in durations[42].histograms] == [0] * 12 + [3]
+    assert [h.total_count() for h in durations[53].histograms] == [0] * 11 + [17, 0]
+    assert sum(h.total_count() for h in durations[64].histograms) == 0
+
+
+#
+# add_projects_to_lpq()
+#
+
+
+def test_add_projects_to_lpq(
+    store: RedisRealtimeMetricsStore, redis_cluster: redis._RedisCluster
+) -> None:
+    redis_cluster.sadd("store.symbolicate-event-lpq-selected", 11)
+    redis_cluster.set("symbolicate_event_low_priority:backoff:13", 1)
+
+    added = store.add_projects_to_lpq({11, 12, 13})
+
+    assert added == {12}
+    in_lpq = redis_cluster.smembers("store.symbolicate-event-lpq-selected")
+    assert in_lpq == {"11", "12"}
+    assert redis_cluster.get("symbolicate_event_low_priority:backoff:12") == "1"
@@ -1,6 +1,7 @@
 import datetime
 import re
 
+import pytest
 from django.utils import timezone
 from snuba_sdk.aliased_expression import AliasedExpression
 from snuba_sdk.column import Column
@@ -10,7 +11,9 @@ from snuba_sdk.orderby import Direction, LimitBy, OrderBy
 
 from sentry.exceptions import InvalidSearchQuery
 from sentry.search.events.builder import QueryBuilder
+from sentry.search.events.fields import prepared_selects
 from sentry.testutils.cases import TestCase
+from sentry.testutils.helpers import benchmark_available, override_options
 from sentry.utils.snuba import Dataset, QueryOutsideRetentionError
 
 
@@ -485,3 +488,150 @@ class QueryBuilderTest(TestCase):
         snql_query = query.get_snql_query()
         snql_query.validate()
         assert snql_query.turbo.value
+
+
+# A select clause for every public function of the discover function catalog
+FUNCTION_CATALOG = [
+    "transaction",
+    "count()",
+    "count_unique(user)",
+    "count_miserable(user,300)",
+    "user_misery(300)",
+    "apdex(300)",
+    "failure_count()",
+    "failure_rate()",
+    "last_seen()",
+    "latest_event()",
+    "percentile(transaction.duration,0.42)",
+    "p50()",
+    "p75(measurements.lcp)",
+    "p95()",
+    "p99()",
+    "p100()",
+    'to_other(release,"1.2.1")',
+    "percentile_range(transaction.duration,0.5,greater,2015-05-18T12:00:00)",
+    "avg_range(transaction.duration,greater,2015-05-18T12:00:00)",
+    "variance_range(transaction.duration,greater,2015-05-18T12:00:00)",
+    "count_range(greater,2015-05-18T12:00:00)",
+    "count_if(transaction.duration,greater,300)",
+    "count_at_least(transaction.duration,300)",
+    "min(transaction.duration)",
+    "max(transaction.duration)",
+    "avg(transaction.duration)",
+    "var(transaction.duration)",
+    "stddev(transaction.duration)",
+    "cov(transaction.duration,measurements.lcp)",
+    "corr(transaction.duration,measurements.lcp)",
+    "sum(transaction.duration)",
+    "any(transaction.duration)",
+    "eps()",
+    "epm()",
+    "absolute_correlation()",
+]
+
+
+def get_function_details(query):
+    return {
+        alias: (details.field, details.instance.name, details.arguments)
+        for alias, details in query.function_alias_map.items()
+    }
+
+
+class PreparedSelectTest(TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2015, 5, 18, 10, 15, 1, tzinfo=timezone.utc)
+        self.end = datetime.datetime(2015, 5, 19, 10, 15, 1, tzinfo=timezone.utc)
+        self.params = {
+            "project_id": [self.project.id],
+            "organization_id": self.organization.id,
+            "start": self.start,
+            "end": self.end,
+        }
+        prepared_selects.clear()
+
+    def test_reused_for_same_shape(self):
+        selected_columns = ["transaction", "p95()", "count_unique(user)"]
+        other_params = {
+            **self.params,
+            "project_id": [self.create_project().id],
+            "start": self.start - datetime.timedelta(days=1),
+        }
+
+        with override_options({"discover2.prepared-select-cache-size": 10}):
+            first = QueryBuilder(Dataset.Discover, self.params, selected_columns=selected_columns)
+            second = QueryBuilder(
+                Dataset.Discover,
+                other_params,
+                "transaction:foo",
+                selected_columns=selected_columns,
+            )
+
+        assert len(prepared_selects._entries) == 1
+        assert second.columns == first.columns
+        assert second.aggregates == first.aggregates
+        assert get_function_details(second) == get_function_details(first)
+        assert Condition(Column("project_id"), Op.IN, other_params["project_id"]) in second.where
+        assert Condition(Column("timestamp"), Op.GTE, other_params["start"]) in second.where
+        second.get_snql_query().validate()
+
+    def test_params_dependent_select_not_cached(self):
+        selected_columns = ["project", "epm()"]
+        other_params = {**self.params, "start": self.start - datetime.timedelta(days=1)}
+
+        with override_options({"discover2.prepared-select-cache-size": 10}):
+            first = QueryBuilder(Dataset.Discover, self.params, selected_columns=selected_columns)
+            second = QueryBuilder(Dataset.Discover, other_params, selected_columns=selected_columns)
+
+        assert len(prepared_selects._entries) == 0
+        assert first.columns[1] != second.columns[1]
+
+    def test_shape_includes_auto_fields(self):
+        with override_options({"discover2.prepared-select-cache-size": 10}):
+            first = QueryBuilder(Dataset.Discover, self.params, selected_columns=["transaction"])
+            second = QueryBuilder(
+                Dataset.Discover, self.params, selected_columns=["transaction"], auto_fields=True
+            )
+
+        assert len(second.columns) > len(first.columns)
+
+    def test_function_catalog(self):
+        uncached = QueryBuilder(Dataset.Discover, self.params, selected_columns=FUNCTION_CATALOG)
+
+        with override_options({"discover2.prepared-select-cache-size": 10}):
+            for _ in range(2):
+                cached = QueryBuilder(
+                    Dataset.Discover, self.params, selected_columns=FUNCTION_CATALOG
+                )
+                assert cached.columns == uncached.columns
+                assert cached.aggregates == uncached.aggregates
+                assert get_function_details(cached) == get_function_details(uncached)
+
+        for column in FUNCTION_CATALOG:
+            with override_options({"discover2.prepared-select-cache-size": 10}):
+                for _ in range(2):
+                    cached = QueryBuilder(Dataset.Discover, self.params, selected_columns=[column])
+            uncached = QueryBuilder(Dataset.Discover, self.params, selected_columns=[column])
+            assert cached.columns == uncached.columns, column
+            assert cached.aggregates == uncached.aggregates, column
+            assert get_function_details(cached) == get_function_details(uncached), column
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize("cache_size", [0, 1000], ids=["uncached", "cached"])
+def test_benchmark_resolve_function_catalog(cache_size, benchmark):
+    params = {
+        "project_id": [1],
+        "organization_id": 1,
+        "start": datetime.datetime(2015, 5, 18, 10, 15, 1, tzinfo=timezone.utc),
+        "end": datetime.datetime(2015, 5, 19, 10, 15, 1, tzinfo=timezone.utc),
+    }
+    prepared_selects.clear()
+
+    def resolve_all():
+        for column in FUNCTION_CATALOG:
+            QueryBuilder(Dataset.Discover, params, selected_columns=[column, "count()"])
+
+    with override_options({"discover2.prepared-select-cache-size": cache_size}):
+        resolve_all()
+        benchmark(resolve_all)
@@ -22,6 +22,7 @@ from sentry.search.events.constants import (
 )
 from sentry.snuba import discover
 from sentry.testutils import SnubaTestCase, TestCase
+from sentry.testutils.helpers import override_options
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.utils.samples import load_data
 from sentry.utils.snuba import Dataset, get_array_column_alias
@@ -76,6 +77,21 @@ class QueryIntegrationTest(SnubaTestCase, TestCase):
             assert len(data) == 1, use_snql
             assert data[0]["project"] == other_project.slug, use_snql
 
+    def test_stream_query(self):
+        kwargs = dict(
+            selected_columns=["project", "message", "count()"],
+            query="",
+            params={
+                "project_id": [self.project.id],
+                "start": self.two_min_ago,
+                "end": self.now,
+            },
+            orderby="message",
+        )
+        rows = discover.stream_query(**kwargs)
+
+        assert list(rows) == discover.query(**kwargs)["data"]
+
     def test_sorting_project_name(self):
         project_ids = []
         for project_name in ["a" * 32, "z" * 32, "m" * 32]:
@@ -6099,6 +6115,25 @@ class TimeseriesQueryTest(TimeseriesBase):
             if "count" in d:
                 assert d["count"] == 2
 
+    def test_bucket_cache_with_timestamp_filter(self):
+        params = {
+            "start": self.day_ago,
+            "end": self.day_ago + timedelta(hours=3),
+            "project_id": [self.project.id],
+            "organization_id": self.organization.id,
+        }
+        query = f"timestamp:>{iso_format(self.day_ago + timedelta(hours=1, minutes=30))}"
+        with override_options({"discover2.timeseries-bucket-cache": True}):
+            for _ in range(2):
+                result = discover.timeseries_query(
+                    selected_columns=["count()"],
+                    query=query,
+                    params=params,
+                    rollup=3600,
+                    use_snql=True,
+                )
+                assert [1] == [val["count"] for val in result.data["data"] if "count" in val]
+
 
 class TopEventsTimeseriesQueryTest(TimeseriesBase):
     @patch("sentry.snuba.discover.raw_query")
@@ -6237,6 +6272,32 @@ class TopEventsTimeseriesQueryTest(TimeseriesBase):
             referrer=None,
         )
 
+    def test_bucket_cache_with_timestamp_filter(self):
+        top_events = {"data": [{"project": self.project.slug, "project.id": self.project.id}]}
+        params = {
+            "start": self.day_ago,
+            "end": self.day_ago + timedelta(hours=3),
+            "project_id": [self.project.id],
+            "organization_id": self.organization.id,
+        }
+        query = f"timestamp:>{iso_format(self.day_ago + timedelta(hours=1, minutes=30))}"
+        with override_options({"discover2.timeseries-bucket-cache": True}):
+            for _ in range(2):
+                result = discover.top_events_timeseries(
+                    selected_columns=["project", "count()"],
+                    params=params,
+                    rollup=3600,
+                    top_events=top_events,
+                    timeseries_columns=["count()"],
+                    user_query=query,
+                    orderby=["count()"],
+                    limit=10000,
+                    organization=self.organization,
+                    use_snql=True,
+                )
+                data = result[self.project.slug].data["data"]
+                assert [1] == [val["count"] for val in data if "count" in val]
+
 
 def format_project_event(project_slug, event_id):
     return f"{project_slug}:{event_id}"
@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+from freezegun import freeze_time
+from snuba_sdk import Column, Condition, Entity, Function, Op, Query
+
+from sentry.search.events.builder import TimeseriesQueryBuilder
+from sentry.snuba import timeseries_cache
+from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
+from sentry.utils.dates import to_timestamp
+from sentry.utils.snuba import Dataset
+
+ROLLUP = 3600
+
+
+class FakeSnuba:
+    """Counts events per rollup bucket like a timeseries query would."""
+
+    def __init__(self):
+        self.events = []
+        self.queries = []
+
+    def add_events(self, start, end, every):
+        while start < end:
+            self.events.append(to_timestamp(start))
+            start += every
+
+    def query(self, start, end):
+        start_ts, end_ts = to_timestamp(start), to_timestamp(end)
+        retention = timeseries_cache.quotas.get_event_retention(organization=None)
+        if retention:
+            start_ts = max(start_ts, to_timestamp(timezone.now() - timedelta(days=retention)))
+
+        counts = {}
+        for timestamp in self.events:
+            if start_ts <= timestamp < end_ts:
+                bucket = int(timestamp // ROLLUP) * ROLLUP
+                counts[bucket] = counts.get(bucket, 0) + 1
+        return [{"time": bucket, "count": counts[bucket]} for bucket in sorted(counts)]
+
+    def run_query(self, ranges):
+        self.queries.append(list(ranges))
+        return [
+            [{"data": self.query(start, end), "meta": [{"name": "count"}]}] for start, end in ranges
+        ]
+
+
+class QueryWithBucketCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = datetime(2021, 8, 10, 12, 34, 56, tzinfo=timezone.utc)
+        self.snuba = FakeSnuba()
+        self.snuba.add_events(self.now - timedelta(days=3), self.now, timedelta(minutes=7))
+
+    def query(self, start, end, fingerprint="a"):
+        results = timeseries_cache.query_with_bucket_cache(
+            [fingerprint], start, end, ROLLUP, self.organization.id, self.snuba.run_query
+        )
+        assert len(results) == 1
+        assert results[0]["meta"] == [{"name": "count"}]
+        return results[0]["data"]
+
+    def test_fetches_only_new_buckets(self):
+        start = self.now - timedelta(days=1)
+        with freeze_time(self.now):
+            assert self.query(start, self.now) == self.snuba.query(start, self.now)
+        assert self.snuba.queries == [[(start, self.now)]]
+
+        later = self.now + timedelta(hours=2)
+        self.snuba.add_events(self.now, later, timedelta(minutes=3))
+        self.snuba.queries = []
+        with freeze_time(later):
+            start = later - timedelta(days=1)
+            assert self.query(start, later) == self.snuba.query(start, later)
+
+        first_bucket = datetime(2021, 8, 9, 15, tzinfo=timezone.utc)
+        first_missing_bucket = datetime(2021, 8, 10, 12, tzinfo=timezone.utc)
+        assert self.snuba.queries == [
+            [(start, first_bucket), (first_missing_bucket, later)],
+        ]
+
+    def test_fingerprints_are_separate(self):
+        start = self.now - timedelta(days=1)
+        with freeze_time(self.now):
+            self.query(start, self.now, fingerprint="a")
+            self.snuba.queries = []
+            self.query(start, self.now, fingerprint="b")
+        assert self.snuba.queries == [[(start, self.now)]]
+
+    def test_retention_boundary(self):
+        start = self.now - timedelta(days=2)
+        with override_options({"system.event-retention-days": 2}):
+            with freeze_time(self.now):
+                self.query(start, self.now)
+
+            # The oldest buckets moved out of retention in the meantime and
+            # must not be served from the cache.
+            later = self.now + timedelta(hours=3)
+            with freeze_time(later):
+                result = self.query(start, later)
+                assert result == self.snuba.query(start, later)
+                assert result[0]["time"] >= to_timestamp(later - timedelta(days=2)) - ROLLUP
+
+    def test_builder_query_outside_retention(self):
+        def build(start, query):
+            params = {
+                "start": start,
+                "end": self.now,
+                "project_id": [self.project.id],
+                "organization_id": self.organization.id,
+            }
+            return TimeseriesQueryBuilder(
+                Dataset.Discover, params, ROLLUP, query=query, selected_columns=["count()"]
+            ).get_snql_query()
+
+        def timestamp_conditions(query):
+            return [condition for condition in query.where if condition.lhs == Column("timestamp")]
+
+        user_query = "timestamp:>=2021-08-09T00:00:00"
+        with override_options({"system.event-retention-days": 2}), freeze_time(self.now):
+            # The builder moves the start to the retention, which is not the
+            # start of the params anymore.
+            query = build(self.now - timedelta(days=5), user_query)
+            fingerprint = timeseries_cache.get_snql_fingerprint(query)
+            assert fingerprint == timeseries_cache.get_snql_fingerprint(
+                build(self.now - timedelta(days=1), user_query)
+            )
+            assert fingerprint != timeseries_cache.get_snql_fingerprint(
+                build(self.now - timedelta(days=5), None)
+            )
+
+        user_condition = timestamp_conditions(query)[0]
+        time_range = (self.now - timedelta(hours=12), self.now)
+        ranged_query = timeseries_cache.set_snql_time_range(query, time_range)
+        assert timestamp_conditions(ranged_query) == [
+            user_condition,
+            Condition(Column("timestamp"), Op.GTE, time_range[0]),
+            Condition(Column("timestamp"), Op.LT, time_range[1]),
+        ]
+
+    def test_short_range_not_cached(self):
+        start = self.now - timedelta(minutes=90)
+        with freeze_time(self.now):
+            self.query(start, self.now)
+            self.query(start, self.now)
+        assert self.snuba.queries == [[(start, self.now)], [(start, self.now)]]
+
+
+def test_fingerprint():
+    assert timeseries_cache.get_fingerprint({"b": 1, "a": {2, 1}}) == (
+        timeseries_cache.get_fingerprint({"a": [1, 2], "b": 1})
+    )
+    assert timeseries_cache.get_fingerprint({"a": 1}) != timeseries_cache.get_fingerprint({"a": 2})
+    assert timeseries_cache.get_fingerprint(object()) is None
+
+
+def snql_query(start, end, *conditions):
+    return Query(
+        dataset="discover",
+        match=Entity("discover"),
+        select=[Function("count", [], "count")],
+        where=[
+            Condition(Column("type"), Op.EQ, "error"),
+            *conditions,
+            Condition(Column("timestamp"), Op.GTE, start),
+            Condition(Column("timestamp"), Op.LT, end),
+        ],
+    )
+
+
+def test_snql_fingerprint():
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    fingerprint = timeseries_cache.get_snql_fingerprint(snql_query(start, end))
+
+    later = start + timedelta(hours=1)
+    assert fingerprint == timeseries_cache.get_snql_fingerprint(snql_query(later, end))
+
+    user_condition = Condition(Column("timestamp"), Op.GTE, later)
+    assert fingerprint != timeseries_cache.get_snql_fingerprint(
+        snql_query(start, end, user_condition)
+    )
+
+
+def test_set_snql_time_range():
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    user_condition = Condition(Column("timestamp"), Op.GTE, start + timedelta(hours=1))
+    time_range = (start + timedelta(hours=12), end)
+
+    query = timeseries_cache.set_snql_time_range(snql_query(start, end, user_condition), time_range)
+    assert query.where == [
+        Condition(Column("type"), Op.EQ, "error"),
+        user_condition,
+        Condition(Column("timestamp"), Op.GTE, time_range[0]),
+        Condition(Column("timestamp"), Op.LT, time_range[1]),
+    ]
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from sentry.stacktraces.processing import (
+    StacktraceProcessor,
+    _local_frame_cache,
+    process_stacktraces,
+)
+from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
+from sentry.utils.cache import cache
+
+
+class UppercaseProcessor(StacktraceProcessor):
+    def handles_frame(self, frame, stacktrace_info):
+        return True
+
+    def preprocess_frame(self, processable_frame):
+        processable_frame.set_cache_key_from_values([processable_frame["function"]])
+
+    def process_frame(self, processable_frame, processing_task):
+        function = processable_frame.cache_value
+        if function is None:
+            function = processable_frame["function"].upper()
+            processable_frame.set_cache_value(function)
+        return [dict(processable_frame.frame, function=function)], None, None
+
+
+class FrameCacheTest(TestCase):
+    def setUp(self):
+        _local_frame_cache.clear()
+
+    def tearDown(self):
+        _local_frame_cache.clear()
+
+    def make_data(self):
+        return {
+            "project": self.project.id,
+            "platform": "native",
+            "stacktrace": {"frames": [{"function": "foo"}, {"function": "bar"}]},
+        }
+
+    def process(self):
+        data = process_stacktraces(
+            self.make_data(),
+            make_processors=lambda data, infos: [UppercaseProcessor(data, infos, self.project)],
+        )
+        return [frame["function"] for frame in data["stacktrace"]["frames"]]
+
+    def test_batched(self):
+        with patch.object(cache, "get_many", side_effect=cache.get_many) as get_many, patch.object(
+            cache, "set_many", side_effect=cache.set_many
+        ) as set_many:
+            assert self.process() == ["FOO", "BAR"]
+            assert get_many.call_count == 1
+            assert set_many.call_count == 1
+
+            # The values are read back from the cache with one call.
+            assert self.process() == ["FOO", "BAR"]
+            assert get_many.call_count == 2
+            assert set_many.call_count == 1
+
+    def test_local_cache(self):
+        with override_options({"processing.frame-cache-local-size": 10}):
+            assert self.process() == ["FOO", "BAR"]
+            with patch.object(cache, "get_many") as get_many:
+                assert self.process() == ["FOO", "BAR"]
+            assert get_many.call_count == 0
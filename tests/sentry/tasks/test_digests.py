@@ -3,10 +3,11 @@ from unittest.mock import patch
 from django.core import mail
 
 import sentry
+from sentry import eventstore
 from sentry.digests.backends.redis import RedisBackend
 from sentry.digests.notifications import event_to_record
 from sentry.models.rule import Rule
-from sentry.tasks.digests import deliver_digest
+from sentry.tasks.digests import deliver_digest, deliver_digests
 from sentry.testutils import TestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
 
@@ -42,6 +43,63 @@ class DeliverDigestTest(TestCase):
     def test_member_key(self):
         self.run_test(f"mail:p:{self.project.id}:Member:{self.user.id}")
 
+    @patch.object(sentry, "digests")
+    def test_compact_records(self, digests):
+        backend = RedisBackend(codec={"path": "sentry.digests.codecs.CompactRecordCodec"})
+        digests.digest = backend.digest
+
+        rule = Rule.objects.create(project=self.project, label="Test Rule", data={})
+        key = f"mail:p:{self.project.id}:IssueOwners:"
+        for fingerprint in ["group-1", "group-2"]:
+            event = self.store_event(
+                data={"timestamp": iso_format(before_now(days=1)), "fingerprint": [fingerprint]},
+                project_id=self.project.id,
+            )
+            backend.add(key, event_to_record(event, [rule]), increment_delay=0, maximum_delay=0)
+
+        with self.tasks(), patch.object(
+            eventstore, "bind_nodes", wraps=eventstore.bind_nodes
+        ) as bind_nodes:
+            deliver_digest(key)
+        # The events of all records are fetched from nodestore at once
+        assert bind_nodes.call_count == 1
+        assert len(bind_nodes.call_args[0][0]) == 2
+        assert "2 new alerts since" in mail.outbox[0].subject
+
     def test_no_records(self):
         # This shouldn't error if no records are present
         deliver_digest(f"mail:p:{self.project.id}:IssueOwners:")
+
+
+class DeliverDigestsTest(TestCase):
+    @patch.object(sentry, "digests")
+    def test_deliver_many(self, digests):
+        backend = RedisBackend()
+        digests.digest_many = backend.digest_many
+
+        rule = Rule.objects.create(project=self.project, label="Test Rule", data={})
+        event = self.store_event(
+            data={"timestamp": iso_format(before_now(days=1)), "fingerprint": ["group-1"]},
+            project_id=self.project.id,
+        )
+        event_2 = self.store_event(
+            data={"timestamp": iso_format(before_now(days=1)), "fingerprint": ["group-2"]},
+            project_id=self.project.id,
+        )
+        keys = [
+            f"mail:p:{self.project.id}:IssueOwners:",
+            f"mail:p:{self.project.id}:Member:{self.user.id}",
+        ]
+        for key in keys:
+            backend.add(key, event_to_record(event, [rule]), increment_delay=0, maximum_delay=0)
+            backend.add(key, event_to_record(event_2, [rule]), increment_delay=0, maximum_delay=0)
+
+        with self.tasks(), patch.object(eventstore, "bind_nodes") as bind_nodes:
+            deliver_digests(keys)
+        assert len(mail.outbox) == 2
+        # The records carry the data of their events
+        assert not bind_nodes.called
+        assert all("2 new alerts since" in message.subject for message in mail.outbox)
+
+    def test_no_records(self):
+        deliver_digests([f"mail:p:{self.project.id}:IssueOwners:"])
@@ -16,9 +16,11 @@ from sentry.tasks import low_priority_symbolication
 from sentry.tasks.low_priority_symbolication import (
     _scan_for_suspect_projects,
     _update_lpq_eligibility,
+    compute_lpq_changes,
     excessive_event_duration,
     excessive_event_rate,
 )
+from sentry.testutils.helpers import override_options
 from sentry.testutils.helpers.task_runner import TaskRunner
 from sentry.utils.services import LazyServiceWrapper
 
@@ -98,6 +100,95 @@ class TestScanForSuspectProjects:
         assert mock_update_lpq_eligibility.delay.called
 
 
+class TestScanWithBudget:
+    @pytest.fixture  # type: ignore
+    def mock_update_lpq_eligibility(
+        self, monkeypatch: "pytest.MonkeyPatch"
+    ) -> Generator[mock.Mock, None, None]:
+        mock_fn = mock.Mock()
+        monkeypatch.setattr(low_priority_symbolication, "update_lpq_eligibility", mock_fn)
+        yield mock_fn
+
+    def record(self, store: RealtimeMetricsStore) -> None:
+        # Project 17 used 10 minutes of symbolication time, project 18 just 5 seconds
+        for _ in range(10):
+            store.increment_project_duration_counter(project_id=17, timestamp=0, duration=55)
+        store.increment_project_duration_counter(project_id=18, timestamp=0, duration=0)
+        store.add_project_to_lpq(18)
+        store.add_project_to_lpq(19)
+
+    @freeze_time(datetime.fromtimestamp(0))
+    def test_applies_changes(
+        self, store: RealtimeMetricsStore, mock_update_lpq_eligibility: mock.Mock
+    ) -> None:
+        self.record(store)
+
+        with override_options(
+            {
+                "store.symbolicate-event-lpq-budget": 0.1,
+                "store.symbolicate-event-lpq-capacity": 10,
+                "store.symbolicate-event-lpq-dry-run": False,
+            }
+        ):
+            _scan_for_suspect_projects()
+
+        assert store.get_lpq_projects() == {17}
+        assert not mock_update_lpq_eligibility.delay.called
+
+    @freeze_time(datetime.fromtimestamp(0))
+    def test_dry_run(
+        self, store: RealtimeMetricsStore, mock_update_lpq_eligibility: mock.Mock
+    ) -> None:
+        self.record(store)
+
+        with override_options(
+            {
+                "store.symbolicate-event-lpq-budget": 0.1,
+                "store.symbolicate-event-lpq-capacity": 10,
+                "store.symbolicate-event-lpq-dry-run": True,
+            }
+        ), mock.patch.object(low_priority_symbolication.logger, "info") as info:
+            _scan_for_suspect_projects()
+
+        info.assert_called_once_with(
+            "symbolication.lpq.dry_run",
+            extra={"add": [17], "remove": [18, 19], "usage": {17: mock.ANY}},
+        )
+        # The fixed thresholds are still in charge
+        assert mock_update_lpq_eligibility.delay.call_count == 2
+        assert store.get_lpq_projects() == {18}
+
+
+class TestComputeLpqChanges:
+    def durations(self, *durations: int) -> BucketedDurationsHistograms:
+        histogram = DurationsHistogram()
+        for duration in durations:
+            histogram.incr(duration)
+        return BucketedDurationsHistograms(timestamp=0, width=10, histograms=[histogram] * 10)
+
+    def test_over_budget(self) -> None:
+        # 10 buckets of 10s with 55s of symbolication each, over 100s of 10s/s capacity
+        changes = compute_lpq_changes({1: self.durations(50)}, set(), budget=0.5, capacity=10)
+        assert changes.usage == {1: 0.55}
+        assert changes.add == {1}
+        assert changes.remove == set()
+
+    def test_within_budget(self) -> None:
+        changes = compute_lpq_changes({1: self.durations(50)}, set(), budget=0.6, capacity=10)
+        assert changes.add == set()
+        assert changes.remove == set()
+
+    def test_hysteresis(self) -> None:
+        durations = {1: self.durations(50), 2: self.durations(20)}
+        changes = compute_lpq_changes(durations, {1, 2}, budget=0.6, capacity=10)
+        assert changes.add == set()
+        assert changes.remove == {2}
+
+    def test_no_metrics_in_lpq(self) -> None:
+        changes = compute_lpq_changes({}, {1}, budget=0.5, capacity=10)
+        assert changes.remove == {1}
+
+
 class TestUpdateLpqEligibility:
     def test_no_counts_no_durations_in_lpq(self, store: RealtimeMetricsStore) -> None:
         store.add_project_to_lpq(17)
@@ -1,6 +1,6 @@
 import unittest
 from datetime import timedelta
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 from uuid import uuid4
 
 from django.utils import timezone
@@ -8,6 +8,7 @@ from django.utils import timezone
 from sentry.models import Commit, CommitAuthor, CommitFileChange, GroupRelease, Release, Repository
 from sentry.testutils import TestCase
 from sentry.testutils.helpers.datetime import before_now, iso_format
+from sentry.utils import committers
 from sentry.utils.committers import (
     _get_commit_file_changes,
     _match_commits_path,
@@ -333,6 +334,70 @@ class GetEventFileCommitters(CommitTestCase):
         assert len(result[0]["commits"]) == 1
         assert result[0]["commits"][0]["id"] == "a" * 40
 
+    def test_matching_cached_per_path(self):
+        def store_event(filename):
+            return self.store_event(
+                data={
+                    "message": "Kaboom!",
+                    "platform": "python",
+                    "timestamp": iso_format(before_now(seconds=1)),
+                    "fingerprint": ["group-1"],
+                    "stacktrace": {
+                        "frames": [
+                            {
+                                "function": "handle",
+                                "abs_path": f"/usr/src/sentry/src/{filename}",
+                                "in_app": True,
+                                "lineno": 30,
+                                "filename": filename,
+                            }
+                        ]
+                    },
+                    "tags": {"sentry:release": self.release.version},
+                },
+                project_id=self.project.id,
+            )
+
+        event = store_event("sentry/tasks.py")
+        self.release.set_commits(
+            [
+                {
+                    "id": "a" * 40,
+                    "repository": self.repo.name,
+                    "author_email": "bob@example.com",
+                    "author_name": "Bob",
+                    "message": "i fixed a bug",
+                    "patch_set": [
+                        {"path": "src/sentry/tasks.py", "type": "M"},
+                        {"path": "src/sentry/models/release.py", "type": "M"},
+                    ],
+                }
+            ]
+        )
+        GroupRelease.objects.create(
+            group_id=event.group.id, project_id=self.project.id, release_id=self.release.id
+        )
+
+        with patch.object(
+            committers, "_get_commit_file_changes", wraps=_get_commit_file_changes
+        ) as get_file_changes:
+            result = get_serialized_event_file_committers(self.project, event)
+            assert result[0]["commits"][0]["id"] == "a" * 40
+            assert get_file_changes.call_count == 1
+
+            # Same frames again are served from the cached matches.
+            result = get_serialized_event_file_committers(self.project, event)
+            assert result[0]["commits"][0]["id"] == "a" * 40
+            assert get_file_changes.call_count == 1
+
+            # Only the new frame path is matched against file changes.
+            other_event = store_event("sentry/models/release.py")
+            assert other_event.group_id == event.group_id
+            result = get_serialized_event_file_committers(self.project, other_event)
+            assert result[0]["commits"][0]["id"] == "a" * 40
+            assert get_file_changes.call_count == 2
+            assert get_file_changes.call_args[0][1] == {"sentry/models/release.py"}
+
     def test_matching_case_insensitive(self):
         event = self.store_event(
             data={
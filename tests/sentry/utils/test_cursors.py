@@ -1,7 +1,9 @@
 import math
 from unittest.mock import Mock
 
-from sentry.utils.cursors import Cursor, build_cursor
+import pytest
+
+from sentry.utils.cursors import Cursor, KeysetCursor, build_cursor
 
 
 def build_mock(**attrs):
@@ -44,3 +46,16 @@ def test_build_cursor():
     assert isinstance(cursor.prev, Cursor)
     assert cursor.prev
     assert list(cursor) == [event3]
+
+
+def test_keyset_cursor():
+    cursor = KeysetCursor((1628000000000123, 42), 0, True)
+    assert str(cursor) == "1628000000000123,42:0:1"
+    assert KeysetCursor.from_string(str(cursor)) == cursor
+
+    assert str(KeysetCursor(0, 0, False)) == "0:0:0"
+    assert KeysetCursor.from_string("0:0:0") == KeysetCursor(0, 0, False)
+
+    for value in ("1628000000000:0:0", "a,1:0:0", "1,2,3:0:0", "1,2:0"):
+        with pytest.raises(ValueError):
+            KeysetCursor.from_string(value)
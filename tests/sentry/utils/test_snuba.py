@@ -1,17 +1,28 @@
+import threading
+import time
+import tracemalloc
 import unittest
 from datetime import datetime, timedelta
 from unittest import mock
 
 import pytest
 import pytz
+from django.core.cache import cache
 from django.utils import timezone
 
+from sentry.app import locks
 from sentry.models import GroupRelease, Project, Release
 from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
+from sentry.utils import json, snuba
+from sentry.utils.locking import UnableToAcquireLock
 from sentry.utils.snuba import (
     Dataset,
+    SnubaError,
     SnubaQueryParams,
+    StreamedResult,
     UnqualifiedQueryError,
+    _apply_cache_and_build_results,
     _prepare_query_params,
     get_json_type,
     get_query_params_to_update_for_projects,
@@ -354,3 +365,273 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+class QueryCacheTest(TestCase):
+    def setUp(self):
+        self.query = {"dataset": "events", "selected_columns": ["event_id"], "project": [1]}
+        self.calls = 0
+
+    def run_query(self, referrer="test", use_cache=True):
+        params = [(dict(self.query), lambda x: x, lambda x: x)]
+        return list(_apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache))
+
+    def fake_bulk_snuba_query(self, params, headers):
+        self.calls += 1
+        return [{"data": [{"event_id": "a" * 32}]} for _ in params]
+
+    def test_referrer_ttl(self):
+        with override_options(
+            {"snuba.query-cache.referrer-ttls": {"cached-referrer": 60}}
+        ), mock.patch.object(snuba, "_bulk_snuba_query", side_effect=self.fake_bulk_snuba_query):
+            self.run_query(referrer="cached-referrer", use_cache=False)
+            self.run_query(referrer="cached-referrer", use_cache=False)
+            assert self.calls == 1
+
+            self.run_query(referrer="other-referrer", use_cache=False)
+            self.run_query(referrer="other-referrer", use_cache=False)
+            assert self.calls == 3
+
+    def test_thundering_herd(self):
+        herd_size = 8
+        joined = []
+        join = snuba._query_flights.join
+
+        def counting_join(cache_key):
+            joined.append(cache_key)
+            return join(cache_key)
+
+        def slow_bulk_snuba_query(params, headers):
+            # Only answer once every query arrived, so they all overlap.
+            deadline = time.monotonic() + 5
+            while len(joined) < herd_size and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return self.fake_bulk_snuba_query(params, headers)
+
+        results = []
+
+        def query():
+            results.append(self.run_query())
+
+        with override_options({"snuba.query-cache.single-flight": True}), mock.patch.object(
+            snuba, "_bulk_snuba_query", side_effect=slow_bulk_snuba_query
+        ), mock.patch.object(snuba._query_flights, "join", side_effect=counting_join), mock.patch(
+            "sentry.utils.snuba.metrics.incr"
+        ) as incr:
+            threads = [threading.Thread(target=query) for _ in range(herd_size)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert self.calls == 1
+        assert len(results) == herd_size
+        assert all(result == [{"data": [{"event_id": "a" * 32}]}] for result in results)
+        # Every result is a copy of its own
+        assert len({id(result[0]) for result in results}) == herd_size
+
+        coalesced = [
+            call
+            for call in incr.call_args_list
+            if call[0][0] == "snuba.query_cache.coalesced" and call[1]["tags"]["source"] == "thread"
+        ]
+        assert len(coalesced) == herd_size - 1
+
+    def test_coalesced_error(self):
+        started = threading.Event()
+        errors = []
+
+        def failing_bulk_snuba_query(params, headers):
+            started.set()
+            time.sleep(0.2)
+            raise SnubaError("boom")
+
+        def query():
+            try:
+                self.run_query()
+            except SnubaError as e:
+                errors.append(e)
+
+        with override_options({"snuba.query-cache.single-flight": True}), mock.patch.object(
+            snuba, "_bulk_snuba_query", side_effect=failing_bulk_snuba_query
+        ) as bulk_snuba_query:
+            leader = threading.Thread(target=query)
+            leader.start()
+            started.wait(5)
+            follower = threading.Thread(target=query)
+            follower.start()
+            leader.join()
+            follower.join()
+
+        assert bulk_snuba_query.call_count == 1
+        assert len(errors) == 2
+        assert not snuba._query_flights._flights
+
+    def test_wait_for_leader_to_cache(self):
+        cache_key = snuba.get_cache_key(self.query)
+        cache.delete(cache_key)
+        item = (0, self.query, cache_key)
+        serialized = json.dumps({"data": [{"event_id": "a" * 32}]})
+        lock = mock.Mock()
+        lock.acquire.side_effect = [UnableToAcquireLock(), None]
+
+        def leader_caches_and_releases(delay):
+            cache.set(cache_key, serialized, 60)
+
+        with mock.patch.object(locks, "get", return_value=lock), mock.patch.object(
+            snuba.time, "sleep", side_effect=leader_caches_and_releases
+        ):
+            assert snuba._wait_for_other_processes([item]) == [(item, serialized, None)]
+
+        assert lock.acquire.call_count == 2
+        assert lock.release.call_count == 1
+
+    def test_wait_for_other_processes_error(self):
+        item = (0, self.query, snuba.get_cache_key(self.query))
+        lock = mock.Mock()
+
+        with mock.patch.object(locks, "get", return_value=lock), mock.patch.object(
+            cache, "get_many", side_effect=Exception("boom")
+        ), pytest.raises(Exception):
+            snuba._wait_for_other_processes([item])
+
+        assert lock.release.call_count == 1
+
+    def test_quantized_cache_key(self):
+        key = snuba.get_cache_key(self.query)
+        assert key.startswith("sqc:")
+        assert key.count(":") == 1
+
+        quantized = snuba.get_cache_key(self.query, 300)
+        assert quantized.startswith(key + ":")
+        assert snuba.get_cache_key(self.query, 300) == quantized
+
+
+class FakeStreamingResponse:
+    def __init__(self, data, chunk_size, status=200):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.status = status
+        self.released = False
+        self.closed = False
+
+    def stream(self, amt, decode_content=True):
+        for pos in range(0, len(self.data), self.chunk_size):
+            yield self.data[pos : pos + self.chunk_size]
+
+    def read(self):
+        return b""
+
+    def release_conn(self):
+        self.released = True
+
+    def close(self):
+        self.closed = True
+
+
+def make_response_body(rows):
+    return json.dumps(
+        {
+            "meta": [{"name": "event_id"}, {"name": "message"}, {"name": "count"}],
+            "data": [
+                {"event_id": "%032x" % i, "message": "ünïcode message %d" % i, "count": i * 1.5}
+                for i in range(rows)
+            ],
+            "totals": {"count": rows},
+            "timing": {"duration_ms": 17},
+        }
+    ).encode("utf-8")
+
+
+class StreamedResultTest(unittest.TestCase):
+    def test_rows(self):
+        body = make_response_body(100)
+        expected = json.loads(body)
+
+        # Chunk boundaries fall into strings, numbers and multi-byte characters
+        for chunk_size in (1, 7, 64, 1 << 16):
+            response = FakeStreamingResponse(body, chunk_size)
+            result = StreamedResult(response, lambda row: dict(row, translated=True))
+
+            assert result["meta"] == expected["meta"]
+            assert list(result) == [dict(row, translated=True) for row in expected["data"]]
+            assert result["totals"] == expected["totals"]
+            assert result["timing"] == expected["timing"]
+            assert result.get("sql") is None
+            assert response.released
+            assert not response.closed
+
+    def test_fields_after_data(self):
+        result = StreamedResult(FakeStreamingResponse(make_response_body(10), 16), lambda x: x)
+
+        assert result["totals"] == {"count": 10}
+        # Reading later fields consumes the rows
+        assert list(result) == []
+
+    def test_iterate_once(self):
+        result = StreamedResult(FakeStreamingResponse(make_response_body(10), 16), lambda x: x)
+
+        assert len(list(result)) == 10
+        with pytest.raises(RuntimeError):
+            list(result)
+
+    def test_stop_iterating(self):
+        response = FakeStreamingResponse(make_response_body(10), 16)
+        rows = iter(StreamedResult(response, lambda x: x))
+        next(rows)
+        rows.close()
+
+        # The unread rest of the response must not be reused
+        assert response.closed
+        assert response.released
+
+    def test_close_partly_read(self):
+        response = FakeStreamingResponse(make_response_body(10), 16)
+        result = StreamedResult(response, lambda x: x)
+        result.close()
+
+        assert response.closed
+        assert response.released
+
+    def test_truncated(self):
+        body = make_response_body(10)
+        result = StreamedResult(FakeStreamingResponse(body[: len(body) // 2], 16), lambda x: x)
+
+        with pytest.raises(snuba.UnexpectedResponseError):
+            list(result)
+
+    def test_error_response(self):
+        body = json.dumps({"error": {"type": "schema", "message": "bad query"}}).encode("utf-8")
+        response = FakeStreamingResponse(body, 16, status=400)
+
+        with mock.patch.object(snuba, "_raw_snql_query", return_value=response):
+            with pytest.raises(snuba.SchemaValidationError):
+                snuba._stream_snuba_query(
+                    (mock.Mock(spec=snuba.Query), lambda x: x, lambda x: x), {}
+                )
+        assert response.released
+
+    def test_peak_memory(self):
+        body = make_response_body(20000)
+
+        def measure(consume):
+            tracemalloc.start()
+            try:
+                consume(FakeStreamingResponse(body, 1 << 16))
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        def decode_all(response):
+            data = b"".join(response.stream(1 << 16))
+            result = json.loads(data)
+            result["data"] = [dict(row) for row in result["data"]]
+            return sum(1 for _ in result["data"])
+
+        def decode_streaming(response):
+            return sum(1 for _ in StreamedResult(response, dict))
+
+        full_peak = measure(decode_all)
+        streaming_peak = measure(decode_streaming)
+
+        assert streaming_peak * 4 < full_peak
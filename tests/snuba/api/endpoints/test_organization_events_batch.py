@@ -0,0 +1,151 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.urls import reverse
+
+from sentry.api import client
+from sentry.testutils import APITestCase, SnubaTestCase
+from sentry.testutils.helpers import override_options
+from sentry.testutils.helpers.datetime import before_now, iso_format
+
+
+class OrganizationEventsBatchEndpointTest(APITestCase, SnubaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as(user=self.user)
+
+        self.day_ago = before_now(days=1).replace(hour=10, minute=0, second=0, microsecond=0)
+        self.project = self.create_project()
+        self.store_event(
+            data={
+                "event_id": "a" * 32,
+                "message": "very bad",
+                "timestamp": iso_format(self.day_ago + timedelta(minutes=1)),
+                "fingerprint": ["group1"],
+            },
+            project_id=self.project.id,
+        )
+        self.store_event(
+            data={
+                "event_id": "b" * 32,
+                "message": "oh my",
+                "timestamp": iso_format(self.day_ago + timedelta(hours=1, minutes=1)),
+                "fingerprint": ["group2"],
+            },
+            project_id=self.project.id,
+        )
+        self.url = reverse(
+            "sentry-api-0-organization-events-batch",
+            kwargs={"organization_slug": self.project.organization.slug},
+        )
+        self.time_range = {
+            "start": iso_format(self.day_ago),
+            "end": iso_format(self.day_ago + timedelta(hours=2)),
+        }
+
+    def do_request(self, data, features=None):
+        if features is None:
+            features = {"organizations:discover-basic": True}
+        with self.feature(features):
+            return self.client.post(self.url, data=data, format="json")
+
+    def test_simple(self):
+        response = self.do_request(
+            {
+                "queries": [
+                    {
+                        "id": "table",
+                        "endpoint": "eventsv2",
+                        "query": {**self.time_range, "field": ["message", "count()"]},
+                    },
+                    {
+                        "id": "chart",
+                        "endpoint": "events-stats",
+                        "query": {**self.time_range, "interval": "1h", "yAxis": "count()"},
+                    },
+                ]
+            }
+        )
+
+        assert response.status_code == 200, response.content
+        table, chart = response.data["results"]
+        assert table["id"] == "table"
+        assert table["status"] == 200
+        assert sorted(row["message"] for row in table["data"]["data"]) == ["oh my", "very bad"]
+        assert chart["id"] == "chart"
+        assert chart["status"] == 200
+        assert [attrs for time, attrs in chart["data"]["data"]] == [[{"count": 1}], [{"count": 1}]]
+
+    def test_identical_queries_run_once(self):
+        query = {**self.time_range, "interval": "1h", "yAxis": ["count()"]}
+        with mock.patch.object(client, "get", wraps=client.get) as get:
+            response = self.do_request(
+                {
+                    "queries": [
+                        {"id": "first", "endpoint": "events-stats", "query": query},
+                        {"id": "second", "endpoint": "events-stats", "query": query},
+                    ]
+                }
+            )
+
+        assert response.status_code == 200, response.content
+        assert get.call_count == 1
+        first, second = response.data["results"]
+        assert [first["id"], second["id"]] == ["first", "second"]
+        assert first["data"] == second["data"]
+
+    def test_query_errors_are_per_query(self):
+        response = self.do_request(
+            {
+                "queries": [
+                    {
+                        "id": "invalid",
+                        "endpoint": "eventsv2",
+                        "query": {**self.time_range, "field": ["count_unique()"]},
+                    },
+                    {
+                        "id": "valid",
+                        "endpoint": "eventsv2",
+                        "query": {**self.time_range, "field": ["count()"]},
+                    },
+                ]
+            }
+        )
+
+        assert response.status_code == 200, response.content
+        invalid, valid = response.data["results"]
+        assert invalid["status"] == 400
+        assert valid["status"] == 200
+        assert valid["data"]["data"][0]["count"] == 2
+
+    def test_concurrent_queries(self):
+        def get(path, request, data):
+            return mock.Mock(status_code=200, data={"path": path, "field": data["field"]})
+
+        queries = [
+            {"id": str(i), "endpoint": "eventsv2", "query": {"field": [f"count_unique(tag{i})"]}}
+            for i in range(5)
+        ]
+        with override_options({"api.events-batch.concurrency": 3}), mock.patch.object(
+            client, "get", side_effect=get
+        ):
+            response = self.do_request({"queries": queries})
+
+        assert response.status_code == 200, response.content
+        assert [result["data"]["field"] for result in response.data["results"]] == [
+            [f"count_unique(tag{i})"] for i in range(5)
+        ]
+
+    def test_invalid_batch(self):
+        response = self.do_request(
+            {"queries": [{"id": "a", "endpoint": "organizations", "query": {}}]}
+        )
+        assert response.status_code == 400, response.content
+
+        query = {"id": "a", "endpoint": "eventsv2", "query": {}}
+        response = self.do_request({"queries": [query, query]})
+        assert response.status_code == 400, response.content
+
+    def test_no_feature(self):
+        response = self.do_request({"queries": []}, features={})
+        assert response.status_code == 404, response.content
@@ -3,6 +3,8 @@ from unittest.mock import Mock, patch
 from uuid import uuid4
 
 from dateutil.parser import parse as parse_datetime
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
@@ -355,6 +357,28 @@ class GroupListTest(APITestCase, SnubaTestCase):
         response = self.get_response(sort="meow", query="is:unresolved")
         assert response.status_code == 400
 
+    def test_num_queries_independent_of_groups(self):
+        self.login_as(user=self.user)
+
+        def create_groups(count):
+            for _ in range(count):
+                group = self.store_event(
+                    data={"timestamp": iso_format(self.min_ago), "fingerprint": [uuid4().hex]},
+                    project_id=self.project.id,
+                ).group
+                GroupAssignee.objects.assign(group, self.user)
+
+        def count_queries():
+            with CaptureQueriesContext(connections["default"]) as queries:
+                self.get_valid_response(sort_by="date", query="is:unresolved")
+            return len(queries)
+
+        create_groups(2)
+        count_queries()
+        num_queries = count_queries()
+        create_groups(4)
+        assert count_queries() == num_queries
+
     def test_simple_pagination(self):
         event1 = self.store_event(
             data={"timestamp": iso_format(before_now(seconds=2)), "fingerprint": ["group-1"]},
@@ -27,7 +27,7 @@ from sentry.search.snuba.backend import (
     CdcEventsDatasetSnubaSearchBackend,
     EventsDatasetSnubaSearchBackend,
 )
-from sentry.search.snuba.executors import InvalidQueryForExecutor
+from sentry.search.snuba.executors import InvalidQueryForExecutor, PostgresSnubaQueryExecutor
 from sentry.testutils import SnubaTestCase, TestCase, xfail_if_not_postgres
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.utils.snuba import SENTRY_SNUBA_MAP, Dataset, SnubaError
@@ -1313,6 +1313,72 @@ class EventsSnubaSearchTest(TestCase, SnubaTestCase):
         finally:
             options.set("snuba.search.max-pre-snuba-candidates", prev_max_pre)
 
+    def test_pipelined_post_filtering(self):
+        submit_snuba_search = mock.patch.object(
+            PostgresSnubaQueryExecutor,
+            "submit_snuba_search",
+            autospec=True,
+            side_effect=PostgresSnubaQueryExecutor.submit_snuba_search,
+        )
+        with self.options(
+            {
+                "snuba.search.max-pre-snuba-candidates": 0,
+                "snuba.search.pipelined-chunks": True,
+            }
+        ):
+            # group1 is the first chunk and filtered out, group2 is prefetched
+            # while Postgres filters group1
+            with submit_snuba_search as submit:
+                results = self.make_query(search_filter_query="is:resolved", limit=1)
+            assert list(results) == [self.group2]
+            assert [call[1]["offset"] for call in submit.call_args_list] == [0, 1]
+
+            # group1 fills the page, the prefetched chunk is discarded
+            with submit_snuba_search as submit, mock.patch(
+                "sentry.search.snuba.executors.metrics.incr"
+            ) as incr:
+                results = self.make_query(
+                    search_filter_query="is:unresolved", limit=1, count_hits=True
+                )
+            assert list(results) == [self.group1]
+            assert results.hits == 1
+            assert [call[1]["offset"] for call in submit.call_args_list] == [0, 1]
+            assert mock.call("snuba.search.discarded_chunks", skip_internal=False) in (
+                incr.call_args_list
+            )
+
+            results = self.make_query()
+            assert set(results) == {self.group1, self.group2}
+
+    def test_hits_cache(self):
+        snuba_search = mock.patch.object(
+            PostgresSnubaQueryExecutor,
+            "snuba_search",
+            autospec=True,
+            side_effect=PostgresSnubaQueryExecutor.snuba_search,
+        )
+
+        def get_sample_queries(mock_search):
+            return [call for call in mock_search.call_args_list if call[1].get("get_sample")]
+
+        with self.options(
+            {
+                "snuba.search.max-pre-snuba-candidates": 0,
+                "snuba.search.hits-cache-ttl": 60,
+            }
+        ):
+            with snuba_search as search:
+                for _ in range(2):
+                    results = self.make_query(search_filter_query="is:unresolved", count_hits=True)
+                    assert results.hits == 1
+            assert len(get_sample_queries(search)) == 1
+
+            # A different query is estimated separately
+            with snuba_search as search:
+                results = self.make_query(search_filter_query="is:resolved", count_hits=True)
+                assert results.hits == 1
+            assert len(get_sample_queries(search)) == 1
+
     def test_optimizer_enabled(self):
         prev_optimizer_enabled = options.get("snuba.search.pre-snuba-candidates-optimizer")
         options.set("snuba.search.pre-snuba-candidates-optimizer", True)
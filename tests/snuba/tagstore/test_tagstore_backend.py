@@ -1,7 +1,9 @@
 from datetime import timedelta
+from unittest import mock
 
 import pytest
 from django.utils import timezone
+from freezegun import freeze_time
 
 from sentry.models import Environment, EventUser, Release, ReleaseProjectEnvironment, ReleaseStages
 from sentry.search.events.constants import (
@@ -16,10 +18,16 @@ from sentry.tagstore.exceptions import (
     TagKeyNotFound,
     TagValueNotFound,
 )
-from sentry.tagstore.snuba.backend import SnubaTagStorage
+from sentry.tagstore.snuba.backend import (
+    GROUP_TAG_SUMMARY_SETTLED_AFTER,
+    SnubaTagStorage,
+    merge_group_tag_summaries,
+)
 from sentry.tagstore.types import TagValue
+from sentry.tasks.tagstore import refresh_group_tag_summary
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.helpers.datetime import iso_format
+from sentry.utils import snuba
 
 exception = {
     "values": [
@@ -169,6 +177,106 @@ class TagStorageTest(TestCase, SnubaTestCase):
         assert {v.value for v in top_release_values} == {"100", "200"}
         assert all(v.times_seen == 1 for v in top_release_values)
 
+    def get_group_tag_summary(self):
+        return {
+            tag_key.key: (
+                tag_key.count,
+                {tag_value.value: tag_value.times_seen for tag_value in tag_key.top_values},
+            )
+            for tag_key in self.ts.get_group_tag_keys_and_top_values(
+                self.proj1.id, self.proj1group1.id, [self.proj1env1.id]
+            )
+        }
+
+    def store_group_event(self, timestamp):
+        self.store_event(
+            data={
+                "message": "message 1",
+                "platform": "python",
+                "environment": "test",
+                "fingerprint": ["group-1"],
+                "timestamp": iso_format(timestamp),
+                "tags": {"foo": "quux"},
+                "exception": exception,
+            },
+            project_id=self.proj1.id,
+        )
+
+    def test_get_group_tag_keys_and_top_values_cached(self):
+        expected = self.get_group_tag_summary()
+        with self.options({"snuba.tagstore.group-tag-summary-cache": True}):
+            assert self.get_group_tag_summary() == expected
+
+            self.store_group_event(self.now - timedelta(seconds=1))
+            with mock.patch.object(snuba, "query") as query:
+                assert self.get_group_tag_summary() == expected
+            assert not query.called
+
+    def test_get_group_tag_keys_and_top_values_incremental(self):
+        with self.options(
+            {
+                "snuba.tagstore.group-tag-summary-cache": True,
+                "snuba.tagstore.group-tag-summary-fresh-seconds": 0,
+            }
+        ):
+            with freeze_time(self.now):
+                self.get_group_tag_summary()
+
+            self.store_group_event(self.now)
+            with freeze_time(self.now + timedelta(seconds=2)), mock.patch.object(
+                snuba, "query", wraps=snuba.query
+            ) as query:
+                result = self.get_group_tag_summary()
+
+        # Only the events since the cached summary were queried
+        settled_end = self.now - GROUP_TAG_SUMMARY_SETTLED_AFTER
+        assert {call.kwargs["start"] for call in query.call_args_list} == {
+            settled_end,
+            settled_end + timedelta(seconds=2),
+        }
+        assert result == self.get_group_tag_summary()
+        assert result["foo"] == (3, {"bar": 2, "quux": 1})
+
+    def test_get_group_tag_keys_and_top_values_late_event(self):
+        with self.options(
+            {
+                "snuba.tagstore.group-tag-summary-cache": True,
+                "snuba.tagstore.group-tag-summary-fresh-seconds": 0,
+            }
+        ):
+            with freeze_time(self.now):
+                self.get_group_tag_summary()
+
+            # Arrives after the summary was cached, for a time before that
+            self.store_group_event(self.now - timedelta(minutes=1))
+            with freeze_time(self.now + timedelta(seconds=2)):
+                result = self.get_group_tag_summary()
+
+        assert result == self.get_group_tag_summary()
+        assert result["foo"] == (3, {"bar": 2, "quux": 1})
+
+    def test_get_group_tag_keys_and_top_values_stale_while_revalidate(self):
+        with self.options(
+            {
+                "snuba.tagstore.group-tag-summary-cache": True,
+                "snuba.tagstore.group-tag-summary-stale-while-revalidate": True,
+            }
+        ):
+            with freeze_time(self.now):
+                expected = self.get_group_tag_summary()
+
+            self.store_group_event(self.now)
+            with freeze_time(self.now + timedelta(minutes=2)):
+                with mock.patch.object(refresh_group_tag_summary, "delay") as delay:
+                    assert self.get_group_tag_summary() == expected
+                    assert self.get_group_tag_summary() == expected
+                assert delay.call_count == 1
+
+                refresh_group_tag_summary(**delay.call_args.kwargs)
+                with mock.patch.object(snuba, "query") as query:
+                    assert self.get_group_tag_summary()["foo"] == (3, {"bar": 2, "quux": 1})
+                assert not query.called
+
     def test_get_top_group_tag_values(self):
         resp = self.ts.get_top_group_tag_values(
             self.proj1.id, self.proj1group1.id, self.proj1env1.id, "foo", 1
@@ -974,3 +1082,15 @@ class GetTagValuePaginatorForProjectsSemverBuildTest(BaseSemverTest, TestCase, S
         self.run_test("1", ["124"], self.environment)
         self.run_test("4", ["456", "457a"])
         self.run_test("4", ["456"], env_2)
+
+
+def test_merge_group_tag_summaries():
+    summary = {"foo": {"count": 3, "values": {"a": (2, 1, 5), "b": (1, 2, 2)}}}
+    delta = {
+        "foo": {"count": 3, "values": {"b": (2, 6, 7), "c": (1, 6, 6)}},
+        "bar": {"count": 1, "values": {"d": (1, 6, 6)}},
+    }
+    assert merge_group_tag_summaries(summary, delta, 2) == {
+        "foo": {"count": 6, "values": {"b": (3, 2, 7), "a": (2, 1, 5)}},
+        "bar": {"count": 1, "values": {"d": (1, 6, 6)}},
+    }